@@ -29,6 +29,7 @@ from dicttoxml import dicttoxml
 from six import binary_type, text_type
 
 from custard.core.xml2dict import Xml2Dict
+from custard.utils.serializer import COMPONENT_DATAKIT, get_serializer, has_serializer, resolve_serializer
 
 logger = logging.getLogger(__name__)
 
@@ -512,6 +513,7 @@ class DataKitHelper:
         parse_constant=None,
         object_pairs_hook=None,
         err_detail="解析JSON字符串并将其转换为Python字典失败",
+        serializer=None,
     ):
         """
         返回安全的json类型
@@ -523,6 +525,8 @@ class DataKitHelper:
             parse_constant (_type_, optional): _description_. Defaults to None.
             object_pairs_hook (_type_, optional): _description_. Defaults to None.
             err_detail (str, optional): _description_. Defaults to "解析JSON字符串并将其转换为Python字典失败".
+            serializer (str, optional): custard.utils.serializer 中的序列化器名称或实例. Defaults to None,
+                即为 datakit 组件设置的序列化器, 未设置时使用标准库 json.
 
         Raises:
             Exception: _description_
@@ -531,14 +535,20 @@ class DataKitHelper:
             _type_: _description_
         """
         try:
-            value = json.loads(
-                value,
-                object_hook=object_hook,
-                parse_float=parse_float,
-                parse_int=parse_int,
-                parse_constant=parse_constant,
-                object_pairs_hook=object_pairs_hook,
-            )
+            hooks = (object_hook, parse_float, parse_int, parse_constant, object_pairs_hook)
+            opted_in = serializer is not None or has_serializer(COMPONENT_DATAKIT)
+            if not opted_in or any(hook is not None for hook in hooks):
+                # the json module unless a serializer was chosen, hooks are only supported by the json module
+                value = json.loads(
+                    value,
+                    object_hook=object_hook,
+                    parse_float=parse_float,
+                    parse_int=parse_int,
+                    parse_constant=parse_constant,
+                    object_pairs_hook=object_pairs_hook,
+                )
+            else:
+                value = cls._get_serializer(serializer).loads(value)
         except Exception as e:
             raise Exception(f"{err_detail}: {e}")
         return value
@@ -556,8 +566,19 @@ class DataKitHelper:
         default=None,
         sort_keys=False,
         err_detail="解析obj序列化为JSON格式字符串失败",
+        serializer=None,
     ):
+        """
+        序列化为JSON字符串, 默认与标准库 json 的输出一致
+        传入 serializer 或通过 custard.utils.serializer 为 datakit 组件设置序列化器后, 仅使用
+        ensure_ascii / sort_keys / default 时由该序列化器完成, 其余参数只有标准库 json 支持
+        """
         try:
+            opted_in = serializer is not None or has_serializer(COMPONENT_DATAKIT)
+            if opted_in and not skipkeys and check_circular and allow_nan and indent is None and separators is None:
+                return cls._get_serializer(serializer).dumps(
+                    obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default
+                )
             value = json.dumps(
                 obj,
                 skipkeys=skipkeys,
@@ -573,6 +594,10 @@ class DataKitHelper:
             raise Exception(f"{err_detail}: {e}")
         return value
 
+    @classmethod
+    def _get_serializer(cls, serializer):
+        return get_serializer(COMPONENT_DATAKIT) if serializer is None else resolve_serializer(serializer)
+
     @classmethod
     def format_html_string(cls, html):
         """
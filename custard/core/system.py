@@ -22,6 +22,7 @@ import zipfile
 import yaml
 
 from custard.core.processor import DataKitHelper
+from custard.utils.serializer import resolve_serializer
 
 with contextlib.suppress(AttributeError):
     # PyYAML version >= 5.1
@@ -124,12 +125,13 @@ class SystemHand(DataKitHelper):
             return SystemHand.is_fdir(fdir_path=fdir_path)
 
     @classmethod
-    def load_file(cls, file_path=None, load_mode="yaml"):
+    def load_file(cls, file_path=None, load_mode="yaml", serializer=None):
         """
         加载文件
         Args:
             file_path: 文件路径
             load_mode: 加载方式
+            serializer: json 加载方式使用的 custard.utils.serializer 序列化器名称或实例, 默认为标准库 json
         Returns:
         """
         with open(file_path, "r", encoding="utf-8") as file:
@@ -137,9 +139,12 @@ class SystemHand(DataKitHelper):
                 return yaml.safe_load(file)
             elif load_mode == "json":
                 try:
+                    if serializer is not None:
+                        return resolve_serializer(serializer).loads(file.read())
                     return json.load(file)
-                except json.JSONDecodeError as ex:
-                    raise TypeError("JSONDecodeError:\nfile: %s\nerror: %s" % (file_path, ex))
+                except ValueError as ex:
+                    # json.JSONDecodeError as well as the errors of the other libraries are ValueErrors
+                    raise TypeError("JSONDecodeError:\nfile: %s\nerror: %s" % (file_path, ex)) from ex
             elif load_mode in (".txt", ".py"):
                 return file
             elif load_mode == "html":
@@ -9,6 +9,9 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  None
 """
+from .automaton import KeywordAutomaton
+from .compiled import CompiledAutomaton, compile_automaton
 from .hitfilter import DFAFilter
+from .stream import StreamFilter
 
-__all__ = ["DFAFilter"]
+__all__ = ["CompiledAutomaton", "DFAFilter", "KeywordAutomaton", "StreamFilter", "compile_automaton"]
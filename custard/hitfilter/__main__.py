@@ -0,0 +1,32 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  __main__.py
+@Time    :  2026/10/19 01:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  编译关键词文件: python -m custard.hitfilter <compiled path> [keyword files]
+"""
+import sys
+
+from .compiled import compile_automaton
+from .hitfilter import DFAFilter
+
+
+def main():
+    """python -m custard.hitfilter <compiled path> [keyword files], the bundled keywords by default"""
+    if len(sys.argv) < 2:
+        print(main.__doc__, file=sys.stderr)
+        sys.exit(2)
+    dfa_filter = DFAFilter()
+    if len(sys.argv) > 2:
+        dfa_filter.keyword_path = sys.argv[2:]
+    dfa_filter.parse()
+    compile_automaton(dfa_filter.automaton, sys.argv[1], dfa_filter.keyword_path)
+    print(f"Compiled {dfa_filter.automaton.keyword_count} keywords into {sys.argv[1]}")
+
+
+if __name__ == "__main__":
+    main()
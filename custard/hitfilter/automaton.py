@@ -0,0 +1,206 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  automaton.py
+@Time    :  2026/10/19 00:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  Aho-Corasick 关键词自动机
+"""
+from collections import deque
+
+# besides the characters (str keys) leading to its children, a node dict holds these int keys
+FAIL = 0  # the node of the longest proper suffix which is a keyword prefix, None for the root
+DEPTH = 1  # the length of the keyword prefix leading to the node
+KEYWORD = 2  # the length of the keyword ending at the node, only set for nodes completing a keyword
+# the nodes of all keywords ending at the node (its own and those of its suffixes), longest first;
+# only set for nodes with outputs, so the scan checks for outputs with a cheap `in`
+OUTPUTS = 3
+CATEGORY = 4  # the category tag of the keyword ending at the node, only set for tagged keywords
+
+
+def iter_pending_matches(pending):
+    """Yield the final matches of the pending ones {start: (end, category)} once the text ended"""
+    while pending:
+        start = min(pending)
+        last_end, category = pending.pop(start)
+        yield start, last_end, category
+        pending = {key: value for key, value in pending.items() if key >= last_end}
+
+
+class ScanState:
+    """
+    The state of a scan continued over the chunks of a text, see KeywordAutomaton.iter_matches()
+    Matches a later chunk might still extend stay pending until finish(). No match found later
+    starts before `final_end`, so a caller replacing the matches only keeps the text behind it,
+    which is shorter than the longest keyword.
+    """
+
+    def __init__(self):
+        self.node = None  # the node (the state of a CompiledAutomaton) reached, None at the start
+        self.depth = 0  # the depth of the node
+        self.position = 0  # the count of characters scanned
+        self.last_end = 0  # the end of the last match yielded
+        self.pending = {}
+
+    @property
+    def final_end(self):
+        # pending matches start at `position - depth` at the earliest, see KeywordAutomaton.iter_matches()
+        return max(self.last_end, self.position - self.depth)
+
+    def finish(self):
+        """Yield the pending matches at the end of the text"""
+        pending, self.pending = self.pending, {}
+        self.node, self.depth = None, 0
+        for match in iter_pending_matches(pending):
+            self.last_end = match[1]
+            yield match
+
+
+class KeywordAutomaton:
+    """
+    Aho-Corasick automaton over a set of keywords
+    A message is scanned in a single pass: on a mismatch the automaton follows the failure link
+    to the node of the longest suffix matched so far instead of restarting at the next character.
+    Matches are reported leftmost-longest and non-overlapping, i.e. at the leftmost position where
+    a keyword starts, the longest keyword starting there wins, scanning continues behind it.
+    >>> automaton = KeywordAutomaton()
+    >>> automaton.add("sexy")
+    >>> list(automaton.iter_matches("hello sexy baby"))
+    [(6, 10, None)]
+    """
+
+    def __init__(self):
+        # the trie of nested dicts, the failure links and outputs are set by build()
+        self.root = {FAIL: None, DEPTH: 0}
+        self.keyword_count = 0
+        self._built = True
+
+    def add(self, keyword, category=None):
+        """Add a keyword (matched as given, callers normalize the case), True if it was new
+
+        :param category: Optional category tag reported with the matches, replaces the tag of an existing keyword
+        """
+        if not keyword:
+            return False
+        node = self.root
+        for char in keyword:
+            child = node.get(char)
+            if child is None:
+                child = node[char] = {DEPTH: node[DEPTH] + 1}
+            node = child
+        if category is not None:
+            node[CATEGORY] = category
+        if KEYWORD in node:
+            return False
+        node[KEYWORD] = len(keyword)
+        self.keyword_count += 1
+        self._built = False
+        return True
+
+    def build(self):
+        """Compute the failure links and outputs, called by the first scan after keywords were added"""
+        root = self.root
+        queue = deque()
+        for char, child in root.items():
+            if isinstance(char, str):
+                child[FAIL] = root
+                queue.append(child)
+        while queue:
+            node = queue.popleft()
+            fail = node[FAIL]
+            outputs = ((node,) if KEYWORD in node else ()) + fail.get(OUTPUTS, ())
+            if outputs:
+                node[OUTPUTS] = outputs
+            for char, child in node.items():
+                if not isinstance(char, str):
+                    continue
+                fallback = fail
+                while char not in fallback and fallback is not root:
+                    fallback = fallback[FAIL]
+                child[FAIL] = fallback.get(char, root)
+                queue.append(child)
+        self._built = True
+
+    def iter_keywords(self):
+        """Yield the (keyword, category) pairs, like CompiledAutomaton.iter_keywords()"""
+        stack = [(self.root, "")]
+        while stack:
+            node, prefix = stack.pop()
+            if KEYWORD in node:
+                yield prefix, node.get(CATEGORY)
+            for char, child in node.items():
+                if isinstance(char, str):
+                    stack.append((child, prefix + char))
+
+    def contains(self, text):
+        """True if any keyword occurs in `text`, stops scanning at the first keyword end"""
+        if not self._built:
+            self.build()
+        root = node = self.root
+        for char in text:
+            child = node.get(char)
+            if child is None:
+                while child is None and node is not root:
+                    node = node[FAIL]
+                    child = node.get(char)
+                if child is None:
+                    continue
+            node = child
+            if OUTPUTS in node:
+                return True
+        return False
+
+    def iter_matches(self, text, scan=None):
+        """Yield the (start, end, category) of the leftmost-longest non-overlapping keyword matches in `text`
+
+        :param scan: A ScanState to continue a scan with `text` as the next chunk, the positions count from
+            the start of the first chunk; the generator has to be exhausted before the next chunk is scanned
+        """
+        if not self._built:
+            self.build()
+        root = self.root
+        if scan is None:
+            node, offset, last_end = root, 0, 0
+            # (end, category) of the longest match per start position, for matches which a longer one
+            # starting further left might still overlap
+            pending = {}
+        else:
+            node, offset, last_end, pending = scan.node or root, scan.position, scan.last_end, scan.pending
+        for end, char in enumerate(text, offset + 1):
+            child = node.get(char)
+            if child is not None:
+                node = child
+            elif node is root:
+                if not pending:
+                    continue
+            else:
+                while child is None and node is not root:
+                    node = node[FAIL]
+                    child = node.get(char)
+                node = child or root
+
+            if OUTPUTS in node:
+                for output in node[OUTPUTS]:
+                    start = end - output[KEYWORD]
+                    if start >= last_end and (start not in pending or pending[start][0] < end):
+                        pending[start] = (end, output.get(CATEGORY))
+            if not pending:
+                continue
+            # matches ending later start at `end - depth` at the earliest, so pending matches starting before are final
+            threshold = end - node[DEPTH]
+            while pending:
+                start = min(pending)
+                if start >= threshold:
+                    break
+                last_end, category = pending.pop(start)
+                yield start, last_end, category
+                pending = {key: value for key, value in pending.items() if key >= last_end}
+
+        if scan is not None:
+            scan.node, scan.depth, scan.position = node, node[DEPTH], offset + len(text)
+            scan.last_end, scan.pending = last_end, pending
+            return
+        yield from iter_pending_matches(pending)
@@ -0,0 +1,66 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  compiled_benchmark.py
+@Time    :  2026/10/19 01:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  多进程 worker 启动: 每个进程 parse() 内置词库 vs mmap 加载预编译的自动机文件的耗时与私有内存
+"""
+from tempfile import TemporaryDirectory
+import multiprocessing
+import os
+import sys
+import time
+
+from custard.hitfilter import DFAFilter
+
+
+def get_private_memory():
+    """the private (not shared with other processes) memory of this process in bytes, Linux only"""
+    total = 0
+    with open("/proc/self/smaps_rollup", encoding="ascii") as file:
+        for line in file:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1]) * 1024
+    return total
+
+
+def start_worker(compiled_path, results):
+    memory = get_private_memory()
+    started = time.perf_counter()
+    dfa_filter = DFAFilter()
+    dfa_filter.parse(compiled_path=compiled_path)
+    dfa_filter.filter("售假人民币 习近平")
+    results.put((time.perf_counter() - started, get_private_memory() - memory))
+
+
+def run(name, process_count, compiled_path=None):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    processes = [context.Process(target=start_worker, args=(compiled_path, results)) for _ in range(process_count)]
+    for process in processes:
+        process.start()
+    measurements = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    startup = sum(elapsed for elapsed, _ in measurements) / process_count
+    memory = sum(size for _, size in measurements) / process_count
+    print(f"{name:<40} startup {startup * 1000:>8.1f}ms  private memory {memory / 1024 / 1024:>7.1f} MB per process")
+
+
+def main():
+    process_count = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    with TemporaryDirectory() as directory:
+        compiled_path = os.path.join(directory, "keywords.bin")
+        started = time.perf_counter()
+        DFAFilter().parse(compiled_path=compiled_path)
+        print(f"{'compile the bundled keywords':<40} {(time.perf_counter() - started) * 1000:>16.1f}ms")
+        run("parse() in each process", process_count)
+        run("mmap the compiled automaton", process_count, compiled_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  contains_benchmark.py
+@Time    :  2026/10/19 01:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  是否包含敏感词: 用哨兵替换串 filter 后查找 vs 首个命中即返回的 contains
+"""
+import sys
+import time
+import tracemalloc
+
+from custard.hitfilter import DFAFilter
+from custard.hitfilter.benchmarks.hitfilter_benchmark import create_corpus
+
+
+def contains_by_filter(dfa_filter, message):
+    """the check as before find_matches and contains: replace with a sentinel, then search the copy"""
+    repl = "_-__-"
+    return repl in dfa_filter.filter(message=message, repl=repl)
+
+
+def measure(name, function, messages):
+    tracemalloc.start()
+    started = time.perf_counter()
+    hits = sum(1 for message in messages if function(message))
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{name:<50} {elapsed:>8.3f}s {hits:>8} hits {peak / 1024:>10.0f} KB peak")
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 2 * 1024 * 1024
+    dfa_filter = DFAFilter()
+    dfa_filter.parse()
+    dfa_filter.automaton.build()
+    keywords = [line.strip().lower() for line in open(dfa_filter.keyword_path[0], encoding="utf-8") if line.strip()]
+    corpus = create_corpus(keywords, size)
+    comments = [corpus[index : index + 200] for index in range(0, len(corpus), 200)]
+
+    measure("filter with a sentinel, 200 characters per message", lambda m: contains_by_filter(dfa_filter, m), comments)
+    measure("contains, 200 characters per message", dfa_filter.contains, comments)
+    measure("filter with a sentinel, the whole corpus", lambda m: contains_by_filter(dfa_filter, m), [corpus])
+    measure("contains, the whole corpus", dfa_filter.contains, [corpus])
+    measure("count_categories, 200 characters per message", dfa_filter.count_categories, comments)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  parallel_benchmark.py
+@Time    :  2026/10/19 02:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  filter_many 的吞吐随进程数 (1 到 CPU 核数) 的扩展情况, 共享预编译的自动机文件
+"""
+from tempfile import TemporaryDirectory
+import os
+import sys
+import time
+
+from custard.hitfilter import DFAFilter
+from custard.hitfilter.benchmarks.hitfilter_benchmark import create_corpus
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    max_processes = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    with TemporaryDirectory() as directory:
+        dfa_filter = DFAFilter()
+        dfa_filter.parse(compiled_path=os.path.join(directory, "keywords.bin"))
+        keywords = [keyword for keyword, _ in dfa_filter.automaton.iter_keywords()]
+        corpus = create_corpus(keywords, count * 200)
+        comments = [corpus[index : index + 200] for index in range(0, len(corpus), 200)]
+        print(f"{len(comments)} comments of 200 characters, {os.cpu_count()} CPUs")
+
+        baseline = None
+        expected = None
+        for processes in range(1, max_processes + 1):
+            started = time.perf_counter()
+            results = list(dfa_filter.filter_many(comments, processes=processes))
+            elapsed = time.perf_counter() - started
+            expected = expected or results
+            assert results == expected
+            baseline = baseline or elapsed
+            print(
+                f"{processes:>3} processes {elapsed:>8.2f}s {len(comments) / elapsed:>10.0f} comments/s"
+                f" {baseline / elapsed:>6.2f}x"
+            )
+        dfa_filter.automaton.close()
+
+
+if __name__ == "__main__":
+    main()
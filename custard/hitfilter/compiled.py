@@ -0,0 +1,325 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  compiled.py
+@Time    :  2026/10/19 01:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  预编译的关键词自动机文件, 以只读 mmap 方式加载
+"""
+from array import array
+from bisect import bisect_left
+from collections import deque
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+
+from .automaton import CATEGORY, DEPTH, FAIL, OUTPUTS, iter_pending_matches
+
+MAGIC = b"HFKA"
+FORMAT_VERSION = 2
+# magic, format version, byte order of the arrays (0 little, 1 big endian), state, edge and output
+# counts and the length of the JSON encoded metadata (sources and category names) following the header
+HEADER = struct.Struct("<4sHHIIII")
+BYTE_ORDER = 0 if sys.byteorder == "little" else 1
+ARRAY_TYPECODE = "I"  # all arrays are uint32, state 0 is the root
+
+
+class CompiledAutomatonError(Exception):
+    """The compiled automaton file is invalid or written by another format version"""
+
+
+# ----------------------------------------------------------------------
+def get_source_fingerprint(paths):
+    """The path, size and modification time of each keyword file, like the source check of .pyc files"""
+    fingerprint = []
+    for path in paths:
+        stat = os.stat(path)
+        fingerprint.append([os.path.realpath(path), stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+# ----------------------------------------------------------------------
+def compile_automaton(automaton, path, sources=()):
+    """Write `automaton` into the flat binary file `path`, replacing it atomically.
+
+    The states are numbered in breadth-first order. The transitions of state `s` are the entries
+    `edge_offsets[s]` to `edge_offsets[s + 1]` of `edge_chars` (code points, sorted) and `edge_targets`,
+    its outputs (the states of the keywords ending at the state, longest first) the entries
+    `output_offsets[s]` to `output_offsets[s + 1]` of `output_states`. `categories[s]` is the index
+    of the category tag of the keyword completed by state `s` plus one, 0 if it has none.
+
+    :param automaton: The KeywordAutomaton
+    :param path: The path of the compiled file
+    :param sources: The keyword files the automaton was built from, the compiled file is stale once they change
+    """
+    automaton.build()
+    nodes = [automaton.root]
+    numbers = {id(automaton.root): 0}
+    queue = deque(nodes)
+    while queue:
+        node = queue.popleft()
+        for char in sorted(key for key in node if isinstance(key, str)):
+            child = node[char]
+            numbers[id(child)] = len(nodes)
+            nodes.append(child)
+            queue.append(child)
+
+    edge_offsets, edge_chars, edge_targets = array(ARRAY_TYPECODE, [0]), array(ARRAY_TYPECODE), array(ARRAY_TYPECODE)
+    output_offsets, output_states = array(ARRAY_TYPECODE, [0]), array(ARRAY_TYPECODE)
+    fails, depths, categories = array(ARRAY_TYPECODE), array(ARRAY_TYPECODE), array(ARRAY_TYPECODE)
+    category_numbers = {}
+    for node in nodes:
+        for char in sorted(key for key in node if isinstance(key, str)):
+            edge_chars.append(ord(char))
+            edge_targets.append(numbers[id(node[char])])
+        edge_offsets.append(len(edge_chars))
+        output_states.extend(numbers[id(output)] for output in node.get(OUTPUTS, ()))
+        output_offsets.append(len(output_states))
+        fails.append(numbers[id(node[FAIL])] if node[FAIL] is not None else 0)
+        depths.append(node[DEPTH])
+        if CATEGORY in node:
+            categories.append(category_numbers.setdefault(node[CATEGORY], len(category_numbers) + 1))
+        else:
+            categories.append(0)
+
+    metadata = {"sources": get_source_fingerprint(sources), "categories": list(category_numbers)}
+    encoded_metadata = json.dumps(metadata).encode("utf-8")
+    encoded_metadata += b" " * (-len(encoded_metadata) % 4)  # keep the arrays aligned
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, BYTE_ORDER, len(nodes), len(edge_chars), len(output_states), len(encoded_metadata)
+    )
+    directory = os.path.dirname(os.path.abspath(path))
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, prefix=".compiling-")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(header)
+            file.write(encoded_metadata)
+            for values in (edge_offsets, edge_chars, edge_targets, fails, depths, categories, output_offsets):
+                values.tofile(file)
+            output_states.tofile(file)
+            # mkstemp() creates the file readable by the owner only, keep it readable like a file created by open()
+            umask = os.umask(0)
+            os.umask(umask)
+            os.fchmod(file.fileno(), 0o644 & ~umask)
+        # processes loading the automaton meanwhile keep their mapping of the replaced file
+        os.replace(temporary_path, path)
+    except BaseException:
+        os.unlink(temporary_path)
+        raise
+
+
+class CompiledAutomaton:
+    """
+    A compiled keyword automaton, mapped read-only into memory
+    Opening takes no parsing: the arrays are used in place, so processes forked after opening or
+    opening the same file share one physical copy through the page cache. Only the transitions
+    of the root are copied into a dict, they are used for most characters.
+    Matches are the same as those of the KeywordAutomaton the file was compiled from.
+    Pickling it pickles the path only, the file is mapped again on unpickling, e.g. by a spawned process.
+    :param path: The path of a file written by compile_automaton()
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._load()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _load(self):
+        if len(self._mmap) < HEADER.size:
+            raise CompiledAutomatonError("Truncated compiled automaton file")
+        magic, version, byte_order, state_count, edge_count, output_count, metadata_length = HEADER.unpack_from(
+            self._mmap
+        )
+        if magic != MAGIC or version != FORMAT_VERSION or byte_order != BYTE_ORDER:
+            raise CompiledAutomatonError(f"Unsupported compiled automaton file (format version {version})")
+        offset = HEADER.size
+        metadata = json.loads(bytes(self._mmap[offset : offset + metadata_length]))
+        self.sources = metadata["sources"]
+        self._category_names = [None] + metadata["categories"]
+        offset += metadata_length
+        counts = (
+            state_count + 1,
+            edge_count,
+            edge_count,
+            state_count,
+            state_count,
+            state_count,
+            state_count + 1,
+            output_count,
+        )
+        if offset + sum(counts) * 4 != len(self._mmap):
+            raise CompiledAutomatonError("Truncated compiled automaton file")
+        arrays = []
+        view = memoryview(self._mmap)
+        for count in counts:
+            arrays.append(view[offset : offset + count * 4].cast(ARRAY_TYPECODE))
+            offset += count * 4
+        (
+            self._edge_offsets,
+            self._edge_chars,
+            self._edge_targets,
+            self._fails,
+            self._depths,
+            self._categories,
+            self._output_offsets,
+            self._output_states,
+        ) = arrays
+        self._root = {chr(self._edge_chars[index]): self._edge_targets[index] for index in range(self._edge_offsets[1])}
+        self._keyword_count = None
+
+    def __reduce__(self):
+        return CompiledAutomaton, (self.path,)
+
+    @property
+    def keyword_count(self):
+        # counted on first use, opening the file does not touch the states
+        if self._keyword_count is None:
+            self._keyword_count = sum(1 for _ in self._iter_terminal_states())
+        return self._keyword_count
+
+    def is_stale(self):
+        """True if a keyword file the automaton was compiled from changed or disappeared"""
+        try:
+            return get_source_fingerprint(path for path, _, _ in self.sources) != self.sources
+        except OSError:
+            return True
+
+    def close(self):
+        for values in (
+            self._edge_offsets,
+            self._edge_chars,
+            self._edge_targets,
+            self._fails,
+            self._depths,
+            self._categories,
+            self._output_offsets,
+            self._output_states,
+        ):
+            values.release()
+        self._root = None
+        self._mmap.close()
+
+    def _iter_terminal_states(self):
+        offsets, output_states = self._output_offsets, self._output_states
+        for state in range(1, len(self._depths)):
+            # the longest output of a state is its own keyword, if the state completes one
+            if offsets[state] < offsets[state + 1] and output_states[offsets[state]] == state:
+                yield state
+
+    def iter_keywords(self):
+        """Yield the (keyword, category) pairs, e.g. to extend them in a KeywordAutomaton"""
+        stack = [(0, "")]
+        offsets, chars, targets = self._edge_offsets, self._edge_chars, self._edge_targets
+        terminal_states = set(self._iter_terminal_states())
+        while stack:
+            state, prefix = stack.pop()
+            if state in terminal_states:
+                yield prefix, self._category_names[self._categories[state]]
+            for index in range(offsets[state], offsets[state + 1]):
+                stack.append((targets[index], prefix + chr(chars[index])))
+
+    def _next_state(self, state, char):
+        # the transition of a state other than the root, following the failure links
+        offsets, chars, targets, fails = self._edge_offsets, self._edge_chars, self._edge_targets, self._fails
+        code = ord(char)
+        while True:
+            low, high = offsets[state], offsets[state + 1]
+            index = bisect_left(chars, code, low, high)
+            if index < high and chars[index] == code:
+                return targets[index]
+            state = fails[state]
+            if not state:
+                return self._root.get(char, 0)
+
+    def contains(self, text):
+        """True if any keyword occurs in `text`, stops scanning at the first keyword end"""
+        root, output_offsets = self._root, self._output_offsets
+        state = 0
+        for char in text:
+            state = self._next_state(state, char) if state else root.get(char, 0)
+            if output_offsets[state] < output_offsets[state + 1]:
+                return True
+        return False
+
+    def iter_matches(self, text, scan=None):
+        """Yield the (start, end, category) of the leftmost-longest non-overlapping keyword matches in `text`
+
+        :param scan: A ScanState to continue a scan, see KeywordAutomaton.iter_matches()
+        """
+        root, fails, depths = self._root, self._fails, self._depths
+        offsets, chars, targets = self._edge_offsets, self._edge_chars, self._edge_targets
+        output_offsets, output_states = self._output_offsets, self._output_states
+        categories, category_names = self._categories, self._category_names
+        if scan is None:
+            state, offset, last_end = 0, 0, 0
+            # (end, category) of the longest match per start position, see KeywordAutomaton.iter_matches()
+            pending = {}
+        else:
+            state, offset, last_end, pending = scan.node or 0, scan.position, scan.last_end, scan.pending
+        for end, char in enumerate(text, offset + 1):
+            if not state:
+                state = root.get(char, 0)
+                if not state and not pending:
+                    continue
+            else:
+                code = ord(char)
+                while True:
+                    low, high = offsets[state], offsets[state + 1]
+                    index = bisect_left(chars, code, low, high)
+                    if index < high and chars[index] == code:
+                        state = targets[index]
+                        break
+                    state = fails[state]
+                    if not state:
+                        state = root.get(char, 0)
+                        break
+
+            for index in range(output_offsets[state], output_offsets[state + 1]):
+                keyword_state = output_states[index]
+                start = end - depths[keyword_state]
+                if start >= last_end and (start not in pending or pending[start][0] < end):
+                    pending[start] = (end, category_names[categories[keyword_state]])
+            if not pending:
+                continue
+            threshold = end - depths[state]
+            while pending:
+                start = min(pending)
+                if start >= threshold:
+                    break
+                last_end, category = pending.pop(start)
+                yield start, last_end, category
+                pending = {key: value for key, value in pending.items() if key >= last_end}
+
+        if scan is not None:
+            scan.node, scan.depth, scan.position = state, depths[state], offset + len(text)
+            scan.last_end, scan.pending = last_end, pending
+            return
+        yield from iter_pending_matches(pending)
+
+
+# ----------------------------------------------------------------------
+def open_compiled_automaton(path, sources=None):
+    """The CompiledAutomaton of `path`, None if the file is missing, invalid or stale
+
+    :param sources: The expected keyword files, None to accept any sources
+    """
+    try:
+        automaton = CompiledAutomaton(path)
+    except (OSError, ValueError, CompiledAutomatonError):
+        return None
+    expected = None if sources is None else [os.path.realpath(source) for source in sources]
+    if automaton.is_stale() or (expected is not None and [path for path, _, _ in automaton.sources] != expected):
+        automaton.close()
+        return None
+    return automaton
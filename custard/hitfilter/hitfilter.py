@@ -9,88 +9,183 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  过滤敏感词
 """
+from collections import Counter
 import os
 
+from .automaton import KeywordAutomaton
+from .compiled import CompiledAutomaton, compile_automaton, open_compiled_automaton
+from .parallel import CHUNK_SIZE, filter_many
+from .stream import StreamFilter
+
 
 class DFAFilter:
     """
     Filter Messages from keywords
-    Use DFA to keep algorithm perform constantly
+    Use an Aho-Corasick automaton to scan each message in a single pass
+    A line of a keyword file may tag the keyword with a category after a tab, e.g. "sexy\tporn"
+    `keyword_chains` and `delimit` of the former nested dict trie are kept for compatibility
     >>> f = DFAFilter()
-    >>> f.add("sexy")
+    >>> f.add("sexy", "porn")
     >>> f.filter("hello sexy baby")
+    >>> list(f.find_matches("hello sexy baby"))
+    [(6, 10, 'sexy', 'porn')]
     """
 
+    # the key marking the end of a keyword in `keyword_chains`
+    delimit = "\x00"
+
     def __init__(self):
         self.keyword_path = [f"{os.path.dirname(os.path.realpath(__file__))}/keywords"]
-        self.keyword_chains = {}
-        self.delimit = "\x00"
+        self.automaton = KeywordAutomaton()
+
+    @property
+    def keyword_chains(self):
+        """
+        The keywords as the former nested dict trie, a character per level and `{delimit: 0}` at a keyword end
+        A snapshot built from the automaton, changing it does not change the keywords, assign it instead
+        """
+        chains = {}
+        for keyword, _ in self.automaton.iter_keywords():
+            level = chains
+            for char in keyword:
+                level = level.setdefault(char, {})
+            level[self.delimit] = 0
+        return chains
 
-    def add(self, keyword):
+    @keyword_chains.setter
+    def keyword_chains(self, chains):
+        """Replace the keywords by those of a nested dict trie, e.g. `f.keyword_chains = {}` removes all"""
+        if isinstance(self.automaton, CompiledAutomaton):
+            self.automaton.close()
+        self.automaton = KeywordAutomaton()
+        stack = [(chains, "")]
+        while stack:
+            level, prefix = stack.pop()
+            for char, child in level.items():
+                if char == self.delimit:
+                    self.automaton.add(prefix)
+                elif isinstance(child, dict):
+                    stack.append((child, prefix + char))
+
+    def add(self, keyword, category=None):
         if not isinstance(keyword, str):
             keyword = keyword.decode("utf-8")
         keyword = keyword.lower()
         chars = keyword.strip()
         if not chars:
             return
-        level = self.keyword_chains
-        for i in range(len(chars)):
-            if chars[i] in level:
-                level = level[chars[i]]
-            else:
-                if not isinstance(level, dict):
-                    break
-                for j in range(i, len(chars)):
-                    level[chars[j]] = {}
-                    last_level, last_char = level, chars[j]
-                    level = level[chars[j]]
-                last_level[last_char] = {self.delimit: 0}
-                break
-            if i == len(chars) - 1:
-                level[self.delimit] = 0
-
-    def parse(self, path=None):
+        if isinstance(self.automaton, CompiledAutomaton):
+            # a compiled automaton is read-only, continue with its keywords in memory
+            compiled, self.automaton = self.automaton, KeywordAutomaton()
+            for compiled_keyword, compiled_category in compiled.iter_keywords():
+                self.automaton.add(compiled_keyword, compiled_category)
+            compiled.close()
+        self.automaton.add(chars, category)
+
+    def parse(self, path=None, compiled_path=None):
+        """
+        Add the keywords of the keyword files
+        With `compiled_path` the automaton is compiled into this file once and mapped read-only on
+        subsequent calls, e.g. by every worker process, until a keyword file changes. Keywords added
+        before are discarded then.
+        """
         if path is not None:
             self.keyword_path.append(path)
         if isinstance(self.keyword_path, list):
+            if compiled_path is not None:
+                self._load_compiled(compiled_path)
+                return None
             for index in self.keyword_path:
                 with open(index, "r", encoding="utf-8") as file:
-                    for keyword in file:
-                        self.add(keyword.strip())
+                    for line in file:
+                        keyword, _, category = line.partition("\t")
+                        self.add(keyword.strip(), category.strip() or None)
             return None
         else:
             return TypeError("文件路径不正确")
 
+    def _load_compiled(self, compiled_path):
+        automaton = open_compiled_automaton(compiled_path, self.keyword_path)
+        if automaton is None:
+            self.automaton = KeywordAutomaton()
+            self.parse()
+            compile_automaton(self.automaton, compiled_path, self.keyword_path)
+            automaton = CompiledAutomaton(compiled_path)
+        self.automaton = automaton
+
     def filter(self, message, repl="*"):
         if not isinstance(message, str):
             message = message.decode("utf-8")
         message = message.lower()
         ret = []
-        start = 0
-        while start < len(message):
-            level = self.keyword_chains
-            step_ins = 0
-            for char in message[start:]:
-                if char in level:
-                    step_ins += 1
-                    if self.delimit not in level[char]:
-                        level = level[char]
-                    else:
-                        ret.append(repl * step_ins)
-                        start += step_ins - 1
-                        break
-                else:
-                    ret.append(message[start])
-                    break
-            else:
-                ret.append(message[start])
-            start += 1
-
+        position = 0
+        # the longest keyword starting at the leftmost position is replaced, one repl per character
+        for start, end, _ in self.automaton.iter_matches(message):
+            ret.append(message[position:start])
+            ret.append(repl * (end - start))
+            position = end
+        ret.append(message[position:])
         return "".join(ret)
 
+    def filter_many(self, messages, repl="*", processes=None, chunk_size=CHUNK_SIZE, context=None):
+        """
+        Filter many messages in chunks across a process pool, yield the results in the order of the messages
+        The workers share the automaton instead of receiving a pickled copy, see parallel.filter_many()
+        >>> list(f.filter_many(["hello sexy", "sexy baby"], processes=2))
+        ['hello ****', '**** baby']
+        """
+        return filter_many(self, messages, repl, processes, chunk_size, context)
+
+    def filter_stream(self, chunks, repl="*"):
+        """
+        Filter a text given as an iterable of str or bytes chunks, yield the filtered chunks
+        Keywords spanning chunks are replaced, the memory used does not grow with the text, see StreamFilter
+        >>> "".join(f.filter_stream(["hello se", "xy baby"]))
+        'hello **** baby'
+        """
+        stream = StreamFilter(self, repl)
+        for chunk in chunks:
+            filtered = stream.feed(chunk)
+            if filtered:
+                yield filtered
+        filtered = stream.close()
+        if filtered:
+            yield filtered
+
+    async def filter_async_stream(self, chunks, repl="*"):
+        """
+        Filter a text given as an async iterable of chunks, e.g. a chunked request body
+        >>> async for chunk in f.filter_async_stream(request.stream()): ...
+        """
+        stream = StreamFilter(self, repl)
+        async for chunk in chunks:
+            filtered = stream.feed(chunk)
+            if filtered:
+                yield filtered
+        filtered = stream.close()
+        if filtered:
+            yield filtered
+
+    def find_matches(self, message):
+        """
+        Yield the (start, end, keyword, category) of the keywords in the message
+        The spans are those filter() replaces, category is None for untagged keywords
+        """
+        if not isinstance(message, str):
+            message = message.decode("utf-8")
+        message = message.lower()
+        for start, end, category in self.automaton.iter_matches(message):
+            yield start, end, message[start:end], category
+
+    def contains(self, message):
+        """True if the message contains a keyword, stops scanning at the first one"""
+        if not isinstance(message, str):
+            message = message.decode("utf-8")
+        return self.automaton.contains(message.lower())
+
+    def count_categories(self, message):
+        """The Counter of the categories of the keywords in the message, untagged keywords are counted as None"""
+        return Counter(category for _, _, _, category in self.find_matches(message))
+
     def is_contain_sensitive_key_word(self, message):
-        repl = "_-__-"
-        dest_string = self.filter(message=message, repl=repl)
-        if repl in dest_string:
-            return True
-        return False
+        return self.contains(message)
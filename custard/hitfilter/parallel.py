@@ -0,0 +1,89 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  parallel.py
+@Time    :  2026/10/19 02:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  批量敏感词过滤, 按块分发到进程池
+"""
+from collections import deque
+from tempfile import TemporaryDirectory
+import copy
+import multiprocessing
+import os
+
+from .automaton import KeywordAutomaton
+from .compiled import CompiledAutomaton, compile_automaton
+
+CHUNK_SIZE = 1000  # messages per task, amortizes the transfer of the messages to the workers
+TASKS_PER_PROCESS = 2  # tasks in flight per process, bounds the memory for any count of messages
+
+# the DFAFilter of a worker process, set by _init_worker()
+_worker_filter = None
+
+
+def _init_worker(dfa_filter):
+    # forked processes inherit the filter, spawned ones unpickle it with its compiled automaton mapped again
+    global _worker_filter
+    _worker_filter = dfa_filter
+
+
+def _filter_chunk(messages, repl):
+    return [_worker_filter.filter(message, repl) for message in messages]
+
+
+def _iter_chunks(messages, chunk_size):
+    chunk = []
+    for message in messages:
+        chunk.append(message)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def filter_many(dfa_filter, messages, repl="*", processes=None, chunk_size=CHUNK_SIZE, context=None):
+    """Filter an iterable of messages across a process pool, yield the results in the order of the messages
+
+    The automaton is not pickled per task: forked workers inherit it, other start methods map the
+    compiled automaton file, an automaton in memory is compiled into a temporary file for them first.
+    The messages are read lazily, at most `processes * TASKS_PER_PROCESS` chunks are in flight.
+
+    :param dfa_filter: The DFAFilter with the keywords
+    :param processes: The count of worker processes, the CPU count by default; 1 filters in this process
+    :param chunk_size: The count of messages per task
+    :param context: The multiprocessing start method, e.g. "fork" or "spawn", the default start method by default
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes == 1:
+        for message in messages:
+            yield dfa_filter.filter(message, repl)
+        return
+
+    context = multiprocessing.get_context(context)
+    with TemporaryDirectory(prefix="hitfilter-") as directory:
+        compiled = None
+        if context.get_start_method() != "fork" and not isinstance(dfa_filter.automaton, CompiledAutomaton):
+            compiled_path = os.path.join(directory, "keywords.bin")
+            compile_automaton(dfa_filter.automaton, compiled_path)
+            compiled = CompiledAutomaton(compiled_path)
+            dfa_filter = copy.copy(dfa_filter)
+            dfa_filter.automaton = compiled
+        elif isinstance(dfa_filter.automaton, KeywordAutomaton):
+            dfa_filter.automaton.build()  # once before forking, not in every worker
+        try:
+            with context.Pool(processes, initializer=_init_worker, initargs=(dfa_filter,)) as pool:
+                results = deque()
+                for chunk in _iter_chunks(messages, chunk_size):
+                    if len(results) >= processes * TASKS_PER_PROCESS:
+                        yield from results.popleft().get()
+                    results.append(pool.apply_async(_filter_chunk, (chunk, repl)))
+                while results:
+                    yield from results.popleft().get()
+        finally:
+            if compiled is not None:
+                compiled.close()
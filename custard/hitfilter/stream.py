@@ -0,0 +1,74 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  stream.py
+@Time    :  2026/10/19 02:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  流式敏感词过滤, 按块处理大文本和分块传输的请求体
+"""
+import codecs
+
+from .automaton import ScanState
+
+# the size of the slices a chunk is lowered and scanned in, bounds the copies of large chunks
+SLICE_SIZE = 64 * 1024
+
+
+class StreamFilter:
+    """
+    Filter a text fed in chunks, with the same result as DFAFilter.filter() of the whole text
+    The automaton state is carried from one chunk to the next, so keywords spanning chunks are
+    replaced. Only the text a keyword found later might still cover is held back, it is shorter
+    than the longest keyword; memory does not grow with the length of the text.
+    Bytes chunks are decoded as UTF-8, a character split between chunks is decoded with the next one.
+    >>> stream = StreamFilter(dfa_filter)
+    >>> stream.feed("hello se") + stream.feed("xy baby") + stream.close()
+    'hello **** baby'
+    :param dfa_filter: The DFAFilter with the keywords
+    :param repl: The replacement of each character of a keyword
+    """
+
+    def __init__(self, dfa_filter, repl="*"):
+        self._automaton = dfa_filter.automaton
+        self._repl = repl
+        self._scan = ScanState()
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        # the lowered text not returned yet, starting at position `_buffer_start` of the text
+        self._buffer = ""
+        self._buffer_start = 0
+
+    def feed(self, chunk):
+        """Scan the next chunk, return the filtered text which is final so far (possibly empty)"""
+        if not isinstance(chunk, str):
+            chunk = self._decoder.decode(chunk)
+        ret = []
+        for index in range(0, len(chunk), SLICE_SIZE):
+            text = chunk[index : index + SLICE_SIZE].lower()
+            matches = list(self._automaton.iter_matches(text, self._scan))
+            ret.append(self._replace(text, matches, self._scan.final_end))
+        return "".join(ret)
+
+    def close(self):
+        """Return the rest of the filtered text after the last chunk"""
+        text = self._decoder.decode(b"", final=True).lower()
+        matches = list(self._automaton.iter_matches(text, self._scan))
+        matches.extend(self._scan.finish())
+        return self._replace(text, matches, self._scan.position)
+
+    def _replace(self, text, matches, final_end):
+        # replace the matches in the buffered text, return it up to `final_end` and keep the rest
+        buffer = self._buffer + text if self._buffer else text
+        buffer_start = self._buffer_start
+        ret = []
+        position = 0
+        for start, end, _ in matches:
+            ret.append(buffer[position : start - buffer_start])
+            ret.append(self._repl * (end - start))
+            position = end - buffer_start
+        ret.append(buffer[position : final_end - buffer_start])
+        self._buffer = buffer[final_end - buffer_start :]
+        self._buffer_start = final_end
+        return "".join(ret)
@@ -0,0 +1,146 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  compiled_test.py
+@Time    :  2026/10/19 01:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from tempfile import TemporaryDirectory
+import multiprocessing
+import os
+import random
+import stat
+import unittest
+
+from custard.hitfilter import DFAFilter
+from custard.hitfilter.automaton import KeywordAutomaton
+from custard.hitfilter.compiled import (
+    CompiledAutomaton,
+    CompiledAutomatonError,
+    compile_automaton,
+    open_compiled_automaton,
+)
+
+
+# ----------------------------------------------------------------------
+def filter_in_child_process(dfa_filter, message, results):
+    results.put(dfa_filter.filter(message))
+
+
+class CompiledAutomatonTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._directory = TemporaryDirectory()
+        self.compiled_path = os.path.join(self._directory.name, "keywords.bin")
+        self.keyword_path = os.path.join(self._directory.name, "keywords")
+        self._write_keywords("sexy\tporn\n外部关键字\tpolitics\n996\n")
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        self._directory.cleanup()
+
+    # ----------------------------------------------------------------------
+    def _write_keywords(self, content):
+        with open(self.keyword_path, "w", encoding="utf-8") as file:
+            file.write(content)
+
+    # ----------------------------------------------------------------------
+    def _create_filter(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.keyword_path = [self.keyword_path]
+        dfa_filter.parse(compiled_path=self.compiled_path)
+        self.addCleanup(self._close_filter, dfa_filter)
+        return dfa_filter
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _close_filter(dfa_filter):
+        if isinstance(dfa_filter.automaton, CompiledAutomaton):
+            dfa_filter.automaton.close()
+
+    # ----------------------------------------------------------------------
+    def test_same_matches(self):
+        generator = random.Random(42)
+        for index in range(200):
+            automaton = KeywordAutomaton()
+            for _ in range(generator.randint(1, 8)):
+                keyword = "".join(generator.choice("abc") for _ in range(generator.randint(1, 4)))
+                automaton.add(keyword, generator.choice((None, "x", "y")))
+            # a new file each time, replacing a file flushes it on some file systems
+            compiled_path = os.path.join(self._directory.name, f"{index}.bin")
+            compile_automaton(automaton, compiled_path)
+            compiled = CompiledAutomaton(compiled_path)
+            text = "".join(generator.choice("abcd") for _ in range(generator.randint(0, 40)))
+            self.assertEqual(list(compiled.iter_matches(text)), list(automaton.iter_matches(text)), text)
+            self.assertEqual(compiled.contains(text), automaton.contains(text), text)
+            self.assertEqual(compiled.keyword_count, automaton.keyword_count)
+            compiled.close()
+
+    # ----------------------------------------------------------------------
+    def test_parse_compiles_once(self):
+        dfa_filter = self._create_filter()
+        self.assertIsInstance(dfa_filter.automaton, CompiledAutomaton)
+        self.assertEqual(dfa_filter.filter("Hello SEXY 996"), "hello **** ***")
+        modified = os.stat(self.compiled_path).st_mtime_ns
+
+        dfa_filter = self._create_filter()
+        self.assertEqual(os.stat(self.compiled_path).st_mtime_ns, modified)
+        self.assertEqual(dfa_filter.filter("外部关键字"), "*****")
+        self.assertEqual(
+            sorted(dfa_filter.automaton.iter_keywords()), [("996", None), ("sexy", "porn"), ("外部关键字", "politics")]
+        )
+        self.assertEqual(dfa_filter.count_categories("sexy 外部关键字 996 sexy"), {"porn": 2, "politics": 1, None: 1})
+
+    # ----------------------------------------------------------------------
+    def test_file_mode(self):
+        umask = os.umask(0o022)
+        try:
+            self._create_filter()
+        finally:
+            os.umask(umask)
+        # readable by other users, e.g. the worker processes of a web server
+        self.assertEqual(stat.S_IMODE(os.stat(self.compiled_path).st_mode), 0o644)
+
+    # ----------------------------------------------------------------------
+    def test_recompiled_when_keywords_change(self):
+        self._create_filter()
+        # a different size, so the change is detected even with a coarse modification time
+        self._write_keywords("sexy\nbaby\n")
+        self.assertIsNone(open_compiled_automaton(self.compiled_path))
+        dfa_filter = self._create_filter()
+        self.assertEqual(dfa_filter.filter("sexy baby 996"), "**** **** 996")
+
+    # ----------------------------------------------------------------------
+    def test_recompiled_when_invalid(self):
+        with open(self.compiled_path, "wb") as file:
+            file.write(b"HFKA\x00")
+        with self.assertRaises(CompiledAutomatonError):
+            CompiledAutomaton(self.compiled_path)
+        dfa_filter = self._create_filter()
+        self.assertEqual(dfa_filter.filter("sexy"), "****")
+
+    # ----------------------------------------------------------------------
+    def test_add_after_load(self):
+        dfa_filter = self._create_filter()
+        dfa_filter.add("baby")
+        self.assertIsInstance(dfa_filter.automaton, KeywordAutomaton)
+        self.assertEqual(dfa_filter.filter("sexy baby"), "**** ****")
+        self.assertEqual(list(dfa_filter.find_matches("sexy")), [(0, 4, "sexy", "porn")])
+
+    # ----------------------------------------------------------------------
+    def test_shared_with_forked_process(self):
+        dfa_filter = self._create_filter()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        process = context.Process(target=filter_in_child_process, args=(dfa_filter, "hello sexy", results))
+        process.start()
+        self.assertEqual(results.get(timeout=10), "hello ****")
+        process.join()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,181 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  hitfilter_test.py
+@Time    :  2026/10/19 00:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from tempfile import TemporaryDirectory
+import os
+import random
+import unittest
+
+from custard.hitfilter import DFAFilter
+from custard.hitfilter.automaton import KeywordAutomaton
+
+
+# ----------------------------------------------------------------------
+def find_leftmost_longest(text, keywords):
+    """the matches by brute force: the longest keyword at the leftmost position, then behind it"""
+    matches = []
+    position = 0
+    while position < len(text):
+        length = max((len(keyword) for keyword in keywords if text.startswith(keyword, position)), default=0)
+        if length:
+            matches.append((position, position + length))
+            position += length
+        else:
+            position += 1
+    return matches
+
+
+class KeywordAutomatonTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_iter_matches(self):
+        automaton = KeywordAutomaton()
+        for keyword in ("he", "she", "his", "hers"):
+            automaton.add(keyword)
+        self.assertEqual(list(automaton.iter_matches("ushers")), [(1, 4, None)])
+        self.assertEqual(list(automaton.iter_matches("ahishers")), [(1, 4, None), (4, 8, None)])
+        self.assertEqual(list(automaton.iter_matches("nothing")), [])
+        self.assertEqual(list(automaton.iter_matches("")), [])
+
+    # ----------------------------------------------------------------------
+    def test_add(self):
+        automaton = KeywordAutomaton()
+        self.assertTrue(automaton.add("ab"))
+        self.assertFalse(automaton.add("ab"))
+        self.assertFalse(automaton.add(""))
+        self.assertEqual(automaton.keyword_count, 1)
+        self.assertEqual(list(automaton.iter_matches("abc")), [(0, 2, None)])
+        # keywords added after a scan are picked up by the next scan
+        automaton.add("abc")
+        self.assertEqual(list(automaton.iter_matches("abc")), [(0, 3, None)])
+
+    # ----------------------------------------------------------------------
+    def test_categories(self):
+        automaton = KeywordAutomaton()
+        automaton.add("he", "pronoun")
+        automaton.add("hers")
+        automaton.add("she", "pronoun")
+        self.assertEqual(
+            list(automaton.iter_matches("he hers she")), [(0, 2, "pronoun"), (3, 7, None), (8, 11, "pronoun")]
+        )
+        # tagging an existing keyword replaces its category
+        self.assertFalse(automaton.add("hers", "pronoun"))
+        self.assertEqual(list(automaton.iter_matches("hers")), [(0, 4, "pronoun")])
+
+    # ----------------------------------------------------------------------
+    def test_contains(self):
+        automaton = KeywordAutomaton()
+        for keyword in ("he", "she", "his", "hers"):
+            automaton.add(keyword)
+        self.assertTrue(automaton.contains("ushers"))
+        self.assertTrue(automaton.contains("this"))
+        self.assertFalse(automaton.contains("nothing"))
+        self.assertFalse(automaton.contains(""))
+
+    # ----------------------------------------------------------------------
+    def test_against_brute_force(self):
+        generator = random.Random(42)
+        for _ in range(500):
+            keywords = {
+                "".join(generator.choice("abc") for _ in range(generator.randint(1, 4)))
+                for _ in range(generator.randint(1, 6))
+            }
+            automaton = KeywordAutomaton()
+            for keyword in keywords:
+                automaton.add(keyword)
+            text = "".join(generator.choice("abcd") for _ in range(generator.randint(0, 40)))
+            matches = find_leftmost_longest(text, keywords)
+            self.assertEqual(
+                [(start, end) for start, end, _ in automaton.iter_matches(text)], matches, (keywords, text)
+            )
+            self.assertEqual(automaton.contains(text), bool(matches), (keywords, text))
+
+
+class DFAFilterTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_filter(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.add("sexy")
+        self.assertEqual(dfa_filter.filter("hello sexy baby"), "hello **** baby")
+        self.assertEqual(dfa_filter.filter("hello sexy baby", repl="#"), "hello #### baby")
+        # keywords and messages are matched case-insensitively, the result is lower case
+        self.assertEqual(dfa_filter.filter("Hello SEXY Baby"), "hello **** baby")
+        self.assertEqual(dfa_filter.filter("hello sexy baby".encode("utf-8")), "hello **** baby")
+
+    # ----------------------------------------------------------------------
+    def test_filter_longest_match(self):
+        dfa_filter = DFAFilter()
+        for keyword in ("1989", "1989年", "年5月"):
+            dfa_filter.add(keyword)
+        self.assertEqual(dfa_filter.filter("1989年5月8日"), "*****5月8日")
+        self.assertEqual(dfa_filter.filter("1988年5月8日"), "1988***8日")
+
+    # ----------------------------------------------------------------------
+    def test_add_normalizes_keywords(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.add(" SeXy \n".encode("utf-8"))
+        dfa_filter.add("   ")
+        self.assertEqual(dfa_filter.automaton.keyword_count, 1)
+        self.assertEqual(dfa_filter.filter("sexy"), "****")
+
+    # ----------------------------------------------------------------------
+    def test_keyword_chains(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.add("ab", "tag")
+        dfa_filter.add("abc")
+        dfa_filter.add("年")
+        # the nested dict trie of the former implementation
+        self.assertEqual(
+            dfa_filter.keyword_chains,
+            {"a": {"b": {dfa_filter.delimit: 0, "c": {dfa_filter.delimit: 0}}}, "年": {dfa_filter.delimit: 0}},
+        )
+        self.assertEqual(sorted(dfa_filter.automaton.iter_keywords()), [("ab", "tag"), ("abc", None), ("年", None)])
+
+        dfa_filter.keyword_chains = {"x": {"y": {"\x00": 0}}}
+        self.assertEqual(dfa_filter.filter("ab xy"), "ab **")
+        dfa_filter.keyword_chains = {}
+        self.assertEqual(dfa_filter.filter("ab xy"), "ab xy")
+
+    # ----------------------------------------------------------------------
+    def test_is_contain_sensitive_key_word(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.add("sexy")
+        self.assertTrue(dfa_filter.is_contain_sensitive_key_word("hello sexy baby"))
+        self.assertFalse(dfa_filter.is_contain_sensitive_key_word("hello baby"))
+
+    # ----------------------------------------------------------------------
+    def test_find_matches(self):
+        dfa_filter = DFAFilter()
+        dfa_filter.add("sexy", "porn")
+        dfa_filter.add("996")
+        matches = dfa_filter.find_matches("Hello SEXY 996 sexy")
+        self.assertEqual(next(matches), (6, 10, "sexy", "porn"))
+        self.assertEqual(list(matches), [(11, 14, "996", None), (15, 19, "sexy", "porn")])
+        self.assertEqual(dfa_filter.count_categories("sexy 996 sexy"), {"porn": 2, None: 1})
+        self.assertEqual(dfa_filter.count_categories("hello"), {})
+        self.assertTrue(dfa_filter.contains("SEXY".encode("utf-8")))
+        self.assertFalse(dfa_filter.contains("hello"))
+
+    # ----------------------------------------------------------------------
+    def test_parse(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "keywords")
+            with open(path, "w", encoding="utf-8") as file:
+                file.write("外部关键字\tpolitics\n996\n\n")
+            dfa_filter = DFAFilter()
+            dfa_filter.parse(path)
+        self.assertEqual(dfa_filter.filter("外部关键字 996"), "***** ***")
+        self.assertEqual(list(dfa_filter.find_matches("外部关键字 996")), [(0, 5, "外部关键字", "politics"), (6, 9, "996", None)])
+        self.assertTrue(dfa_filter.is_contain_sensitive_key_word("一氧化汞"))
+        self.assertEqual(dfa_filter.filter("今天天气不错"), "今天天气不错")
+
+
+if __name__ == "__main__":
+    unittest.main()
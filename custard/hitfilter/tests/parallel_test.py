@@ -0,0 +1,62 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  parallel_test.py
+@Time    :  2026/10/19 02:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from tempfile import TemporaryDirectory
+import os
+import pickle
+import unittest
+
+from custard.hitfilter import CompiledAutomaton, DFAFilter
+
+
+class FilterManyTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.dfa_filter = DFAFilter()
+        self.dfa_filter.add("sexy")
+        self.dfa_filter.add("1989年")
+        self.messages = [f"message {index} sexy" if index % 3 else f"{index} 1989年" for index in range(100)]
+        self.expected = [self.dfa_filter.filter(message) for message in self.messages]
+
+    # ----------------------------------------------------------------------
+    def test_keeps_order(self):
+        results = self.dfa_filter.filter_many(iter(self.messages), processes=2, chunk_size=7, context="fork")
+        self.assertEqual(list(results), self.expected)
+
+    # ----------------------------------------------------------------------
+    def test_single_process(self):
+        messages = [message.encode("utf-8") for message in self.messages]
+        self.assertEqual(list(self.dfa_filter.filter_many(messages, processes=1)), self.expected)
+        self.assertEqual(list(self.dfa_filter.filter_many([], processes=2)), [])
+
+    # ----------------------------------------------------------------------
+    def test_spawned_workers_map_the_compiled_automaton(self):
+        results = self.dfa_filter.filter_many(self.messages, repl="#", processes=2, chunk_size=30, context="spawn")
+        self.assertEqual(list(results), [self.dfa_filter.filter(message, "#") for message in self.messages])
+
+    # ----------------------------------------------------------------------
+    def test_pickle_compiled_automaton(self):
+        with TemporaryDirectory() as directory:
+            keyword_path = os.path.join(directory, "keywords")
+            with open(keyword_path, "w", encoding="utf-8") as file:
+                file.write("sexy\tporn\n")
+            dfa_filter = DFAFilter()
+            dfa_filter.keyword_path = [keyword_path]
+            dfa_filter.parse(compiled_path=os.path.join(directory, "keywords.bin"))
+            unpickled = pickle.loads(pickle.dumps(dfa_filter))
+            self.assertIsInstance(unpickled.automaton, CompiledAutomaton)
+            self.assertEqual(list(unpickled.find_matches("sexy")), [(0, 4, "sexy", "porn")])
+            unpickled.automaton.close()
+            dfa_filter.automaton.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
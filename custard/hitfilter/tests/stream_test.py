@@ -0,0 +1,109 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  stream_test.py
+@Time    :  2026/10/19 02:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from tempfile import TemporaryDirectory
+from unittest import mock
+import asyncio
+import os
+import random
+import unittest
+
+from custard.hitfilter import DFAFilter, StreamFilter
+from custard.hitfilter import stream as stream_module
+
+
+# ----------------------------------------------------------------------
+def split_randomly(text, generator):
+    chunks = []
+    position = 0
+    while position < len(text):
+        length = generator.randint(0, 6)
+        chunks.append(text[position : position + length])
+        position += length
+    return chunks
+
+
+class StreamFilterTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.dfa_filter = DFAFilter()
+        for keyword in ("sexy", "1989", "1989年", "年5月"):
+            self.dfa_filter.add(keyword)
+
+    # ----------------------------------------------------------------------
+    def test_keyword_spanning_chunks(self):
+        chunks = ["hello SE", "x", "y baby 19", "89年5月8日"]
+        self.assertEqual("".join(self.dfa_filter.filter_stream(chunks)), "hello **** baby *****5月8日")
+        self.assertEqual("".join(self.dfa_filter.filter_stream(["sex", "y"], repl="#")), "####")
+        self.assertEqual(list(self.dfa_filter.filter_stream([])), [])
+
+    # ----------------------------------------------------------------------
+    def test_same_as_filter(self):
+        generator = random.Random(42)
+        for _ in range(300):
+            dfa_filter = DFAFilter()
+            for _ in range(generator.randint(1, 6)):
+                dfa_filter.add("".join(generator.choice("abc") for _ in range(generator.randint(1, 5))))
+            text = "".join(generator.choice("abcdAB") for _ in range(generator.randint(0, 60)))
+            chunks = split_randomly(text, generator)
+            self.assertEqual("".join(dfa_filter.filter_stream(chunks)), dfa_filter.filter(text), chunks)
+
+    # ----------------------------------------------------------------------
+    def test_bytes_chunks(self):
+        encoded = "1989年5月8日 sexy".encode("utf-8")
+        # split inside the UTF-8 sequences of the Chinese characters
+        chunks = [encoded[index : index + 1] for index in range(len(encoded))]
+        self.assertEqual("".join(self.dfa_filter.filter_stream(chunks)), "*****5月8日 ****")
+
+    # ----------------------------------------------------------------------
+    def test_bounded_buffer(self):
+        stream = StreamFilter(self.dfa_filter)
+        output = []
+        for _ in range(1000):
+            output.append(stream.feed("今天天气不错 sex"))
+            output.append(stream.feed("y 198"))
+            # only the text a keyword might still cover is held back
+            self.assertLessEqual(len(stream._buffer), len("1989年"))
+        output.append(stream.close())
+        self.assertEqual("".join(output), "今天天气不错 **** 198" * 1000)
+
+    # ----------------------------------------------------------------------
+    def test_large_chunk_is_sliced(self):
+        text = "sexy baby " * 10
+        with mock.patch.object(stream_module, "SLICE_SIZE", 7):
+            self.assertEqual("".join(self.dfa_filter.filter_stream([text])), self.dfa_filter.filter(text))
+
+    # ----------------------------------------------------------------------
+    def test_compiled_automaton(self):
+        with TemporaryDirectory() as directory:
+            keyword_path = os.path.join(directory, "keywords")
+            with open(keyword_path, "w", encoding="utf-8") as file:
+                file.write("sexy\n1989年\n")
+            dfa_filter = DFAFilter()
+            dfa_filter.keyword_path = [keyword_path]
+            dfa_filter.parse(compiled_path=os.path.join(directory, "keywords.bin"))
+            self.assertEqual("".join(dfa_filter.filter_stream(["se", "xy 19", "89", "年"])), "**** *****")
+            dfa_filter.automaton.close()
+
+    # ----------------------------------------------------------------------
+    def test_filter_async_stream(self):
+        async def iter_chunks():
+            for chunk in ("hello se", b"xy", " baby"):
+                yield chunk
+
+        async def collect():
+            return [chunk async for chunk in self.dfa_filter.filter_async_stream(iter_chunks())]
+
+        self.assertEqual("".join(asyncio.run(collect())), "hello **** baby")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  beats_benchmark.py
+@Time    :  2026/10/18 23:55
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  高延迟 Beats 链路: 每次发送新建连接且固定窗口 vs 持久连接且自适应窗口的吞吐量
+"""
+import sys
+import time
+
+from custard.logstash.benchmarks.servers import BeatsStandInServer
+from custard.logstash.constants import constants
+from custard.logstash.transport import BeatsTransport
+
+
+def run(name, count, batch_size, keep_connection, window_size_max):
+    constants.BEATS_WINDOW_SIZE_MAX = window_size_max
+    received = []
+    # every acknowledgement takes 5ms, like a round trip to a remote data center
+    server = BeatsStandInServer(received.append, ack_delay=0.005)
+    server.start()
+    transport = BeatsTransport(
+        "127.0.0.1", server.port, False, False, None, None, None, timeout=5.0, keep_connection=keep_connection
+    )
+    events = [f'{{"message": "benchmark event {index}"}}' for index in range(batch_size)]
+    started = time.perf_counter()
+    for _ in range(count // batch_size):
+        transport.send(events)
+    elapsed = time.perf_counter() - started
+    transport.close()
+    server.stop()
+    stats = transport.stats()
+    print(
+        f"{name:<40} {len(received) / elapsed:>8.0f} events/s  {server.connection_count:>4} connections  "
+        f"window {stats.window_size:>4}  average window latency {stats.average_latency * 1000:.1f}ms"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    batch_size = 500
+    run("connection per send, fixed window of 10", count, batch_size, keep_connection=False, window_size_max=10)
+    run("persistent connection, adaptive window", count, batch_size, keep_connection=True, window_size_max=1024)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  circuit_breaker_benchmark.py
+@Time    :  2026/10/18 23:30
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  Logstash 不可达期间: 关闭/开启熔断器时的缓存读取与连接尝试次数
+"""
+import sys
+import time
+
+from custard.logstash.constants import constants
+from custard.logstash.worker import LogProcessingWorker
+
+
+class UnreachableTransport:
+    """every send attempt fails like a refused connection"""
+
+    def __init__(self):
+        self.send_count = 0
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        self.send_count += 1
+        raise ConnectionError("Connection refused")
+
+    def close(self):
+        pass
+
+
+def run(name, duration, failure_threshold):
+    constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD = failure_threshold
+    transport = UnreachableTransport()
+    worker = LogProcessingWorker(
+        host="localhost",
+        port=5959,
+        transport=transport,
+        ssl_enable=False,
+        ssl_verify=False,
+        keyfile=None,
+        certfile=None,
+        ca_certs=None,
+        database_path=None,
+        cache={},
+        event_ttl=None,
+    )
+    worker._safe_log = lambda *args, **kwargs: None  # pylint: disable=protected-access
+    worker.start()
+    for index in range(1000):
+        worker.enqueue_event(f"message {index}".encode())
+    time.sleep(0.5)  # the worker thread sets up its cache
+    database = worker._database  # pylint: disable=protected-access
+    get_queued_events = database.get_queued_events
+    read_events = []
+
+    def counting_get_queued_events(batch_size=None):
+        events = get_queued_events(batch_size=batch_size)
+        read_events.append(len(events))
+        return events
+
+    database.get_queued_events = counting_get_queued_events
+    time.sleep(duration)
+    worker.shutdown()
+    worker.join()
+    print(
+        f"{name:<30} {len(read_events):>6} cache reads {sum(read_events):>8} events read "
+        f"{transport.send_count:>6} send attempts"
+    )
+
+
+def main():
+    duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    constants.QUEUE_CHECK_INTERVAL = 0.01
+    constants.QUEUED_EVENTS_FLUSH_INTERVAL = 0.0
+    constants.CIRCUIT_BREAKER_BACKOFF_MIN = 0.5
+    constants.CIRCUIT_BREAKER_BACKOFF_MAX = 2.0
+    run("without circuit breaker", duration, failure_threshold=None)
+    run("with circuit breaker", duration, failure_threshold=3)
+
+
+if __name__ == "__main__":
+    main()
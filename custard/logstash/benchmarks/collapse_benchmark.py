@@ -0,0 +1,75 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  collapse_benchmark.py
+@Time    :  2026/10/18 20:15
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  故障风暴: 重复日志折叠前后写入缓存的事件数、发送字节数与处理耗时
+"""
+import logging
+import sys
+import time
+
+from custard.logstash.handler import AsynchronousLogstashHandler
+
+
+class CountingTransport:
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self.event_count = 0
+        self.byte_count = 0
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        self.event_count += len(events)
+        self.byte_count += sum(len(event) for event in events)
+
+    def close(self):
+        pass
+
+
+def fetch(url):
+    raise ConnectionError(f"connection to {url} refused")
+
+
+def create_records(count, site_count):
+    """an incident storm: the same few errors over and over again"""
+    logger = logging.getLogger("benchmark")
+    records = []
+    for index in range(count):
+        try:
+            fetch(f"http://backend-{index % site_count}/items")
+        except ConnectionError:
+            exc_info = sys.exc_info()
+        records.append(
+            logger.makeRecord(
+                "benchmark", logging.ERROR, __file__, 42, "request %d failed", (index,), exc_info=exc_info
+            )
+        )
+        # one exception site per message template
+        records[-1].msg = f"request %d to backend {index % site_count} failed"
+    return records
+
+
+def run(name, records, **kwargs):
+    transport = CountingTransport()
+    handler = AsynchronousLogstashHandler("localhost", 5959, None, transport=transport, **kwargs)
+    started = time.perf_counter()
+    for record in records:
+        handler.emit(record)
+    handler.close()
+    elapsed = time.perf_counter() - started
+    print(f"{name:<20} {transport.event_count:>8} events  {transport.byte_count / 1024:>10.0f} KiB  {elapsed:>6.2f} s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records = create_records(count, site_count=10)
+    run("immediate", records)
+    run("deferred", records, deferred_formatting=True)
+    run("collapse_duplicates", records, collapse_duplicates=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  compression_benchmark.py
+@Time    :  2026/10/18 15:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  HTTP/TCP 传输压缩: 不同算法与级别下每 1 万条事件的线上字节数与 CPU 耗时
+"""
+from threading import Lock
+import json
+import random
+import time
+
+from custard.logstash.benchmarks.servers import HttpStandInServer, TcpStandInServer
+from custard.logstash.transport import HttpTransport, TcpTransport
+from custard.logstash.utils import compress
+
+EVENT_COUNT = 10000
+EVENTS_PER_FLUSH = 500
+SETTINGS = [(None, None)] + [(method, level) for method in ("gzip", "deflate") for level in (1, 3, 6, 9)]
+
+
+def create_events():
+    rnd = random.Random(42)
+    paths = ["/api/v1/items", "/api/v1/users", "/api/v1/orders", "/health", "/login"]
+    levels = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+    events = []
+    for index in range(EVENT_COUNT):
+        event = {
+            "@timestamp": f"2023-01-30T07:{index // 600 % 60:02d}:{index // 10 % 60:02d}.{rnd.randrange(1000):03d}Z",
+            "@version": "1",
+            "host": f"app-{rnd.randrange(4):02d}",
+            "level": rnd.choice(levels),
+            "logsource": "app",
+            "message": f"request {rnd.getrandbits(64):016x} handled in {rnd.random() * 100:.2f} ms",
+            "pid": rnd.randrange(1000, 1100),
+            "program": "server.py",
+            "type": "python-logstash",
+            "extra": {"path": rnd.choice(paths), "status_code": rnd.choice([200, 200, 200, 201, 404, 500])},
+        }
+        events.append(json.dumps(event).encode("utf-8") + b"\n")
+    return events
+
+
+def measure_compression(events, method, level):
+    """CPU time to compress the events in flushes as the HTTP transport does"""
+    if method is None:
+        return 0.0
+    started = time.process_time()
+    for offset in range(0, len(events), EVENTS_PER_FLUSH):
+        compress(
+            b"[" + b",".join(event.rstrip() for event in events[offset : offset + EVENTS_PER_FLUSH]) + b"]",
+            method,
+            level,
+        )
+    return time.process_time() - started
+
+
+def measure_http(events, method, level):
+    received = []
+    server = HttpStandInServer(lambda body, headers: received.append(len(body)))
+    server.start()
+    kwargs = {} if method is None else {"compression": method, "compression_level": level}
+    transport = HttpTransport("127.0.0.1", server.port, ssl_enable=False, **kwargs)
+    started = time.perf_counter()
+    for offset in range(0, len(events), EVENTS_PER_FLUSH):
+        transport.send(events[offset : offset + EVENTS_PER_FLUSH])
+    elapsed = time.perf_counter() - started
+    transport.close()
+    server.stop()
+    return sum(received), elapsed
+
+
+def measure_tcp(events, method, level):
+    lock = Lock()
+    received = [0]
+
+    def on_event(line):
+        with lock:
+            received[0] += len(line)
+
+    server = TcpStandInServer(on_event)
+    server.start()
+    kwargs = {} if method is None else {"compression": method, "compression_level": level}
+    transport = TcpTransport("127.0.0.1", server.port, False, False, None, None, None, **kwargs)
+    for offset in range(0, len(events), EVENTS_PER_FLUSH):
+        transport.send(events[offset : offset + EVENTS_PER_FLUSH])
+    # wait until the server read everything before counting
+    time.sleep(0.5)
+    server.stop()
+    return received[0]
+
+
+def main():
+    events = create_events()
+    raw_size = sum(len(event) for event in events)
+    print(f"{EVENT_COUNT} events, {raw_size / EVENT_COUNT:.0f} bytes/event, {EVENTS_PER_FLUSH} events/flush")
+    print(f"{'setting':<12} {'http bytes':>12} {'ratio':>7} {'tcp bytes':>12} {'cpu ms/10k':>11} {'http s':>8}")
+    for method, level in SETTINGS:
+        name = "none" if method is None else f"{method}-{level}"
+        cpu = measure_compression(events, method, level)
+        http_bytes, http_elapsed = measure_http(events, method, level)
+        tcp_bytes = measure_tcp(events, method, level)
+        print(
+            f"{name:<12} {http_bytes:>12} {raw_size / http_bytes:>7.2f} {tcp_bytes:>12} "
+            f"{cpu * 1000 * 10000 / EVENT_COUNT:>11.1f} {http_elapsed:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  database_benchmark.py
+@Time    :  2026/10/18 10:12
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  DatabaseCache 写入吞吐对比: 逐条提交 vs spool 批量写入
+"""
+import os
+import sys
+import tempfile
+import time
+
+from custard.logstash.database import DatabaseCache
+
+EVENT_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+BATCH_SIZE = 50
+EVENT = b'{"@timestamp": "2023-01-30T07:05:35.025Z", "level": "INFO", "message": "benchmark event"}\n'
+
+
+def bench_add_event(path):
+    """one connection, schema initialization and commit per event (default mode)"""
+    cache = DatabaseCache(path)
+    started = time.perf_counter()
+    for _ in range(EVENT_COUNT):
+        cache.add_event(EVENT)
+    return time.perf_counter() - started
+
+
+def bench_spool_add_event(path):
+    """long-lived WAL connection, one transaction per event"""
+    cache = DatabaseCache(path, spool=True)
+    started = time.perf_counter()
+    for _ in range(EVENT_COUNT):
+        cache.add_event(EVENT)
+    elapsed = time.perf_counter() - started
+    cache.close()
+    return elapsed
+
+
+def bench_spool_add_events(path):
+    """long-lived WAL connection, one executemany transaction per batch"""
+    cache = DatabaseCache(path, spool=True)
+    started = time.perf_counter()
+    for _ in range(EVENT_COUNT // BATCH_SIZE):
+        cache.add_events([EVENT] * BATCH_SIZE)
+    elapsed = time.perf_counter() - started
+    cache.close()
+    return elapsed
+
+
+def main():
+    benchmarks = (
+        ("add_event", bench_add_event),
+        ("spool/add_event", bench_spool_add_event),
+        ("spool/add_events", bench_spool_add_events),
+    )
+    for name, bench in benchmarks:
+        with tempfile.TemporaryDirectory() as directory:
+            elapsed = bench(os.path.join(directory, "benchmark.db"))
+        print(f"{name:<20} {EVENT_COUNT / elapsed:>12.0f} events/s ({elapsed:.3f}s for {EVENT_COUNT} events)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  endpoints_benchmark.py
+@Time    :  2026/10/18 21:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  慢速 Logstash 端点: 单一 worker vs 按端点分片的多个 worker 的吞吐量
+"""
+import logging
+import sys
+import time
+
+from custard.logstash.constants import constants
+from custard.logstash.handler import AsynchronousLogstashHandler
+
+
+class SlowTransport:
+    """every batch takes `latency` seconds, like a busy Logstash behind a long round trip"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.event_count = 0
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        time.sleep(self.latency)
+        self.event_count += len(events)
+
+    def close(self):
+        pass
+
+
+def run(name, count, endpoints=None, **kwargs):
+    transports = {}
+
+    def create_transport(host, port, **kwargs):  # pylint: disable=unused-argument
+        return transports.setdefault((host, port), SlowTransport(0.02))
+
+    handler = AsynchronousLogstashHandler(
+        "host-0", 5959, None, transport=create_transport, endpoints=endpoints, **kwargs
+    )
+    record = logging.getLogger("benchmark").makeRecord("benchmark", logging.INFO, __file__, 42, "message", (), None)
+    started = time.perf_counter()
+    for _ in range(count):
+        handler.emit(record)
+    handler.flush()
+    while sum(transport.event_count for transport in transports.values()) < count:
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - started
+    handler.close()
+    print(f"{name:<40} {count / elapsed:>8.0f} events/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    constants.QUEUED_EVENTS_FLUSH_INTERVAL = 0.05
+    constants.QUEUED_EVENTS_BATCH_SIZE = 50
+    endpoints = [(f"host-{index}", 5959) for index in range(4)]
+    run("single worker", count)
+    run("4 endpoints, round_robin", count, endpoints=endpoints)
+    run(
+        "4 endpoints x 2 workers, least_backlog",
+        count,
+        endpoints=endpoints,
+        routing="least_backlog",
+        workers_per_endpoint=2,
+    )
+
+
+if __name__ == "__main__":
+    main()
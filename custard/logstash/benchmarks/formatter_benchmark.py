@@ -0,0 +1,85 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  formatter_benchmark.py
+@Time    :  2026/10/18 17:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  LogstashFormatter: 通用布局 (旧实现) vs 预编译布局 + 异常堆栈缓存
+"""
+from datetime import datetime
+import logging
+import sys
+import time
+import traceback
+
+from custard.logstash.formatter import LogstashFormatter
+
+
+class LegacyLogstashFormatter(LogstashFormatter):
+    """the previous implementation: generic layout and a full timestamp conversion per record"""
+
+    def format(self, record):
+        return self._serialize(self._build_message(record))
+
+    def _format_timestamp(self, time_):
+        timestamp = datetime.utcfromtimestamp(time_)
+        formatted_timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S")
+        microsecond = int(timestamp.microsecond / 1000)
+        return f"{formatted_timestamp}.{microsecond:03}Z"
+
+    def _format_exception(self, exc_info):
+        return "".join(traceback.format_exception(*exc_info))
+
+
+def fetch(url, depth=5):
+    if depth:
+        fetch(url, depth - 1)
+    raise ConnectionError(f"connection to {url} refused")
+
+
+def create_records(count, extra, exception=False):
+    logger = logging.getLogger("benchmark")
+    records = []
+    for index in range(count):
+        exc_info = None
+        if exception:
+            try:
+                fetch(f"http://backend/{index}")
+            except ConnectionError:
+                exc_info = sys.exc_info()
+        records.append(
+            logger.makeRecord("benchmark", logging.INFO, __file__, 42, "handled %s", (index,), exc_info, extra=extra)
+        )
+    return records
+
+
+def run(name, formatter, records):
+    started = time.perf_counter()
+    for record in records:
+        formatter.format(record)
+    elapsed = time.perf_counter() - started
+    return elapsed / len(records) * 1e6
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    shapes = {
+        "plain": None,
+        "3 extra fields": {"request_id": "req-1", "status_code": 200, "path": "/api/items"},
+        "nested extra": {"user": {"id": 1, "roles": ["admin", "user"]}, "items": list(range(10))},
+        "exception": None,
+    }
+    for shape, extra in shapes.items():
+        records = create_records(count, extra, exception=shape == "exception")
+        legacy = run("legacy", LegacyLogstashFormatter(), records)
+        compiled = run("compiled", LogstashFormatter(), records)
+        print(
+            f"{shape:<16} legacy {legacy:>6.2f} us/record  compiled {compiled:>6.2f} us/record  {legacy / compiled:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  handler_benchmark.py
+@Time    :  2026/10/18 17:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  AsynchronousLogstashHandler.emit 延迟 (p50/p99): 调用线程格式化 vs 延迟到工作线程格式化
+"""
+import logging
+import sys
+import time
+
+from custard.logstash.handler import AsynchronousLogstashHandler
+
+
+class NullTransport:
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        pass
+
+    def close(self):
+        pass
+
+
+def create_records(count):
+    logger = logging.getLogger("benchmark")
+    records = []
+    for index in range(count):
+        extra = {"request_id": f"req-{index}", "user": {"id": index, "roles": ["admin", "user"]}, "path": "/api/items"}
+        exc_info = None
+        if index % 20 == 0:
+            try:
+                raise ValueError(f"invalid item {index}")
+            except ValueError:
+                exc_info = sys.exc_info()
+        records.append(
+            logger.makeRecord(
+                "benchmark", logging.INFO, __file__, 42, "handled %s in %.2f ms", (index, 1.5), exc_info, extra=extra
+            )
+        )
+    return records
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def run(name, records, deferred_formatting):
+    handler = AsynchronousLogstashHandler(
+        "localhost", 5959, None, transport=NullTransport(), deferred_formatting=deferred_formatting
+    )
+    durations = []
+    for record in records:
+        started = time.perf_counter()
+        handler.emit(record)
+        durations.append(time.perf_counter() - started)
+    handler.close()
+    durations.sort()
+    print(
+        f"{name:<12} p50 {percentile(durations, 0.5) * 1e6:>7.1f} us  p99 {percentile(durations, 0.99) * 1e6:>7.1f} us  "
+        f"mean {sum(durations) / len(durations) * 1e6:>7.1f} us"
+    )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    records = create_records(count)
+    run("immediate", records, deferred_formatting=False)
+    run("deferred", records, deferred_formatting=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  http_benchmark.py
+@Time    :  2026/10/18 14:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  HttpTransport 吞吐: 每次 flush 新建 session + 逐条重序列化 vs 长连接 + 字节拼接
+"""
+import json
+import time
+
+import requests
+
+from custard.logstash.benchmarks.servers import HttpStandInServer
+from custard.logstash.transport import HttpTransport
+
+FLUSHES = 100
+EVENTS_PER_FLUSH = 500
+EVENT = (
+    b'{"@timestamp": "2023-01-30T07:05:35.025Z", "@version": "1", "host": "app-01", "level": "INFO", '
+    b'"message": "request handled", "extra": {"path": "/api/v1/items", "status_code": 200}}\n'
+)
+
+
+def legacy_send(url, events, max_content_length=100 * 1024 * 1024):
+    """the previous implementation: a new session per flush and a JSON round trip per event"""
+    session = requests.Session()
+    batches = []
+    current_batch = []
+    for event in events:
+        obj = json.loads(event)
+        if len(json.dumps(current_batch + [obj]).encode("utf8")) > max_content_length:
+            batches.append(current_batch)
+            current_batch = [obj]
+        else:
+            current_batch += [obj]
+    batches.append(current_batch)
+    for batch in batches:
+        session.post(url, headers={"Content-Type": "application/json"}, json=batch).raise_for_status()
+    session.close()
+
+
+def run(name, send):
+    events = [EVENT] * EVENTS_PER_FLUSH
+    started = time.perf_counter()
+    for _ in range(FLUSHES):
+        send(events)
+    elapsed = time.perf_counter() - started
+    print(
+        f"{name:<24} {FLUSHES * EVENTS_PER_FLUSH / elapsed:>10.0f} events/s  {elapsed / FLUSHES * 1000:>8.2f} ms/flush"
+    )
+
+
+def main():
+    server = HttpStandInServer(lambda body, headers: None)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}"
+    transport = HttpTransport("127.0.0.1", server.port, ssl_enable=False)
+
+    run("legacy", lambda events: legacy_send(url, events))
+    connection_count = server.connection_count
+    run("HttpTransport", transport.send)
+    print(f"connections: legacy {connection_count}, HttpTransport {server.connection_count - connection_count}")
+
+    transport.close()
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  queue_benchmark.py
+@Time    :  2026/10/18 12:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  PriorityQueue 与 EventQueue 的 put/get 微基准
+"""
+from queue import Empty, PriorityQueue
+from threading import Thread
+import time
+
+from custard.logstash.event_queue import OVERFLOW_DROP_OLDEST, EventQueue
+
+EVENT_COUNT = 200000
+# realistic payloads: a common prefix makes the heap comparisons of PriorityQueue expensive
+EVENTS = [
+    b'{"@timestamp": "2023-01-30T07:05:35.025Z", "@version": "1", "host": "app-01", "level": "INFO", '
+    b'"message": "request %d handled"}\n' % index
+    for index in range(EVENT_COUNT)
+]
+
+
+def bench_single_thread(queue):
+    started = time.perf_counter()
+    for event in EVENTS:
+        queue.put(event)
+    while True:
+        try:
+            queue.get_nowait()
+        except Empty:
+            break
+    return time.perf_counter() - started
+
+
+def bench_producer_consumer(queue):
+    def produce():
+        for event in EVENTS:
+            queue.put(event)
+
+    started = time.perf_counter()
+    producer = Thread(target=produce)
+    producer.start()
+    while True:
+        try:
+            queue.get_nowait()
+        except Empty:
+            if not producer.is_alive() and not queue.qsize():
+                break
+            time.sleep(0)
+    producer.join()
+    return time.perf_counter() - started
+
+
+def main():
+    queues = (
+        ("PriorityQueue", PriorityQueue),
+        ("EventQueue", EventQueue),
+        ("EventQueue(bounded)", lambda: EventQueue(maxsize=10000, overflow=OVERFLOW_DROP_OLDEST)),
+    )
+    for bench in (bench_single_thread, bench_producer_consumer):
+        for name, queue_factory in queues:
+            queue = queue_factory()
+            elapsed = bench(queue)
+            dropped = getattr(queue, "dropped_count", 0)
+            print(f"{bench.__name__:<24} {name:<20} {EVENT_COUNT / elapsed:>12.0f} events/s ({dropped} dropped)")
+
+
+if __name__ == "__main__":
+    main()
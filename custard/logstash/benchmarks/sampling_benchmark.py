@@ -0,0 +1,54 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  sampling_benchmark.py
+@Time    :  2026/10/18 21:00
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  RecordSampler: 被采样丢弃 / 被令牌桶限流的记录在 emit() 中的耗时 vs 正常格式化的记录
+"""
+import logging
+import sys
+import time
+
+from custard.logstash.handler import AsynchronousLogstashHandler
+from custard.logstash.sampling import RecordSampler
+
+
+class NullTransport:
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        pass
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        pass
+
+    def close(self):
+        pass
+
+
+def run(name, sampler, count):
+    handler = AsynchronousLogstashHandler("localhost", 5959, None, transport=NullTransport(), sampler=sampler)
+    record = logging.getLogger("benchmark").makeRecord(
+        "benchmark", logging.DEBUG, __file__, 42, "handled %s", ("request",), None
+    )
+    handler.emit(record)  # start the worker thread
+    started = time.perf_counter()
+    for _ in range(count):
+        handler.emit(record)
+    elapsed = time.perf_counter() - started
+    handler.close()
+    print(f"{name:<24} {elapsed / count * 1e9:>8.0f} ns/record")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    run("no sampler", None, count // 10)
+    run("sampled out (rate 1e-9)", RecordSampler(sample_rates={logging.DEBUG: 1e-9}), count)
+    run("logger rate limited", RecordSampler(logger_rate_limit=(1e-9, 1)), count)
+    run("level rate limited", RecordSampler(level_rate_limits={logging.DEBUG: (1e-9, 1)}), count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  servers.py
+@Time    :  2026/10/18 11:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  本地 Logstash 替身服务, 供基准测试使用
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+import os
+import socket
+import socketserver
+import struct
+import subprocess
+import time
+import zlib
+
+
+def create_self_signed_certificate(directory):
+    """Create a self-signed certificate for 127.0.0.1 using the openssl command line tool.
+
+    :return: The paths of the certificate and the key file
+    """
+    certfile = os.path.join(directory, "cert.pem")
+    keyfile = os.path.join(directory, "key.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1", "-subj", "/CN=127.0.0.1"]
+        + ["-keyout", keyfile, "-out", certfile],
+        check=True,
+        capture_output=True,
+    )
+    return certfile, keyfile
+
+
+class _LineHandler(socketserver.StreamRequestHandler):
+    def setup(self):
+        super().setup()
+        with self.server.connections_lock:
+            self.server.connection_count += 1
+            self.server.connections.add(self.connection)
+
+    def handle(self):
+        try:
+            for line in self.rfile:
+                self.server.on_event(line)
+        except OSError:
+            pass  # closed by close_connections()
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.connection)
+        super().finish()
+
+
+class TcpStandInServer(socketserver.ThreadingTCPServer):
+    """Minimal stand-in for the Logstash `tcp` input with the `json_lines` codec.
+
+    Every received line is passed to `on_event`, `connection_count` counts the accepted connections.
+    With an `ssl_context` the accepted connections are wrapped in TLS.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+    # the default backlog of 5 drops connects of a client opening connections in a loop
+    request_queue_size = 128
+    handler_class = _LineHandler
+
+    def __init__(self, on_event, host="127.0.0.1", port=0, ssl_context=None):
+        super().__init__((host, port), self.handler_class)
+        self.on_event = on_event
+        self.ssl_context = ssl_context
+        self.connection_count = 0
+        self.connections = set()
+        self.connections_lock = Lock()
+        self._thread = None
+
+    def get_request(self):
+        sock, address = super().get_request()
+        if self.ssl_context is not None:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, address
+
+    def close_connections(self):
+        """Close all open client connections as a restarting Logstash would do."""
+        with self.connections_lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _BeatsHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        with self.server.connections_lock:
+            self.server.connection_count += 1
+            self.server.connections.add(self.request)
+
+    def handle(self):
+        reader = self.request.makefile("rb")
+        window_size = 0
+        received = 0
+        try:
+            while True:
+                header = reader.read(2)
+                if len(header) < 2:
+                    return
+                frame_type = header[1:2]
+                if frame_type == b"W":
+                    (window_size,) = struct.unpack(">I", reader.read(4))
+                    received = 0
+                elif frame_type == b"C":
+                    (length,) = struct.unpack(">I", reader.read(4))
+                    payload = zlib.decompress(reader.read(length))
+                    position = 0
+                    while position < len(payload):
+                        sequence, length = struct.unpack_from(">II", payload, position + 2)
+                        position += 10
+                        self.server.on_event(payload[position : position + length])
+                        position += length
+                        received += 1
+                        if received == window_size:
+                            if self.server.ack_delay:
+                                time.sleep(self.server.ack_delay)
+                            self.request.sendall(struct.pack(">BBI", 0x32, ord("A"), sequence))
+                else:
+                    return  # JSON frames outside of compressed frames are not sent by pylogbeat
+        except OSError:
+            pass  # closed by close_connections()
+        finally:
+            reader.close()
+
+    def finish(self):
+        with self.server.connections_lock:
+            self.server.connections.discard(self.request)
+
+
+class BeatsStandInServer(TcpStandInServer):
+    """Minimal stand-in for the Logstash `beats` input (Lumberjack v2 with compressed frames).
+
+    The events of every window are passed to `on_event` and acknowledged after `ack_delay`
+    seconds, `connection_count` counts the accepted connections.
+    """
+
+    handler_class = _BeatsHandler
+
+    def __init__(self, on_event, host="127.0.0.1", port=0, ssl_context=None, ack_delay=0.0):
+        super().__init__(on_event, host=host, port=port, ssl_context=ssl_context)
+        self.ack_delay = ack_delay
+
+
+class UdpStandInServer:
+    """Minimal stand-in for the Logstash `udp` input.
+
+    Every received datagram is passed to `on_datagram`.
+    """
+
+    def __init__(self, on_datagram, host="127.0.0.1", port=0):
+        self.on_datagram = on_datagram
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+        self._sock.bind((host, port))
+        self._thread = None
+
+    @property
+    def port(self):
+        return self._sock.getsockname()[1]
+
+    def start(self):
+        self._thread = Thread(target=self._receive, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    def _receive(self):
+        while True:
+            datagram = self._sock.recv(65535)
+            if not datagram:
+                return  # the empty datagram sent by stop()
+            self.on_datagram(datagram)
+
+    def stop(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.sendto(b"", self._sock.getsockname())
+        self._thread.join()
+        self._sock.close()
+
+
+class _HttpHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.connection_count += 1
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.on_request(body, self.headers)
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+class HttpStandInServer(ThreadingHTTPServer):
+    """Minimal stand-in for the Logstash `http` input supporting keep-alive connections.
+
+    The body and the headers of every POST request are passed to `on_request`,
+    `connection_count` counts the accepted connections.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, on_request, host="127.0.0.1", port=0):
+        super().__init__((host, port), _HttpHandler)
+        self.on_request = on_request
+        self.connection_count = 0
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        self._thread = Thread(target=self.serve_forever, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
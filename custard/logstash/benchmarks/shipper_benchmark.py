@@ -0,0 +1,93 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  shipper_benchmark.py
+@Time    :  2026/10/18 22:35
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  多个 fork 出的进程: 各自的 worker 共用一个 SQLite 数据库 vs 经 Unix socket 发往单一 LogShipper 进程的耗时
+"""
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+from custard.logstash.handler import AsynchronousLogstashHandler
+from custard.logstash.shipper import LogShipper, query_shipper_stats
+
+
+class CountingTransport:
+    def __init__(self, **kwargs):  # pylint: disable=unused-argument
+        self.event_count = 0
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        self.event_count += len(events)
+
+    def close(self):
+        pass
+
+
+def run_shipper(socket_path, database_path):
+    handler = AsynchronousLogstashHandler("localhost", 5959, database_path, transport=CountingTransport)
+    shipper = LogShipper(socket_path, handler)
+    signal.signal(signal.SIGTERM, lambda *args: shipper.shutdown())
+    shipper.serve_forever()
+
+
+def run_producer(count, database_path, socket_path):
+    if socket_path is None:
+        handler = AsynchronousLogstashHandler("localhost", 5959, database_path, transport=CountingTransport)
+    else:
+        handler = AsynchronousLogstashHandler(
+            socket_path, None, None, transport="custard.logstash.shipper.ShipperTransport"
+        )
+    record = logging.getLogger("benchmark").makeRecord("benchmark", logging.INFO, __file__, 42, "message", (), None)
+    for _ in range(count):
+        handler.emit(record)
+    handler.close()
+
+
+def run(name, process_count, count, use_shipper):
+    context = multiprocessing.get_context("fork")
+    directory = tempfile.mkdtemp()
+    database_path = os.path.join(directory, "logstash.db")
+    socket_path = os.path.join(directory, "shipper.sock") if use_shipper else None
+    shipper = None
+    if use_shipper:
+        shipper = context.Process(target=run_shipper, args=(socket_path, database_path))
+        shipper.start()
+        while not os.path.exists(socket_path):
+            time.sleep(0.01)
+
+    started = time.perf_counter()
+    producers = [
+        context.Process(target=run_producer, args=(count, database_path, socket_path)) for _ in range(process_count)
+    ]
+    for producer in producers:
+        producer.start()
+    for producer in producers:
+        producer.join()
+    elapsed = time.perf_counter() - started
+    if shipper is not None:
+        print(f"    {query_shipper_stats(socket_path)}")
+        shipper.terminate()
+        shipper.join()
+    shutil.rmtree(directory)
+    print(f"{name:<28} {process_count * count / elapsed:>8.0f} events/s")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    process_count = 4
+    run("shared database", process_count, count, use_shipper=False)
+    run("shipper", process_count, count, use_shipper=True)
+
+
+if __name__ == "__main__":
+    main()
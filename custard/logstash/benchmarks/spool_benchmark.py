@@ -0,0 +1,56 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  spool_benchmark.py
+@Time    :  2026/10/18 23:15
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  FileSpoolCache vs DatabaseCache: 写入、取出并删除事件的完整周期的吞吐量
+"""
+import os
+import sys
+import tempfile
+import time
+
+from custard.logstash.constants import constants
+from custard.logstash.database import DatabaseCache
+from custard.logstash.spool import FileSpoolCache
+
+EVENT_COUNT = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+BATCH_SIZE = 50
+EVENT = b'{"@timestamp": "2023-01-30T07:05:35.025Z", "level": "INFO", "message": "benchmark event"}\n'
+
+
+def bench_cycle(cache, add_batch_size):
+    """add the events (one by one or in batches), then fetch and delete them in batches like the worker"""
+    started = time.perf_counter()
+    for _ in range(EVENT_COUNT // add_batch_size):
+        if add_batch_size == 1:
+            cache.add_event(EVENT, 20)
+        else:
+            cache.add_events([EVENT] * add_batch_size, [20] * add_batch_size)
+    while cache.get_queued_events():
+        cache.delete_queued_events()
+    elapsed = time.perf_counter() - started
+    cache.close()
+    return elapsed
+
+
+def main():
+    constants.QUEUED_EVENTS_BATCH_SIZE = BATCH_SIZE
+    caches = (
+        ("database", lambda directory: DatabaseCache(os.path.join(directory, "benchmark.db"))),
+        ("database spool", lambda directory: DatabaseCache(os.path.join(directory, "benchmark.db"), spool=True)),
+        ("file spool", lambda directory: FileSpoolCache(os.path.join(directory, "spool"))),
+    )
+    for add_batch_size in (1, BATCH_SIZE):
+        for name, create_cache in caches:
+            with tempfile.TemporaryDirectory() as directory:
+                elapsed = bench_cycle(create_cache(directory), add_batch_size)
+            print(f"{name:<16} add batch {add_batch_size:>3} {EVENT_COUNT / elapsed:>12.0f} events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  tcp_benchmark.py
+@Time    :  2026/10/18 15:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  TcpTransport: 每次 flush 新建 TCP/TLS 连接 vs 长连接
+"""
+from tempfile import TemporaryDirectory
+import ssl
+import sys
+import time
+
+from custard.logstash.benchmarks.servers import TcpStandInServer, create_self_signed_certificate
+from custard.logstash.transport import TcpTransport
+
+EVENTS_PER_FLUSH = 50
+EVENT = (
+    b'{"@timestamp": "2023-01-30T07:05:35.025Z", "@version": "1", "host": "app-01", "level": "INFO", '
+    b'"message": "request handled", "extra": {"path": "/api/v1/items", "status_code": 200}}\n'
+)
+
+
+def run(name, server, transport, flushes):
+    events = [EVENT] * EVENTS_PER_FLUSH
+    connection_count = server.connection_count
+    started = time.perf_counter()
+    for _ in range(flushes):
+        transport.send(events)
+    elapsed = time.perf_counter() - started
+    transport.close()
+    # the server accepts the connections in the background, let it catch up before counting
+    time.sleep(1)
+    print(
+        f"{name:<20} {flushes / elapsed:>10.0f} flushes/s  {elapsed / flushes * 1000:>8.3f} ms/flush  "
+        f"{server.connection_count - connection_count:>5} connections"
+    )
+
+
+def main():
+    flushes = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    server = TcpStandInServer(lambda line: None)
+    server.start()
+    for keep_connection in (False, True):
+        transport = TcpTransport(
+            "127.0.0.1", server.port, False, False, None, None, None, keep_connection=keep_connection
+        )
+        run(f"tcp keep={keep_connection}", server, transport, flushes)
+    server.stop()
+
+    with TemporaryDirectory() as directory:
+        certfile, keyfile = create_self_signed_certificate(directory)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(certfile, keyfile)
+        server = TcpStandInServer(lambda line: None, ssl_context=ssl_context)
+        server.start()
+        for keep_connection in (False, True):
+            transport = TcpTransport(
+                "127.0.0.1", server.port, True, True, None, None, certfile, keep_connection=keep_connection
+            )
+            run(f"tls keep={keep_connection}", server, transport, flushes)
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  udp_benchmark.py
+@Time    :  2026/10/18 16:30
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  UdpTransport 回环基准: 每条事件一个数据报 vs 数据报打包
+"""
+from threading import Lock
+import sys
+import time
+
+from custard.logstash.benchmarks.servers import UdpStandInServer
+from custard.logstash.transport import UdpTransport
+
+EVENTS_PER_FLUSH = 500
+EVENT = (
+    b'{"@timestamp": "2023-01-30T07:05:35.025Z", "@version": "1", "host": "app-01", "level": "DEBUG", '
+    b'"message": "cache lookup", "extra": {"key": "item:4711", "hit": true}}\n'
+)
+SETTINGS = [
+    ("per event", {}),
+    ("per event, kept open", {"keep_connection": True}),
+    ("packed 1472", {"keep_connection": True, "pack_events": True}),
+    ("packed 8192", {"keep_connection": True, "pack_events": True, "max_datagram_size": 8192}),
+]
+
+
+def run(name, kwargs, flushes):
+    lock = Lock()
+    received = {"datagrams": 0, "events": 0}
+
+    def on_datagram(datagram):
+        with lock:
+            received["datagrams"] += 1
+            received["events"] += datagram.count(b"\n")
+
+    server = UdpStandInServer(on_datagram)
+    server.start()
+    transport = UdpTransport("127.0.0.1", server.port, **kwargs)
+    sent_datagrams = [0]
+    send_datagram = transport._send_datagram  # pylint: disable=protected-access
+    send_via_socket = transport._send_via_socket  # pylint: disable=protected-access
+
+    def count_datagram(datagram):
+        sent_datagrams[0] += 1
+        send_datagram(datagram)
+
+    def count_event(event):
+        sent_datagrams[0] += 1
+        send_via_socket(event)
+
+    transport._send_datagram = count_datagram  # pylint: disable=protected-access
+    transport._send_via_socket = count_event  # pylint: disable=protected-access
+
+    events = [EVENT] * EVENTS_PER_FLUSH
+    started = time.perf_counter()
+    for _ in range(flushes):
+        transport.send(events)
+    elapsed = time.perf_counter() - started
+    transport.close()
+    server.stop()
+    event_count = flushes * EVENTS_PER_FLUSH
+    print(
+        f"{name:<22} {sent_datagrams[0] / elapsed:>11.0f} datagrams/s {event_count / elapsed:>11.0f} events/s  "
+        f"received {received['events'] / event_count:>7.2%} of the events"
+    )
+
+
+def main():
+    flushes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print(f"{flushes} flushes of {EVENTS_PER_FLUSH} events of {len(EVENT)} bytes")
+    for name, kwargs in SETTINGS:
+        run(name, kwargs, flushes)
+
+
+if __name__ == "__main__":
+    main()
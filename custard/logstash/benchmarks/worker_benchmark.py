@@ -0,0 +1,102 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  worker_benchmark.py
+@Time    :  2026/10/18 11:25
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  LogProcessingWorker 吞吐与入队到发送的 p99 延迟: 逐条处理 vs drain 模式
+"""
+from threading import Event, Lock
+import json
+import time
+
+from custard.logstash.benchmarks.servers import TcpStandInServer
+from custard.logstash.constants import constants
+from custard.logstash.transport import TcpTransport
+from custard.logstash.worker import LogProcessingWorker
+
+BURSTS = 20
+BURST_SIZE = 500
+BURST_PAUSE = 0.05
+RECEIVE_TIMEOUT = 60.0
+
+
+class LatencyRecorder:
+    def __init__(self, expected_count):
+        self.latencies = []
+        self.expected_count = expected_count
+        self.completed = Event()
+        self._lock = Lock()
+
+    def on_event(self, line):
+        received = time.perf_counter()
+        sent = json.loads(line)["sent"]
+        with self._lock:
+            self.latencies.append(received - sent)
+            if len(self.latencies) >= self.expected_count:
+                self.completed.set()
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def run(drain_batch_size):
+    constants.QUEUE_DRAIN_BATCH_SIZE = drain_batch_size
+    event_count = BURSTS * BURST_SIZE
+    recorder = LatencyRecorder(event_count)
+    server = TcpStandInServer(recorder.on_event)
+    server.start()
+    transport = TcpTransport(
+        "127.0.0.1", server.port, ssl_enable=False, ssl_verify=False, keyfile=None, certfile=None, ca_certs=None
+    )
+    worker = LogProcessingWorker(
+        host="127.0.0.1",
+        port=server.port,
+        transport=transport,
+        ssl_enable=False,
+        ssl_verify=False,
+        keyfile=None,
+        certfile=None,
+        ca_certs=None,
+        database_path=None,
+        cache={},
+        event_ttl=None,
+    )
+    worker.start()
+
+    started = time.perf_counter()
+    for _ in range(BURSTS):
+        for index in range(BURST_SIZE):
+            event = json.dumps({"sent": time.perf_counter(), "message": f"benchmark event {index}"})
+            worker.enqueue_event(f"{event}\n".encode())
+        time.sleep(BURST_PAUSE)
+    recorder.completed.wait(RECEIVE_TIMEOUT)
+    elapsed = time.perf_counter() - started
+
+    worker.shutdown()
+    worker.join()
+    transport.close()
+    server.stop()
+
+    latencies = recorder.latencies
+    mode = f"drain({drain_batch_size})" if drain_batch_size else "one-by-one"
+    print(
+        f"{mode:<14} {len(latencies) / elapsed:>10.0f} events/s"
+        f"  p50 {percentile(latencies, 0.5) * 1000:>8.1f} ms"
+        f"  p99 {percentile(latencies, 0.99) * 1000:>8.1f} ms"
+        f"  ({len(latencies)}/{event_count} received)"
+    )
+
+
+def main():
+    run(None)
+    run(500)
+
+
+if __name__ == "__main__":
+    main()
@@ -12,10 +12,20 @@
 from abc import ABC, abstractmethod
 
 
+# eviction policies for caches with a size budget
+EVICTION_DROP_OLDEST = "drop_oldest"
+EVICTION_DROP_LOWEST_LEVEL = "drop_lowest_level"
+EVICTION_SAMPLE = "sample"
+EVICTION_POLICIES = (EVICTION_DROP_OLDEST, EVICTION_DROP_LOWEST_LEVEL, EVICTION_SAMPLE)
+
+
 class Cache(ABC):
+    # count of events evicted due to the size budget of the cache
+    evicted_count = 0
+
     # ----------------------------------------------------------------------
     @abstractmethod
-    def add_event(self, event):
+    def add_event(self, event, level=None):
         """Add the event to the cache.
 
         This method is meant to be called by various other threads.
@@ -23,16 +33,34 @@ class Cache(ABC):
         will be called by the log processing worker threads.
 
         :param str event: A log message
+        :param int level: The numeric log level of the message, if known
         :return:
         """
         pass
 
+    # ----------------------------------------------------------------------
+    def add_events(self, events, levels=None):
+        """Add multiple events to the cache at once.
+
+        Backends should override this if they can store a group of events
+        cheaper than one by one (e.g. within a single transaction).
+
+        :param list events: A list of log messages
+        :param list levels: A list of numeric log levels, one for each message
+        :return:
+        """
+        if levels is None:
+            levels = [None] * len(events)
+        for event, level in zip(events, levels):
+            self.add_event(event, level)
+
     # ----------------------------------------------------------------------
     @abstractmethod
-    def get_queued_events(self):
+    def get_queued_events(self, batch_size=None):
         """Get pending events and mark them to be deleted
 
-        :return: A list of events to be published
+        :param int batch_size: The maximum number of events, `constants.QUEUED_EVENTS_BATCH_SIZE` if None
+        :return: A list of events to be published, each with the items `event_text` and `event_level`
         """
         pass
 
@@ -63,6 +91,33 @@ class Cache(ABC):
     def expire_events(self):
         """Expire events older than the TTL. If no TTL is set, no action is taken.
 
+        :return: The count of expired events
+        """
+        pass
+
+    # ----------------------------------------------------------------------
+    def evict_events(self):
+        """Evict pending events exceeding the size budget of the cache, if any.
+
+        At most `constants.CACHE_EVICTION_BATCH_SIZE` events are evicted per call,
+        so the caller is never stalled for long; it is expected to be called regularly.
+
+        :return: The count of evicted events
+        """
+        return 0
+
+    # ----------------------------------------------------------------------
+    def count_events(self):
+        """Count the events in the cache, pending as well as fetched but not yet deleted.
+
+        :return: The count of cached events
+        """
+        return 0
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        """Release any resources held by the cache (e.g. open database connections).
+
         :return:
         """
         pass
@@ -0,0 +1,111 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  circuit_breaker.py
+@Time    :  2026/10/18 23:30
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import random
+import time
+
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stop sending events to an unreachable endpoint for an exponentially growing delay.
+
+    The circuit is closed as long as sending succeeds. After `failure_threshold` consecutive
+    failures it opens: no attempts are allowed until the retry delay has passed. Then it is
+    half-open and a single attempt (the probe) is allowed, the circuit closes if the probe
+    succeeds and opens again with twice the delay (up to `backoff_max`) if it fails.
+    The delay is shortened by a random fraction of up to `jitter` to spread the retries of
+    several processes or workers.
+    Listeners are called with the breaker, the old and the new state on each state transition.
+    Not thread-safe, meant to be used by the worker thread only.
+
+    :param failure_threshold: Count of consecutive failures opening the circuit, None to never open it
+    :param backoff_min: Retry delay in seconds after the circuit opened first
+    :param backoff_max: Maximum retry delay in seconds
+    :param jitter: Fraction (0 to 1) of the retry delay which is randomly subtracted
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, failure_threshold, backoff_min, backoff_max, jitter=0.0):
+        if failure_threshold is not None and failure_threshold < 1:
+            raise ValueError("The failure threshold must be at least 1 or None")
+        if backoff_min <= 0 or backoff_max < backoff_min:
+            raise ValueError("The minimum backoff must be positive and not greater than the maximum backoff")
+        if not 0 <= jitter <= 1:
+            raise ValueError("The jitter must be between 0 and 1")
+
+        self._failure_threshold = failure_threshold
+        self._backoff_min = backoff_min
+        self._backoff_max = backoff_max
+        self._jitter = jitter
+        self._state = STATE_CLOSED
+        self._backoff = backoff_min
+        self._listeners = []
+        self.consecutive_failures = 0
+        self.retry_at = None
+        self.retry_delay = None
+        self.open_count = 0
+
+    # ----------------------------------------------------------------------
+    @property
+    def state(self):
+        return self._state
+
+    # ----------------------------------------------------------------------
+    def add_listener(self, listener):
+        """Call `listener(breaker, old_state, new_state)` on each state transition"""
+        self._listeners.append(listener)
+
+    # ----------------------------------------------------------------------
+    def allow_request(self, now=None):
+        """True if an attempt is allowed, switches an open circuit to half-open once the retry delay passed"""
+        if self._state != STATE_OPEN:
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self.retry_at:
+            return False
+        self._set_state(STATE_HALF_OPEN)
+        return True
+
+    # ----------------------------------------------------------------------
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._backoff = self._backoff_min
+        self.retry_at = None
+        self.retry_delay = None
+        if self._state != STATE_CLOSED:
+            self._set_state(STATE_CLOSED)
+
+    # ----------------------------------------------------------------------
+    def record_failure(self, now=None):
+        self.consecutive_failures += 1
+        if self._state == STATE_HALF_OPEN:
+            # the probe failed, back off further
+            self._backoff = min(self._backoff * 2, self._backoff_max)
+        elif self._failure_threshold is None or self.consecutive_failures < self._failure_threshold:
+            return
+        elif self._state == STATE_OPEN:
+            return  # a forced attempt while open, e.g. on shutdown, keeps the retry delay
+
+        now = time.monotonic() if now is None else now
+        self.retry_delay = self._backoff * (1 - self._jitter * random.random())
+        self.retry_at = now + self.retry_delay
+        self.open_count += 1
+        self._set_state(STATE_OPEN)
+
+    # ----------------------------------------------------------------------
+    def _set_state(self, state):
+        old_state, self._state = self._state, state
+        for listener in self._listeners:
+            listener(self, old_state, state)
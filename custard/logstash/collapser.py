@@ -0,0 +1,139 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  collapser.py
+@Time    :  2026/10/18 19:40
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import time
+
+from custard.logstash.formatter import format_timestamp
+
+
+class _Window:
+    __slots__ = ("deadline", "repeat_count", "first_created", "record", "format_record", "level", "args_sample")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, deadline, format_record, level):
+        self.deadline = deadline
+        self.repeat_count = 0
+        self.first_created = None
+        self.record = None
+        self.format_record = format_record
+        self.level = level
+        self.args_sample = []
+
+
+class DuplicateCollapser:
+    """Collapse duplicate log records within a time window into a single record.
+
+    Records are duplicates if they were formatted by the same handler and have the same logger,
+    level, message template and exception site (exception type and the code location it was
+    raised at). The first record of a kind is passed through and opens a window, all duplicates
+    until the window closes are collapsed into one summary record: the last duplicate with the
+    additional attributes `repeat_count`, `repeat_first_timestamp`, `repeat_last_timestamp`
+    and `repeat_args_sample` (distinct message arguments). The next record of this kind after
+    the window closed is passed through again.
+    Not thread-safe, meant to be used by the worker thread only.
+
+    :param window: Length of a window in seconds
+    :param max_windows: Maximum number of open windows, the oldest window is closed early to
+                        open a new one if exceeded
+    :param args_sample_size: Maximum number of distinct message arguments kept per window
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, window, max_windows, args_sample_size):
+        if window <= 0 or max_windows <= 0:
+            raise ValueError("The window length and the maximum number of windows must be positive")
+
+        self._window = window
+        self._max_windows = max_windows
+        self._args_sample_size = args_sample_size
+        # open windows by key, in the order they were opened and so will expire
+        self._windows = {}
+        self._closed = []
+        self.collapsed_count = 0
+
+    # ----------------------------------------------------------------------
+    def add(self, record, template, args, format_record, level, now=None):
+        """Add a record, return True if the record is to be passed through and False if it was collapsed.
+
+        :param record: The snapshot of the log record
+        :param template: The message template (i.e. `record.msg` before merging it with the arguments)
+        :param args: The message arguments
+        :param format_record: Callable formatting the record, part of the key
+        :param level: The log level of the record
+        """
+        key = self._get_key(record, template, format_record, level)
+        if key is None:
+            return True
+
+        now = time.monotonic() if now is None else now
+        window = self._windows.get(key)
+        if window is None or window.deadline <= now:
+            if window is not None:
+                self._close(key)
+            elif len(self._windows) >= self._max_windows:
+                self._close(next(iter(self._windows)))
+            self._windows[key] = _Window(now + self._window, format_record, level)
+            return True
+
+        window.repeat_count += 1
+        if window.first_created is None:
+            window.first_created = record.created
+        window.record = record
+        if args and len(window.args_sample) < self._args_sample_size:
+            args_repr = str(args)
+            if args_repr not in window.args_sample:
+                window.args_sample.append(args_repr)
+        self.collapsed_count += 1
+        return False
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _get_key(record, template, format_record, level):
+        if not isinstance(template, str):
+            return None  # do not compare arbitrary message objects
+
+        exc_site = None
+        exc_info = record.exc_info
+        if isinstance(exc_info, tuple) and exc_info[2] is not None:
+            tb = exc_info[2]
+            while tb.tb_next is not None:
+                tb = tb.tb_next
+            exc_site = (exc_info[0], tb.tb_frame.f_code, tb.tb_lineno)
+        return format_record, record.name, level, template, exc_site
+
+    # ----------------------------------------------------------------------
+    def pop_closed(self, now=None, force=False):
+        """Close expired (or with `force` all) windows and return (record, format_record, level) of the summaries"""
+        now = time.monotonic() if now is None else now
+        for key, window in list(self._windows.items()):
+            if not force and window.deadline > now:
+                break  # windows expire in the order they were opened
+            self._close(key)
+
+        closed, self._closed = self._closed, []
+        return closed
+
+    # ----------------------------------------------------------------------
+    def _close(self, key):
+        window = self._windows.pop(key)
+        if not window.repeat_count:
+            return  # no duplicates, the record has been passed through already
+
+        record = window.record
+        record.repeat_count = window.repeat_count
+        record.repeat_first_timestamp = format_timestamp(window.first_created)
+        record.repeat_last_timestamp = format_timestamp(record.created)
+        record.repeat_args_sample = window.args_sample
+        self._closed.append((record, window.format_record, window.level))
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        return len(self._windows)
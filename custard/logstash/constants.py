@@ -21,8 +21,69 @@ class Constants:
 
     # timeout in seconds for TCP connections
     SOCKET_TIMEOUT = 5.0
+    # persistent TcpTransport connections (keep_connection=True): delay in seconds before the
+    # next connect attempt after a failed connect, doubled on every further failure up to the maximum
+    TCP_RECONNECT_BACKOFF_MIN = 0.5
+    TCP_RECONNECT_BACKOFF_MAX = 30.0
+    # maximum age in seconds of a persistent TcpTransport or BeatsTransport connection, an older connection is
+    # re-established before the next send (e.g. to follow DNS or load balancer changes); None means unlimited
+    TCP_MAX_CONNECTION_AGE = 300.0
+    # BeatsTransport: count of events sent per window (acknowledged as a whole by Logstash) at first
+    # and its bounds; the window size is doubled whenever a full window is acknowledged within
+    # BEATS_WINDOW_GROW_LATENCY seconds and halved whenever waiting for the acknowledgement times out
+    BEATS_WINDOW_SIZE_INITIAL = 10
+    BEATS_WINDOW_SIZE_MIN = 1
+    BEATS_WINDOW_SIZE_MAX = 1024
+    BEATS_WINDOW_GROW_LATENCY = 0.25
+    # maximum size in bytes of the datagrams UdpTransport packs events into (pack_events=True);
+    # 1472 bytes fit into a single Ethernet frame (1500 bytes MTU minus IP and UDP headers)
+    UDP_MAX_DATAGRAM_SIZE = 1472
     # interval in seconds to check the internal queue for new messages to be cached in the database
     QUEUE_CHECK_INTERVAL = 2.0
+    # maximum number of events in the internal queue of the worker, 0 means unbounded
+    QUEUE_MAX_SIZE = 0
+    # what to do if the internal queue is full: "block" the logging thread for at most
+    # QUEUE_BLOCK_TIMEOUT seconds (the event is dropped afterwards), "drop_oldest" (events not in
+    # the priority lane first) or "drop_newest" (i.e. discard the event to be logged)
+    QUEUE_OVERFLOW = "block"
+    QUEUE_BLOCK_TIMEOUT = 5.0
+    # events of records with this level or higher are put into a priority lane of the internal
+    # queue and so are processed before pending events of lower levels, e.g. 40 (logging.ERROR);
+    # None disables the lane, all events are processed strictly in arrival order
+    QUEUE_PRIORITY_LEVEL = None
+    # maximum number of events the worker takes from the internal queue per wakeup and writes
+    # to the cache in one batch; None disables this drain mode (events are processed one by one)
+    QUEUE_DRAIN_BATCH_SIZE = None
+    # in drain mode the worker is woken up immediately (instead of waiting for QUEUE_CHECK_INTERVAL)
+    # as soon as this count of events resp. bytes has been enqueued; reaching the byte threshold
+    # also triggers sending the cached events to Logstash like QUEUED_EVENTS_FLUSH_COUNT
+    QUEUE_DRAIN_WAKEUP_COUNT = 50
+    QUEUE_DRAIN_WAKEUP_BYTES = 1024 * 1024
+    # duplicate collapsing (handler option collapse_duplicates=True): length in seconds of the window
+    # in which duplicates of a record are collapsed into one event, maximum number of open windows
+    # (the oldest window is closed early if exceeded) and of distinct message arguments kept per window
+    COLLAPSE_WINDOW = 10.0
+    COLLAPSE_MAX_WINDOWS = 1000
+    COLLAPSE_ARGS_SAMPLE_SIZE = 5
+    # multiple endpoints (handler option endpoints=[...]): seconds an endpoint whose last send
+    # attempt failed is skipped by the routing of new events, as long as other endpoints are available
+    ENDPOINT_FAILOVER_COOLDOWN = 30.0
+    # maximum size in bytes of a frame received by the LogShipper, connections sending larger
+    # frames are considered broken and closed
+    SHIPPER_MAX_FRAME_SIZE = 16 * 1024 * 1024
+    # seconds the LogShipper waits for a client to read its stats reply before closing the connection,
+    # the reply is written whenever the socket is writable, so the other connections are served meanwhile
+    SHIPPER_REPLY_TIMEOUT = 5.0
+    # circuit breaker around sending events: after this count of consecutive send failures the worker
+    # stops reading and sending cached events for CIRCUIT_BREAKER_BACKOFF_MIN seconds, doubled on
+    # every failed probe up to the maximum and shortened by a random fraction of up to CIRCUIT_BREAKER_JITTER;
+    # a probe sends CIRCUIT_BREAKER_PROBE_BATCH_SIZE events before the backlog is released.
+    # None disables the circuit breaker (failed batches are retried every QUEUE_CHECK_INTERVAL), e.g. 3 enables it.
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD = None
+    CIRCUIT_BREAKER_BACKOFF_MIN = 1.0
+    CIRCUIT_BREAKER_BACKOFF_MAX = 60.0
+    CIRCUIT_BREAKER_JITTER = 0.2
+    CIRCUIT_BREAKER_PROBE_BATCH_SIZE = 1
     # interval in seconds to send cached events from the database to Logstash
     QUEUED_EVENTS_FLUSH_INTERVAL = 10.0
     # count of cached events to send cached events from the database to Logstash; events are sent
@@ -33,8 +94,27 @@ class Constants:
     QUEUED_EVENTS_BATCH_SIZE = 50
     # maximum number of events to be updated within one SQLite statement
     DATABASE_EVENT_CHUNK_SIZE = 750
+    # size budget of the event cache (in-memory or database), None means unlimited; the
+    # byte budget of the database refers to the size of the used database pages
+    CACHE_MAX_EVENTS = None
+    CACHE_MAX_BYTES = None
+    # which pending events to evict if the cache exceeds its budget: "drop_oldest",
+    # "drop_lowest_level" (oldest events of the lowest log level first) or "sample" (random events)
+    CACHE_EVICTION_POLICY = "drop_oldest"
+    # maximum number of events evicted at once, eviction continues on the next check
+    CACHE_EVICTION_BATCH_SIZE = 500
     # timeout in seconds to "connect" (i.e. open) the SQLite database
     DATABASE_TIMEOUT = 5.0
+    # SQLite journal mode and synchronous setting used by DatabaseCache in spool mode (i.e. when
+    # a long-lived connection is kept open). WAL with synchronous=NORMAL avoids a fsync per
+    # transaction at the risk of losing the last transactions on power loss (not on process crash).
+    # Use None to keep the SQLite defaults.
+    DATABASE_SPOOL_JOURNAL_MODE = "WAL"
+    DATABASE_SPOOL_SYNCHRONOUS = "NORMAL"
+    # file spool (handler option spool_path): maximum size in bytes of a segment file and whether
+    # to fsync segments and checkpoint after each write (slow, but survives power losses as well)
+    SPOOL_SEGMENT_SIZE = 16 * 1024 * 1024
+    SPOOL_FSYNC = False
     # list of record attributes which are filtered out from the event sent
     # to Logstash. By default, the list consists of some Python standard LogRecord attributes.
     # Usually this list does not need to be modified. Add/Remove elements to
@@ -79,6 +159,10 @@ class Constants:
         "tags",
         "@metadata",
     ]
+    # maximum number of formatted exception stacks the LogstashFormatter caches, keyed by the exception
+    # types and frames, so that repeated exceptions from the same code path are formatted only once;
+    # 0 disables the cache
+    FORMATTER_TRACEBACK_CACHE_SIZE = 256
     # enable rate limiting for error messages (e.g. network errors) emitted by the logger
     # used in LogProcessingWorker, i.e. when transmitting log messages to the Logstash server.
     # Use a string like '5 per minute' or None to disable (default), for details see
@@ -10,10 +10,17 @@
 @Desc    :  None
 """
 from contextlib import contextmanager
+import random
 import sqlite3
 import sys
 
-from custard.logstash.cache import Cache
+from custard.logstash.cache import (
+    EVICTION_DROP_LOWEST_LEVEL,
+    EVICTION_DROP_OLDEST,
+    EVICTION_POLICIES,
+    EVICTION_SAMPLE,
+    Cache,
+)
 from custard.logstash.constants import constants
 from custard.logstash.utils import ichunked
 
@@ -24,11 +31,17 @@ DATABASE_SCHEMA_STATEMENTS = [
     `event_id`          INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,
     `event_text`        TEXT NOT NULL,
     `pending_delete`    INTEGER NOT NULL,
-    `entry_date`        DATETIME NOT NULL);
+    `entry_date`        DATETIME NOT NULL,
+    `event_level`       INTEGER);
     """,
     """CREATE INDEX IF NOT EXISTS `idx_pending_delete` ON `event` (pending_delete);""",
     """CREATE INDEX IF NOT EXISTS `idx_entry_date` ON `event` (entry_date);""",
+    """CREATE INDEX IF NOT EXISTS `idx_event_level` ON `event` (pending_delete, event_level);""",
 ]
+# columns added after the initial schema, added to existing databases before DATABASE_SCHEMA_STATEMENTS
+DATABASE_MIGRATION_STATEMENTS = {
+    "event_level": """ALTER TABLE `event` ADD COLUMN `event_level` INTEGER;""",
+}
 
 
 class DatabaseLockedError(Exception):
@@ -47,13 +60,31 @@ class DatabaseCache(Cache):
 
     :param path: Path to the SQLite database
     :param event_ttl: Optional parameter used to expire events in the database after a time
+    :param spool: Keep one long-lived connection open (in the journal mode configured by
+                  `constants.DATABASE_SPOOL_JOURNAL_MODE`) instead of re-opening the database
+                  and re-initializing the schema for every operation
+    :param max_events: Optional maximum number of events in the database
+    :param max_bytes: Optional maximum size of the used database pages
+    :param eviction_policy: Which pending events to evict if the database exceeds its budget
     """
 
     # ----------------------------------------------------------------------
-    def __init__(self, path, event_ttl=None):
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self, path, event_ttl=None, spool=False, max_events=None, max_bytes=None, eviction_policy=EVICTION_DROP_OLDEST
+    ):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Invalid eviction policy '{eviction_policy}', use one of: {', '.join(EVICTION_POLICIES)}")
+
         self._database_path = path
         self._connection = None
         self._event_ttl = event_ttl
+        self._spool = spool
+        self._schema_migrated = False
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._eviction_policy = eviction_policy
+        self.evicted_count = 0
 
     @contextmanager
     def _connect(self):
@@ -62,6 +93,8 @@ class DatabaseCache(Cache):
             with self._connection as connection:
                 yield connection
         except sqlite3.OperationalError:
+            # drop the (possibly broken) spool connection, it is re-opened on the next call
+            self._close(force=True)
             self._handle_sqlite_error()
             raise
         finally:
@@ -69,36 +102,82 @@ class DatabaseCache(Cache):
 
     # ----------------------------------------------------------------------
     def _open(self):
+        if self._connection is not None:
+            return  # spool mode, connection and schema are still set up
+
         self._connection = sqlite3.connect(
             self._database_path, timeout=constants.DATABASE_TIMEOUT, isolation_level="EXCLUSIVE"
         )
         self._connection.row_factory = sqlite3.Row
+        if self._spool:
+            self._configure_spool()
         self._initialize_schema()
 
     # ----------------------------------------------------------------------
-    def _close(self):
-        if self._connection is not None:
+    def _configure_spool(self):
+        cursor = self._connection.cursor()
+        try:
+            if constants.DATABASE_SPOOL_JOURNAL_MODE:
+                cursor.execute(f"PRAGMA journal_mode={constants.DATABASE_SPOOL_JOURNAL_MODE};")
+            if constants.DATABASE_SPOOL_SYNCHRONOUS:
+                cursor.execute(f"PRAGMA synchronous={constants.DATABASE_SPOOL_SYNCHRONOUS};")
+        except sqlite3.OperationalError:
+            self._close(force=True)
+            self._handle_sqlite_error()
+            raise
+
+    # ----------------------------------------------------------------------
+    def _close(self, force=False):
+        if (not self._spool or force) and self._connection is not None:
             self._connection.close()
             self._connection = None
 
+    # ----------------------------------------------------------------------
+    def close(self):
+        self._close(force=True)
+
     # ----------------------------------------------------------------------
     def _initialize_schema(self):
         cursor = self._connection.cursor()
         try:
+            self._migrate_schema(cursor)
             for statement in DATABASE_SCHEMA_STATEMENTS:
                 cursor.execute(statement)
         except sqlite3.OperationalError:
-            self._close()
+            self._close(force=True)
             self._handle_sqlite_error()
             raise
 
     # ----------------------------------------------------------------------
-    def add_event(self, event):
+    def _migrate_schema(self, cursor):
+        if self._schema_migrated:
+            return
+
+        # an empty result means the table does not exist yet and is created with all columns
+        columns = {row[1] for row in cursor.execute("PRAGMA table_info(`event`);")}
+        if columns:
+            for column, statement in DATABASE_MIGRATION_STATEMENTS.items():
+                if column not in columns:
+                    cursor.execute(statement)
+        self._schema_migrated = True
+
+    # ----------------------------------------------------------------------
+    def add_event(self, event, level=None):
+        query = """
+            INSERT INTO `event`
+            (`event_text`, `pending_delete`, `entry_date`, `event_level`) VALUES (?, ?, datetime('now'), ?)"""
+        with self._connect() as connection:
+            connection.execute(query, (event, False, level))
+
+    # ----------------------------------------------------------------------
+    def add_events(self, events, levels=None):
         query = """
             INSERT INTO `event`
-            (`event_text`, `pending_delete`, `entry_date`) VALUES (?, ?, datetime('now'))"""
+            (`event_text`, `pending_delete`, `entry_date`, `event_level`) VALUES (?, ?, datetime('now'), ?)"""
+        if levels is None:
+            levels = [None] * len(events)
         with self._connect() as connection:
-            connection.execute(query, (event, False))
+            connection.executemany(query, ((event, False, level) for event, level in zip(events, levels)))
 
     # ----------------------------------------------------------------------
     def _handle_sqlite_error(self):
@@ -113,13 +192,13 @@ class DatabaseCache(Cache):
             raise DatabaseDiskIOError from exc
 
     # ----------------------------------------------------------------------
-    def get_queued_events(self):
+    def get_queued_events(self, batch_size=None):
         query_fetch = """
-            SELECT `event_id`, `event_text` FROM `event` WHERE `pending_delete` = 0 LIMIT ?;"""
+            SELECT `event_id`, `event_text`, `event_level` FROM `event` WHERE `pending_delete` = 0 LIMIT ?;"""
         query_update_base = "UPDATE `event` SET `pending_delete`=1 WHERE `event_id` IN (%s);"
         with self._connect() as connection:
             cursor = connection.cursor()
-            cursor.execute(query_fetch, (constants.QUEUED_EVENTS_BATCH_SIZE,))
+            cursor.execute(query_fetch, (batch_size or constants.QUEUED_EVENTS_BATCH_SIZE,))
             events = cursor.fetchall()
             self._bulk_update_events(cursor, events, query_update_base)
 
@@ -150,9 +229,77 @@ class DatabaseCache(Cache):
     # ----------------------------------------------------------------------
     def expire_events(self):
         if self._event_ttl is None:
-            return
+            return 0
 
         query_delete = "DELETE FROM `event` WHERE " f"`entry_date` < datetime('now', '-{self._event_ttl} seconds');"
         with self._connect() as connection:
             cursor = connection.cursor()
             cursor.execute(query_delete)
+            return cursor.rowcount
+
+    # ----------------------------------------------------------------------
+    def count_events(self):
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM `event`;").fetchone()[0]
+
+    # ----------------------------------------------------------------------
+    def evict_events(self):
+        if self._max_events is None and self._max_bytes is None:
+            return 0
+
+        with self._connect() as connection:
+            cursor = connection.cursor()
+            excess_count = self._get_excess_event_count(cursor)
+            if excess_count <= 0:
+                return 0
+
+            evict_count = min(excess_count, constants.CACHE_EVICTION_BATCH_SIZE)
+            if self._eviction_policy == EVICTION_SAMPLE:
+                evicted_count = self._evict_random_events(cursor, evict_count)
+            else:
+                order = (
+                    "`event_level`, `event_id`" if self._eviction_policy == EVICTION_DROP_LOWEST_LEVEL else "`event_id`"
+                )
+                query_delete = (
+                    "DELETE FROM `event` WHERE `event_id` IN "
+                    f"(SELECT `event_id` FROM `event` WHERE `pending_delete` = 0 ORDER BY {order} LIMIT ?);"
+                )
+                cursor.execute(query_delete, (evict_count,))
+                evicted_count = cursor.rowcount
+
+        self.evicted_count += evicted_count
+        return evicted_count
+
+    # ----------------------------------------------------------------------
+    def _get_excess_event_count(self, cursor):
+        event_count = cursor.execute("SELECT COUNT(*) FROM `event`;").fetchone()[0]
+        excess_count = 0
+        if self._max_events is not None:
+            excess_count = event_count - self._max_events
+        if self._max_bytes is not None and event_count:
+            page_size = cursor.execute("PRAGMA page_size;").fetchone()[0]
+            page_count = cursor.execute("PRAGMA page_count;").fetchone()[0]
+            free_page_count = cursor.execute("PRAGMA freelist_count;").fetchone()[0]
+            used_bytes = (page_count - free_page_count) * page_size
+            if used_bytes > self._max_bytes:
+                # estimate the count of events to evict from their average size
+                event_size = used_bytes / event_count
+                excess_count = max(excess_count, int((used_bytes - self._max_bytes) / event_size) + 1)
+        return excess_count
+
+    # ----------------------------------------------------------------------
+    def _evict_random_events(self, cursor, evict_count):
+        query_range = "SELECT MIN(`event_id`), MAX(`event_id`) FROM `event` WHERE `pending_delete` = 0;"
+        min_event_id, max_event_id = cursor.execute(query_range).fetchone()
+        if min_event_id is None:
+            return 0
+
+        # ids of already deleted events are just missed, eviction continues on the next call
+        id_range = range(min_event_id, max_event_id + 1)
+        event_ids = random.sample(id_range, min(evict_count, len(id_range)))
+        query_delete_base = "DELETE FROM `event` WHERE `pending_delete` = 0 AND `event_id` IN (%s);"
+        evicted_count = 0
+        for event_ids_subset in ichunked(event_ids, constants.DATABASE_EVENT_CHUNK_SIZE):
+            cursor.execute(query_delete_base % ",".join("?" * len(event_ids_subset)), event_ids_subset)
+            evicted_count += cursor.rowcount
+        return evicted_count
@@ -0,0 +1,142 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  event_queue.py
+@Time    :  2026/10/18 11:48
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from collections import deque
+from queue import Empty
+from threading import Condition, Lock
+import time
+
+
+OVERFLOW_BLOCK = "block"
+OVERFLOW_DROP_OLDEST = "drop_oldest"
+OVERFLOW_DROP_NEWEST = "drop_newest"
+OVERFLOW_POLICIES = (OVERFLOW_BLOCK, OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST)
+
+
+class EventQueue:
+    """FIFO queue of events for the log processing worker with an additional high-priority lane.
+
+    Events in the priority lane are always returned before the events in the normal lane,
+    within each lane events are returned in arrival order.
+    An unbounded queue does not take any lock as `deque.append()` and `deque.popleft()`
+    are thread-safe on their own. A bounded queue serializes producers and the consumer
+    on a single lock to enforce the size limit.
+
+    :param maxsize: Maximum number of events in both lanes, 0 means unbounded
+    :param overflow: What to do if a bounded queue is full: `block` the producer (at most
+                     for the timeout passed to `put()`), `drop_oldest` (normal lane first)
+                     or `drop_newest` (i.e. discard the event to be put)
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, maxsize=0, overflow=OVERFLOW_BLOCK):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid overflow policy '{overflow}', use one of: {', '.join(OVERFLOW_POLICIES)}")
+
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._priority_lane = deque()
+        self._normal_lane = deque()
+        self._mutex = Lock()
+        self._not_full = Condition(self._mutex)
+        self.dropped_count = 0
+
+    # ----------------------------------------------------------------------
+    def put(self, event, priority=False, timeout=None):
+        """Append the event to the priority or the normal lane.
+
+        :param event: The event to be queued
+        :param priority: Put the event into the priority lane
+        :param timeout: Maximum time in seconds to block if the queue is full and the
+                        overflow policy is `block` (None blocks until space is available)
+        :return: False if the event has been discarded, True otherwise
+        """
+        lane = self._priority_lane if priority else self._normal_lane
+        if self._maxsize <= 0:
+            lane.append(event)
+            return True
+
+        with self._mutex:
+            if self._full() and not self._make_room(timeout):
+                self.dropped_count += 1
+                return False
+            lane.append(event)
+            return True
+
+    # ----------------------------------------------------------------------
+    def _full(self):
+        return len(self._priority_lane) + len(self._normal_lane) >= self._maxsize
+
+    # ----------------------------------------------------------------------
+    def _make_room(self, timeout):
+        if self._overflow == OVERFLOW_DROP_NEWEST:
+            return False
+
+        if self._overflow == OVERFLOW_DROP_OLDEST:
+            if self._normal_lane:
+                self._normal_lane.popleft()
+            else:
+                self._priority_lane.popleft()
+            self.dropped_count += 1
+            return True
+
+        # block until the consumer made some room or the timeout elapsed
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._full():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            self._not_full.wait(remaining)
+        return True
+
+    # ----------------------------------------------------------------------
+    def get_nowait(self):
+        """Remove and return the next event, the priority lane first.
+
+        :return: The next event
+        :raises queue.Empty: if both lanes are empty
+        """
+        if self._maxsize <= 0:
+            return self._pop()
+
+        with self._mutex:
+            event = self._pop()
+            self._not_full.notify()
+            return event
+
+    # ----------------------------------------------------------------------
+    def _pop(self):
+        try:
+            return self._priority_lane.popleft()
+        except IndexError:
+            pass
+        try:
+            return self._normal_lane.popleft()
+        except IndexError:
+            raise Empty from None
+
+    # ----------------------------------------------------------------------
+    def requeue(self, events, priority=False):
+        """Put events back in front of the priority or the normal lane, keeping their order.
+
+        Used by the consumer if it could not process events it already took from the queue.
+        The size limit is not enforced to never block or drop events on the consumer side.
+
+        :param events: A list of events
+        :param priority: Put the events back into the priority lane, e.g. if they were taken from it
+        """
+        lane = self._priority_lane if priority else self._normal_lane
+        with self._mutex:
+            lane.extendleft(reversed(events))
+
+    # ----------------------------------------------------------------------
+    def qsize(self):
+        return len(self._priority_lane) + len(self._normal_lane)
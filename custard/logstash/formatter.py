@@ -9,8 +9,12 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  None
 """
+from collections import OrderedDict, namedtuple
 from datetime import date, datetime
+from threading import Lock
+import builtins
 import logging
+import math
 import socket
 import sys
 import time
@@ -18,15 +22,175 @@ import traceback
 import uuid
 
 from custard.logstash.constants import constants
+from custard.utils.serializer import COMPONENT_LOGSTASH, get_serializer, resolve_serializer
+
+
+# fields set by format() on the top level of every message
+MESSAGE_BASE_FIELDS = (
+    "@timestamp",
+    "@version",
+    "host",
+    "level",
+    "logsource",
+    "message",
+    "pid",
+    "program",
+    "type",
+    "@metadata",
+    "tags",
+)
+
+TRACEBACK_HEADER = "Traceback (most recent call last):\n"
+# separators between chained exceptions, as written by the traceback module
+TRACEBACK_CAUSE_MESSAGE = "\nThe above exception was the direct cause of the following exception:\n\n"
+TRACEBACK_CONTEXT_MESSAGE = "\nDuring handling of the above exception, another exception occurred:\n\n"
+
+# exception groups are available as of Python 3.11
+_BaseExceptionGroup = getattr(builtins, "BaseExceptionGroup", ())
+
+TracebackCacheInfo = namedtuple("TracebackCacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+# the last formatted second, records come in chronological order so it is mostly the same
+_timestamp_cache = (None, None)
+
+
+# ----------------------------------------------------------------------
+def format_timestamp(time_):
+    """Format a record timestamp as the @timestamp field, e.g. 2023-01-30T07:05:35.025Z"""
+    global _timestamp_cache
+    # split like datetime.utcfromtimestamp(), i.e. microseconds rounded half to even
+    fraction, second = math.modf(time_)
+    microsecond = round(fraction * 1e6)
+    if microsecond >= 1000000:
+        second += 1
+        microsecond -= 1000000
+    elif microsecond < 0:
+        second -= 1
+        microsecond += 1000000
+    cached_second, formatted_second = _timestamp_cache
+    if second != cached_second:
+        formatted_second = datetime.utcfromtimestamp(second).strftime("%Y-%m-%dT%H:%M:%S")
+        _timestamp_cache = (second, formatted_second)
+    return f"{formatted_second}.{microsecond // 1000:03}Z"
+
+
+class TracebackCache:
+    """Format exceptions like traceback.format_exception() and keep the rendered stacks in a LRU cache.
+
+    The stacks of an exception (and its chained exceptions) are cached by the exception types and
+    the code objects, line numbers and instruction offsets of their frames, so repeated exceptions
+    from the same code path only get their messages formatted. Exception groups and exceptions
+    without a value are always formatted by the traceback module.
+
+    :param maxsize: Maximum number of cached stacks, 0 disables the cache
+    :param capture_locals: Render the local variables of each frame, bypasses the cache
+    """
 
-try:
-    import json
-except ImportError:
-    import simplejson as json
+    # ----------------------------------------------------------------------
+    def __init__(self, maxsize, capture_locals=False):
+        self._maxsize = maxsize
+        self._capture_locals = capture_locals
+        self._cache = OrderedDict()
+        self._lock = Lock()
+        self._hits = 0
+        self._misses = 0
+
+    # ----------------------------------------------------------------------
+    def format(self, exc_type, exc_value, exc_traceback):
+        chain = self._get_chain(exc_value, exc_traceback)
+        if chain is None:
+            if self._capture_locals:
+                return "".join(
+                    traceback.TracebackException(
+                        type(exc_value), exc_value, exc_traceback, capture_locals=True
+                    ).format()
+                )
+            return "".join(traceback.format_exception(exc_type, exc_value, exc_traceback))
+
+        key = tuple((chained_message, type(exc), self._get_frames_key(tb)) for chained_message, exc, tb in chain)
+        with self._lock:
+            stacks = self._cache.get(key)
+            if stacks is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+                self._cache.move_to_end(key)
+
+        if stacks is None:
+            stacks = tuple("".join(traceback.format_tb(tb)) if tb is not None else None for _, _, tb in chain)
+            with self._lock:
+                self._cache[key] = stacks
+                if len(self._cache) > self._maxsize:
+                    self._cache.popitem(last=False)
+
+        parts = []
+        for (chained_message, exc, _), stack in zip(chain, stacks):
+            if chained_message is not None:
+                parts.append(chained_message)
+            if stack is not None:
+                parts.append(TRACEBACK_HEADER)
+                parts.append(stack)
+            parts.extend(traceback.format_exception_only(type(exc), exc))
+        return "".join(parts)
+
+    # ----------------------------------------------------------------------
+    def _get_chain(self, exc_value, exc_traceback):
+        """(chained message, exception, traceback) of the oldest to the newest exception, None if not cacheable"""
+        if not self._maxsize or self._capture_locals or not isinstance(exc_value, BaseException):
+            return None
+
+        chain = []
+        seen = {id(exc_value)}
+        exc, tb = exc_value, exc_traceback
+        while exc is not None:
+            if isinstance(exc, _BaseExceptionGroup):
+                return None
+            # same rules as traceback.TracebackException
+            cause = exc.__cause__ if id(exc.__cause__) not in seen else None
+            context = None
+            if cause is None and not exc.__suppress_context__ and id(exc.__context__) not in seen:
+                context = exc.__context__
+            if cause is not None:
+                chained_message, chained_exc = TRACEBACK_CAUSE_MESSAGE, cause
+            elif context is not None:
+                chained_message, chained_exc = TRACEBACK_CONTEXT_MESSAGE, context
+            else:
+                chained_message, chained_exc = None, None
+            chain.append((chained_message, exc, tb))
+            if chained_exc is not None:
+                seen.add(id(chained_exc))
+                tb = chained_exc.__traceback__
+            exc = chained_exc
+        chain.reverse()
+        return chain
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _get_frames_key(tb):
+        frames = []
+        while tb is not None:
+            frames.append((tb.tb_frame.f_code, tb.tb_lineno, tb.tb_lasti))
+            tb = tb.tb_next
+        return tuple(frames)
+
+    # ----------------------------------------------------------------------
+    def info(self):
+        with self._lock:
+            return TracebackCacheInfo(self._hits, self._misses, self._maxsize, len(self._cache))
+
+    # ----------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._hits = 0
+            self._misses = 0
 
 
 class LogstashFormatter(logging.Formatter):
     _basic_data_types = (type(None), bool, str, int, float)
+    # methods of the generic message layout which are bypassed by the compiled layout,
+    # if a subclass overrides any of them the generic layout is used
+    _generic_layout_methods = ("_get_record_fields", "_remove_excluded_fields", "_move_extra_record_fields_to_prefix")
 
     # ----------------------------------------------------------------------
     # pylint: disable=too-many-arguments
@@ -39,6 +203,8 @@ class LogstashFormatter(logging.Formatter):
         extra=None,
         ensure_ascii=True,
         metadata=None,
+        serializer=None,
+        capture_locals=False,
     ):
         super().__init__()
         self._message_type = message_type
@@ -47,12 +213,18 @@ class LogstashFormatter(logging.Formatter):
         self._extra = extra
         self._ensure_ascii = ensure_ascii
         self._metadata = metadata
+        # JSON serializer name or instance, by default the one set for the logstash component
+        self._serializer = get_serializer(COMPONENT_LOGSTASH) if serializer is None else resolve_serializer(serializer)
 
         self._interpreter = None
         self._interpreter_version = None
         self._host = None
         self._logsource = None
         self._program_name = None
+        # (key, compiled, skip fields, top-level fields) as built by _compile_layout()
+        self._layout = (None, False, None, None)
+        # formatted exception stacks, capture_locals renders the local variables of each frame (uncached)
+        self._traceback_cache = TracebackCache(constants.FORMATTER_TRACEBACK_CACHE_SIZE, capture_locals)
 
         # fetch static information and process related information already
         # as they won't change during lifetime
@@ -92,6 +264,89 @@ class LogstashFormatter(logging.Formatter):
 
     # ----------------------------------------------------------------------
     def format(self, record):
+        _, compiled, skip_fields, top_level_fields = self._compile_layout()
+        if compiled:
+            message = self._build_compiled_message(record, skip_fields, top_level_fields)
+        else:
+            message = self._build_message(record)
+        return self._serialize(message)
+
+    # ----------------------------------------------------------------------
+    def _compile_layout(self):
+        """Precompute the field sets of the compiled layout once the field constants are known.
+
+        The compiled layout produces the very same messages as the generic one (`_build_message()`)
+        in a single pass over the record attributes. It is not used if the field constants move
+        or drop any of the base fields or if a subclass customizes the generic layout.
+        The layout is rebuilt if the lists in the constants are replaced or their length changes.
+        """
+        skip_list = constants.FORMATTER_RECORD_FIELD_SKIP_LIST
+        field_list = constants.FORMATTER_LOGSTASH_MESSAGE_FIELD_LIST
+        key = (id(skip_list), len(skip_list), id(field_list), len(field_list), self._extra_prefix)
+        layout = self._layout
+        if layout[0] == key:
+            return layout
+
+        skip_fields = frozenset(skip_list)
+        top_level_fields = frozenset(field_list) | {self._extra_prefix}
+        compiled = (
+            top_level_fields.issuperset(MESSAGE_BASE_FIELDS)
+            and skip_fields.isdisjoint(MESSAGE_BASE_FIELDS)
+            and all(
+                getattr(type(self), name) is getattr(LogstashFormatter, name) for name in self._generic_layout_methods
+            )
+        )
+        layout = (key, compiled, skip_fields, top_level_fields)
+        self._layout = layout
+        return layout
+
+    # ----------------------------------------------------------------------
+    def _build_compiled_message(self, record, skip_fields, top_level_fields):
+        message = {
+            "@timestamp": self._format_timestamp(record.created),
+            "@version": "1",
+            "host": self._host,
+            "level": record.levelname,
+            "logsource": self._logsource,
+            "message": record.getMessage(),
+            "pid": record.process,
+            "program": self._program_name,
+            "type": self._message_type,
+        }
+        if self._metadata:
+            message["@metadata"] = self._metadata
+        if self._tags:
+            message["tags"] = self._tags
+
+        value_repr = self._value_repr
+        extra_fields = self._get_extra_fields(record)
+        if not skip_fields.isdisjoint(extra_fields):
+            for field_name in [field_name for field_name in extra_fields if field_name in skip_fields]:
+                del extra_fields[field_name]
+
+        if not self._extra_prefix:
+            for key, value in record.__dict__.items():
+                if key not in skip_fields:
+                    message[key] = value_repr(value)
+            message.update(extra_fields)
+            return message
+
+        # record attributes go either to the top level (overriding base fields in place)
+        # or, after the dynamic extra fields, into the extra prefix
+        record_extra_fields = []
+        for key, value in record.__dict__.items():
+            if key in skip_fields:
+                continue
+            if key in top_level_fields:
+                message[key] = value_repr(value)
+            else:
+                record_extra_fields.append((key, value_repr(value)))
+        message[self._extra_prefix] = extra_fields
+        extra_fields.update(record_extra_fields)
+        return message
+
+    # ----------------------------------------------------------------------
+    def _build_message(self, record):
         message = {
             "@timestamp": self._format_timestamp(record.created),
             "@version": "1",
@@ -124,14 +379,11 @@ class LogstashFormatter(logging.Formatter):
         # move existing extra record fields into the configured prefix
         self._move_extra_record_fields_to_prefix(message)
 
-        return self._serialize(message)
+        return message
 
     # ----------------------------------------------------------------------
     def _format_timestamp(self, time_):
-        timestamp = datetime.utcfromtimestamp(time_)
-        formatted_timestamp = timestamp.strftime("%Y-%m-%dT%H:%M:%S")
-        microsecond = int(timestamp.microsecond / 1000)
-        return f"{formatted_timestamp}.{microsecond:03}Z"
+        return format_timestamp(time_)
 
     # ----------------------------------------------------------------------
     def _get_record_fields(self, record):
@@ -175,13 +427,18 @@ class LogstashFormatter(logging.Formatter):
     # ----------------------------------------------------------------------
     def _format_exception(self, exc_info):
         if isinstance(exc_info, tuple):
-            stack_trace = "".join(traceback.format_exception(*exc_info))
+            stack_trace = self._traceback_cache.format(*exc_info)
         elif exc_info:
             stack_trace = "".join(traceback.format_stack())
         else:
             stack_trace = ""
         return stack_trace
 
+    # ----------------------------------------------------------------------
+    def traceback_cache_info(self):
+        """Hits, misses, maximum and current size of the cache of formatted exception stacks"""
+        return self._traceback_cache.info()
+
     # ----------------------------------------------------------------------
     def _remove_excluded_fields(self, message, extra_fields):
         for fields in (message, extra_fields):
@@ -207,7 +464,7 @@ class LogstashFormatter(logging.Formatter):
 
     # ----------------------------------------------------------------------
     def _serialize(self, message):
-        return json.dumps(message, ensure_ascii=self._ensure_ascii)
+        return self._serializer.dumps(message, ensure_ascii=self._ensure_ascii)
 
 
 class DjangoLogstashFormatter(LogstashFormatter):
@@ -13,8 +13,10 @@ from logging import Handler
 from custard.logstash import EVENT_CACHE
 from custard.logstash.constants import constants
 from custard.logstash.formatter import LogstashFormatter
+from custard.logstash.pool import ROUTING_ROUND_ROBIN, WorkerPool
+from custard.logstash.sampling import copy_record
 from custard.logstash.utils import import_string, safe_log_via_print
-from custard.logstash.worker import LogProcessingWorker
+from custard.logstash.worker import CollapsibleEvent, DeferredEvent, LogProcessingWorker
 
 
 class ProcessingError(Exception):
@@ -33,6 +35,8 @@ class SynchronousLogstashHandler(Handler):
     :param ca_certs: The path to the file containing recognized CA certificates.
     :param enable: Flag to enable log processing (default is True, disabling
                    might be handy for local testing, etc.)
+    :param sampler: RecordSampler deciding which records to drop before they are formatted,
+                    events of sampled records get a `sample_rate` field (default is None)
     """
 
     # ----------------------------------------------------------------------
@@ -49,6 +53,7 @@ class SynchronousLogstashHandler(Handler):
         ca_certs=None,
         enable=True,
         encoding="utf-8",
+        sampler=None,
         **kwargs,
     ):
         super().__init__()
@@ -63,50 +68,58 @@ class SynchronousLogstashHandler(Handler):
         self._enable = enable
         self._transport = None
         self._encoding = encoding
-        self._setup_transport(**kwargs)
+        self._sampler = sampler
+        self._transport_kwargs = kwargs
+        self._setup_transport()
 
     # ----------------------------------------------------------------------
     def emit(self, record):
         if not self._enable:
             return  # we should not do anything, so just leave
+        sample_rate = self._sampler.sample(record) if self._sampler is not None else 1.0
+        if sample_rate is None:
+            return  # dropped by the sampler
 
         self._setup_transport()
 
         # basically same implementation as in logging.handlers.SocketHandler.emit()
         try:
+            if sample_rate < 1.0:
+                record = copy_record(record, sample_rate=sample_rate)
             data = self._format_record(record)
             self._transport.send([data], use_logging=False)
         except Exception:
             self.handleError(record)
 
     # ----------------------------------------------------------------------
-    def _setup_transport(self, **kwargs):
+    def _setup_transport(self):
         if self._transport is not None:
             return
+        self._transport = self._create_transport(self._host, self._port)
 
+    # ----------------------------------------------------------------------
+    def _create_transport(self, host, port):
         transport_args = dict(
-            host=self._host,
-            port=self._port,
+            host=host,
+            port=port,
             timeout=constants.SOCKET_TIMEOUT,
             ssl_enable=self._ssl_enable,
             ssl_verify=self._ssl_verify,
             keyfile=self._keyfile,
             certfile=self._certfile,
             ca_certs=self._ca_certs,
-            **kwargs,
+            **self._transport_kwargs,
         )
         if isinstance(self._transport_path, str):
             transport_class = import_string(self._transport_path)
-            self._transport = transport_class(**transport_args)
-        elif callable(self._transport_path):
-            self._transport = self._transport_path(**transport_args)
-        elif hasattr(self._transport_path, "send"):
-            self._transport = self._transport_path
-        else:
-            raise RuntimeError(
-                "Invalid transport path: must be an importable module path, "
-                "a class or factory function or an instance."
-            )
+            return transport_class(**transport_args)
+        if callable(self._transport_path):
+            return self._transport_path(**transport_args)
+        if hasattr(self._transport_path, "send"):
+            return self._transport_path
+        raise RuntimeError(
+            "Invalid transport path: must be an importable module path, " "a class or factory function or an instance."
+        )
 
     # ----------------------------------------------------------------------
     def _format_record(self, record):
@@ -150,6 +163,22 @@ class AsynchronousLogstashHandler(SynchronousLogstashHandler):
                           Use None to use a in-memory cache.
     :param event_ttl: Amount of time in seconds to wait before expiring log messages in
                       the database. (Given in seconds. Default is None, and disables this feature)
+    :param database_spool: Keep a single long-lived connection to the database and write
+                           queued events in batches (default is False)
+    :param spool_path: The path to a directory keeping queued events in append-only segment
+                       files instead of a database (see FileSpoolCache, default is None).
+                       The directory has a single writer, use a spool_path per handler and process
+    :param deferred_formatting: Only take a snapshot of the record in the logging thread and
+                                format it in the worker thread (default is False)
+    :param collapse_duplicates: Collapse duplicate records within constants.COLLAPSE_WINDOW seconds
+                                into one event with a repeat count, implies deferred formatting
+                                (default is False)
+    :param endpoints: List of (host, port) tuples of several Logstash endpoints to send the
+                      events to instead of `host` and `port`, see WorkerPool (default is None)
+    :param routing: How events are distributed over the endpoints: `round_robin` or
+                    `least_backlog` (default is `round_robin`)
+    :param workers_per_endpoint: Number of workers, each with its own connection and cache
+                                 partition, per endpoint (default is 1)
     """
 
     _worker_thread = None
@@ -170,54 +199,171 @@ class AsynchronousLogstashHandler(SynchronousLogstashHandler):
         enable=True,
         event_ttl=None,
         encoding="utf-8",
+        database_spool=False,
+        spool_path=None,
+        deferred_formatting=False,
+        collapse_duplicates=False,
+        sampler=None,
+        endpoints=None,
+        routing=ROUTING_ROUND_ROBIN,
+        workers_per_endpoint=1,
         **kwargs,
     ):
         self._database_path = database_path
         self._event_ttl = event_ttl
+        self._database_spool = database_spool
+        self._spool_path = spool_path
+        if database_path is not None and spool_path is not None:
+            raise ValueError("Use either a database_path or a spool_path")
+        self._deferred_formatting = deferred_formatting
+        self._collapse_duplicates = collapse_duplicates
+        self._worker_pool = None
+        if endpoints is not None:
+            if not isinstance(transport, str) and not callable(transport):
+                raise ValueError("A transport instance cannot be used with multiple endpoints")
+            self._worker_pool = WorkerPool(
+                endpoints,
+                create_transport=self._create_transport,
+                create_worker=self._create_worker,
+                database_path=database_path,
+                spool_path=spool_path,
+                routing=routing,
+                workers_per_endpoint=workers_per_endpoint,
+            )
 
         super().__init__(
-            host, port, transport, ssl_enable, ssl_verify, keyfile, certfile, ca_certs, enable, encoding, **kwargs
+            host,
+            port,
+            transport,
+            ssl_enable,
+            ssl_verify,
+            keyfile,
+            certfile,
+            ca_certs,
+            enable,
+            encoding,
+            sampler=sampler,
+            **kwargs,
         )
 
     # ----------------------------------------------------------------------
     def emit(self, record):
         if not self._enable:
             return  # we should not do anything, so just leave
+        sample_rate = self._sampler.sample(record) if self._sampler is not None else 1.0
+        if sample_rate is None:
+            return  # dropped by the sampler
 
         self._setup_transport()
         self._start_worker_thread()
 
         # basically same implementation as in logging.handlers.SocketHandler.emit()
         try:
-            data = self._format_record(record)
-            AsynchronousLogstashHandler._worker_thread.enqueue_event(data)
+            if self._collapse_duplicates or self._deferred_formatting:
+                snapshot = self._snapshot_record(record)
+                if sample_rate < 1.0:
+                    snapshot.sample_rate = sample_rate
+                if self._collapse_duplicates:
+                    data = CollapsibleEvent(snapshot, self._format_record, record.msg, record.args)
+                else:
+                    data = DeferredEvent(snapshot, self._format_record)
+            else:
+                if sample_rate < 1.0:
+                    record = copy_record(record, sample_rate=sample_rate)
+                data = self._format_record(record)
+            self._enqueue_event(data, level=record.levelno)
         except Exception:
             self.handleError(record)
 
+    # ----------------------------------------------------------------------
+    def enqueue_event(self, event, level=None):
+        """Enqueue an already formatted event, e.g. one received by a LogShipper from another process"""
+        if not self._enable:
+            return
+        self.acquire()
+        try:
+            self._setup_transport()
+            self._start_worker_thread()
+            self._enqueue_event(event, level=level)
+        finally:
+            self.release()
+
+    # ----------------------------------------------------------------------
+    def _enqueue_event(self, event, level):
+        if self._worker_pool is not None:
+            self._worker_pool.enqueue_event(event, level=level)
+        else:
+            AsynchronousLogstashHandler._worker_thread.enqueue_event(event, level=level)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _snapshot_record(record):
+        # A shallow copy of the record attributes, with the message already merged with its
+        # arguments as they might be changed by the caller afterwards. Exception info is
+        # kept as is and rendered by the formatter in the worker thread.
+        return copy_record(record, msg=record.getMessage(), args=None)
+
+    # ----------------------------------------------------------------------
+    @property
+    def backlog(self):
+        """Count of events not yet sent to Logstash, of all workers"""
+        if self._worker_pool is not None:
+            return sum(metric.backlog for metric in self._worker_pool.metrics())
+        worker_thread = AsynchronousLogstashHandler._worker_thread
+        return worker_thread.backlog if worker_thread is not None else 0
+
+    # ----------------------------------------------------------------------
+    def endpoint_metrics(self):
+        """Backlog and send statistics per endpoint worker, see WorkerPool.metrics()"""
+        if self._worker_pool is None:
+            return []
+        return self._worker_pool.metrics()
+
     # ----------------------------------------------------------------------
     def flush(self):
-        if self._worker_thread_is_running():
+        if self._worker_pool is not None:
+            self._worker_pool.flush()
+        elif self._worker_thread_is_running():
             self._worker_thread.force_flush_queued_events()
 
+    # ----------------------------------------------------------------------
+    def _setup_transport(self):
+        if self._worker_pool is not None:
+            return  # each worker of the pool has its own transport
+        super()._setup_transport()
+
     # ----------------------------------------------------------------------
     def _start_worker_thread(self):
-        if self._worker_thread_is_running():
-            return
+        if self._worker_pool is not None or self._worker_thread_is_running():
+            return  # the pool starts its workers when routing events to them
 
-        AsynchronousLogstashHandler._worker_thread = LogProcessingWorker(
+        AsynchronousLogstashHandler._worker_thread = self._create_worker(
             host=self._host,
             port=self._port,
             transport=self._transport,
+            database_path=self._database_path,
+            spool_path=self._spool_path,
+            cache=EVENT_CACHE,
+        )
+        AsynchronousLogstashHandler._worker_thread.start()
+
+    # ----------------------------------------------------------------------
+    def _create_worker(self, host, port, transport, database_path, spool_path, cache):
+        return LogProcessingWorker(
+            host=host,
+            port=port,
+            transport=transport,
             ssl_enable=self._ssl_enable,
             ssl_verify=self._ssl_verify,
             keyfile=self._keyfile,
             certfile=self._certfile,
             ca_certs=self._ca_certs,
-            database_path=self._database_path,
-            cache=EVENT_CACHE,
+            database_path=database_path,
+            database_spool=self._database_spool,
+            spool_path=spool_path,
+            cache=cache,
             event_ttl=self._event_ttl,
         )
-        AsynchronousLogstashHandler._worker_thread.start()
 
     # ----------------------------------------------------------------------
     @staticmethod
@@ -229,7 +375,9 @@ class AsynchronousLogstashHandler(SynchronousLogstashHandler):
 
     # ----------------------------------------------------------------------
     def shutdown(self):
-        if self._worker_thread_is_running():
+        if self._worker_pool is not None:
+            self._worker_pool.shutdown()
+        elif self._worker_thread_is_running():
             self._trigger_worker_shutdown()
             self._wait_for_worker_thread()
             self._reset_worker_thread()
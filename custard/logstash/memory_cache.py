@@ -9,90 +9,260 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  None
 """
-from datetime import datetime, timedelta
+from collections import deque
+from itertools import count
 from logging import getLogger as get_logger
-import uuid
+import random
+import time
 
-from custard.logstash.cache import Cache
+from custard.logstash.cache import (
+    EVICTION_DROP_LOWEST_LEVEL,
+    EVICTION_DROP_OLDEST,
+    EVICTION_POLICIES,
+    EVICTION_SAMPLE,
+    Cache,
+)
 from custard.logstash.constants import constants
 
 
+class CachedEvent:
+    """A single event in the MemoryCache.
+
+    Supports item access (e.g. `event["event_text"]`) like the rows returned by DatabaseCache.
+    """
+
+    __slots__ = ("id", "event_text", "event_level", "pending_delete", "entry_date")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, event_id, event_text, entry_date, event_level=None):
+        self.id = event_id
+        self.event_text = event_text
+        self.event_level = event_level
+        self.pending_delete = False
+        # time.monotonic() timestamp
+        self.entry_date = entry_date
+
+    # ----------------------------------------------------------------------
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+
 class MemoryCache(Cache):
     """Backend implementation for python-logstash-async. Keeps messages in a local, in-memory cache
     while attempting to publish them to logstash. Does not persist through process restarts. Also,
     does not write to disk.
 
-    :param cache: Usually just an empty dictionary
+    Besides the cache itself, pending and in-flight events are indexed in separate queues and
+    all events in a time-ordered queue for expiry, so fetching, requeuing, deleting and expiring
+    events costs O(batch) instead of O(cache size).
+
+    :param cache: Usually just an empty dictionary, it maps event ids to `CachedEvent` instances
     :param event_ttl: Optional parameter used to expire events in the cache after a time
+    :param max_events: Optional maximum number of events in the cache
+    :param max_bytes: Optional maximum total size of the events in the cache
+    :param eviction_policy: Which pending events to evict if the cache exceeds its budget
     """
 
     logger = get_logger(__name__)
 
     # ----------------------------------------------------------------------
-    def __init__(self, cache, event_ttl=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, cache, event_ttl=None, max_events=None, max_bytes=None, eviction_policy=EVICTION_DROP_OLDEST):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Invalid eviction policy '{eviction_policy}', use one of: {', '.join(EVICTION_POLICIES)}")
+
         self._cache = cache
         self._event_ttl = event_ttl
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._eviction_policy = eviction_policy
+        self.evicted_count = 0
+        # events not yet fetched for publishing, in insertion order
+        self._pending = deque()
+        # events fetched for publishing, to be deleted or requeued
+        self._in_flight = {}
+        # all events ordered by entry date, only maintained if a TTL is set
+        self._expiry = deque()
+        # all events by log level in insertion order, only maintained for EVICTION_DROP_LOWEST_LEVEL
+        self._levels = {}
+        self._event_bytes = 0
+        self._event_ids = None
+        self._build_indexes()
+
+    # ----------------------------------------------------------------------
+    def _build_indexes(self):
+        # the cache might be re-used from a previous worker thread
+        events = sorted(self._cache.values(), key=lambda event: event.id)
+        for event in events:
+            if event.pending_delete:
+                self._in_flight[event.id] = event
+            else:
+                self._pending.append(event)
+            self._index_event(event)
+            self._event_bytes += len(event.event_text)
+        self._event_ids = count(events[-1].id + 1 if events else 1)
+
+    # ----------------------------------------------------------------------
+    def _index_event(self, event):
+        if self._event_ttl is not None:
+            self._expiry.append(event)
+        if self._eviction_policy == EVICTION_DROP_LOWEST_LEVEL:
+            level = event.event_level or 0
+            level_events = self._levels.get(level)
+            if level_events is None:
+                level_events = self._levels[level] = deque()
+            level_events.append(event)
+
+    # ----------------------------------------------------------------------
+    def add_event(self, event, level=None):
+        cached_event = CachedEvent(next(self._event_ids), event, time.monotonic(), level)
+        self._cache[cached_event.id] = cached_event
+        self._pending.append(cached_event)
+        self._index_event(cached_event)
+        self._event_bytes += len(event)
+
+    # ----------------------------------------------------------------------
+    def _is_cached(self, event):
+        return self._cache.get(event.id) is event
 
     # ----------------------------------------------------------------------
-    def add_event(self, event):
-        event_id = uuid.uuid4()
-        self._cache[event_id] = {
-            "event_text": event,
-            "pending_delete": False,
-            "entry_date": datetime.now(),
-            "id": event_id,
-        }
+    def _remove_event(self, event):
+        # The event stays in the index queues and is skipped or compacted later,
+        # only release the payload already.
+        del self._cache[event.id]
+        self._event_bytes -= len(event.event_text)
+        event.event_text = None
 
     # ----------------------------------------------------------------------
-    def get_queued_events(self):
+    def get_queued_events(self, batch_size=None):
+        batch_size = batch_size or constants.QUEUED_EVENTS_BATCH_SIZE
         events = []
-        event_count = 0
-        for event in self._cache.values():
-            if not event["pending_delete"]:
-                events.append(event)
-                event["pending_delete"] = True
-
-                event_count += 1
-                if event_count >= constants.QUEUED_EVENTS_BATCH_SIZE:
-                    break
+        while self._pending and len(events) < batch_size:
+            event = self._pending.popleft()
+            if not self._is_cached(event):
+                continue  # expired or evicted in the meantime
+            event.pending_delete = True
+            self._in_flight[event.id] = event
+            events.append(event)
         return events
 
     # ----------------------------------------------------------------------
     def requeue_queued_events(self, events):
-        for event in events:
-            event_to_queue = self._cache.get(event["id"], None)
-            # If they gave us an event which is not in the cache,
-            # there is really nothing for us to do. Right now
-            # this use-case does not raise an error. Instead, we
-            # just log the message.
-            if event_to_queue:
-                event_to_queue["pending_delete"] = False
-            else:
+        # put the events back in front of the pending queue, keeping their order
+        for event in reversed(events):
+            event_to_queue = self._in_flight.pop(event["id"], None)
+            if event_to_queue is not None:
+                event_to_queue.pending_delete = False
+                self._pending.appendleft(event_to_queue)
+            elif event["id"] not in self._cache:
+                # If they gave us an event which is not in the cache,
+                # there is really nothing for us to do. Right now
+                # this use-case does not raise an error. Instead, we
+                # just log the message.
                 self.logger.warning(
                     "Could not requeue event with id %s. It does not appear to be in the cache.", event["id"]
                 )
 
     # ----------------------------------------------------------------------
     def delete_queued_events(self):
-        ids_to_delete = [event["id"] for event in self._cache.values() if event["pending_delete"]]
-        self._delete_events(ids_to_delete)
+        for event in self._in_flight.values():
+            self._remove_event(event)
+        self._in_flight.clear()
+        self._discard_removed_events(self._expiry)
+        self._compact_indexes_if_necessary()
 
     # ----------------------------------------------------------------------
     def expire_events(self):
         if self._event_ttl is None:
+            return 0
+
+        expired_count = 0
+        delete_time = time.monotonic() - self._event_ttl
+        while self._expiry and self._expiry[0].entry_date < delete_time:
+            event = self._expiry.popleft()
+            if self._is_cached(event):
+                self._remove_event(event)
+                self._in_flight.pop(event.id, None)
+                expired_count += 1
+        self._discard_removed_events(self._pending)
+        self._compact_indexes_if_necessary()
+        return expired_count
+
+    # ----------------------------------------------------------------------
+    def count_events(self):
+        return len(self._cache)
+
+    # ----------------------------------------------------------------------
+    def _discard_removed_events(self, events):
+        # Drop references to deleted or expired events from the head of an index queue.
+        # Events leave the cache mostly in insertion order, so this is amortized O(1).
+        while events and not self._is_cached(events[0]):
+            events.popleft()
+
+    # ----------------------------------------------------------------------
+    def _compact_indexes_if_necessary(self):
+        # Events removed out of insertion order (e.g. evicted by level or randomly) remain in
+        # the index queues, rebuild them once these outnumber the cached events.
+        index_size = len(self._pending) + len(self._expiry) + sum(len(events) for events in self._levels.values())
+        if index_size <= 4 * len(self._cache) + 1024:
             return
 
-        delete_time = datetime.now() - timedelta(seconds=self._event_ttl)
-        ids_to_delete = [event["id"] for event in self._cache.values() if event["entry_date"] < delete_time]
-        self._delete_events(ids_to_delete)
+        self._pending = deque(event for event in self._pending if self._is_cached(event))
+        self._expiry = deque(event for event in self._expiry if self._is_cached(event))
+        for level, events in self._levels.items():
+            self._levels[level] = deque(event for event in events if self._is_cached(event))
 
     # ----------------------------------------------------------------------
-    def _delete_events(self, ids_to_delete):
-        for event_id in ids_to_delete:
-            # If the event is not in the cache, is there anything
-            # that we can do. This currently doesn't throw an error.
-            event = self._cache.pop(event_id, None)
-            if not event:
-                self.logger.warning(
-                    "Could not delete event with id %s. It does not appear to be in the cache.", event_id
-                )
+    def _exceeds_budget(self):
+        if self._max_events is not None and len(self._cache) > self._max_events:
+            return True
+        return self._max_bytes is not None and self._event_bytes > self._max_bytes
+
+    # ----------------------------------------------------------------------
+    def evict_events(self):
+        evicted_count = 0
+        while evicted_count < constants.CACHE_EVICTION_BATCH_SIZE and self._exceeds_budget():
+            event = self._select_event_to_evict()
+            if event is None:
+                break  # only in-flight events left
+            self._remove_event(event)
+            evicted_count += 1
+
+        if evicted_count:
+            self.evicted_count += evicted_count
+            self._compact_indexes_if_necessary()
+        return evicted_count
+
+    # ----------------------------------------------------------------------
+    def _select_event_to_evict(self):
+        if self._eviction_policy == EVICTION_DROP_LOWEST_LEVEL:
+            return self._select_lowest_level_event()
+        if self._eviction_policy == EVICTION_SAMPLE:
+            return self._select_random_event()
+        self._discard_removed_events(self._pending)
+        return self._pending.popleft() if self._pending else None
+
+    # ----------------------------------------------------------------------
+    def _select_lowest_level_event(self):
+        for level in sorted(self._levels):
+            events = self._levels[level]
+            self._discard_removed_events(events)
+            # skip in-flight events, there are at most QUEUED_EVENTS_BATCH_SIZE of them
+            for index, event in enumerate(events):
+                if not event.pending_delete:
+                    del events[index]
+                    return event
+        return None
+
+    # ----------------------------------------------------------------------
+    def _select_random_event(self):
+        while self._pending:
+            index = random.randrange(len(self._pending))  # noqa: S311
+            event = self._pending[index]
+            del self._pending[index]
+            if self._is_cached(event):
+                return event
+        return None
@@ -0,0 +1,232 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  pool.py
+@Time    :  2026/10/18 21:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from collections import namedtuple
+from threading import Lock
+import os
+import weakref
+
+from custard.logstash.constants import constants
+
+
+ROUTING_ROUND_ROBIN = "round_robin"
+ROUTING_LEAST_BACKLOG = "least_backlog"
+ROUTING_POLICIES = (ROUTING_ROUND_ROBIN, ROUTING_LEAST_BACKLOG)
+
+ShardMetrics = namedtuple(
+    "ShardMetrics", ("host", "port", "index", "backlog", "sent", "send_failures", "dropped", "available")
+)
+
+# the live pools by the database and spool partitions of their shards, a partition has a single writer
+_PARTITION_POOLS = weakref.WeakValueDictionary()
+_PARTITION_POOLS_LOCK = Lock()
+
+
+# ----------------------------------------------------------------------
+def get_shard_database_path(database_path, host, port, index):
+    """Path of the database (or spool directory) partition of a shard, e.g. `logstash.db` -> `logstash.host_5959_0.db`"""
+    if database_path is None:
+        return None
+    root, extension = os.path.splitext(database_path)
+    return f"{root}.{host}_{port}_{index}{extension}"
+
+
+class _Shard:
+    __slots__ = ("host", "port", "index", "database_path", "spool_path", "cache", "transport", "worker")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, host, port, index, database_path, spool_path):
+        self.host = host
+        self.port = port
+        self.index = index
+        self.database_path = get_shard_database_path(database_path, host, port, index)
+        self.spool_path = get_shard_database_path(spool_path, host, port, index)
+        # the in-memory cache persists through worker restarts, it is never shared with another pool
+        self.cache = {}
+        self.transport = None
+        self.worker = None
+
+    # ----------------------------------------------------------------------
+    def is_running(self):
+        return self.worker is not None and self.worker.is_alive()
+
+    # ----------------------------------------------------------------------
+    def is_available(self, cooldown):
+        return self.worker is None or self.worker.is_available(cooldown)
+
+    # ----------------------------------------------------------------------
+    @property
+    def backlog(self):
+        return self.worker.backlog if self.worker is not None else 0
+
+
+class WorkerPool:
+    """Log processing workers sharded across several Logstash endpoints.
+
+    Each shard, i.e. each worker of an endpoint, has its own transport and its own cache
+    partition: an in-memory cache of its own, a database next to `database_path` or a spool
+    directory next to `spool_path`. A partition is used by a single live pool, another pool
+    with the same endpoints and `database_path` or `spool_path` raises a ValueError until the
+    first one is shut down.
+    Events are routed round robin over the shards or to the shard with the smallest backlog.
+    Shards whose last send attempt failed less than constants.ENDPOINT_FAILOVER_COOLDOWN
+    seconds ago are skipped as long as there are other shards available. Events already
+    cached by a shard are sent by this shard once its endpoint is back.
+    Routing is not thread-safe, the handler calls it from `emit()` which is serialized by the handler lock.
+
+    :param endpoints: List of (host, port) tuples
+    :param create_transport: Callable creating the transport for a (host, port)
+    :param create_worker: Callable creating a (not yet started) worker, called with host, port,
+                          transport, database_path, spool_path and cache
+    :param database_path: Path of the database, None to use in-memory caches
+    :param spool_path: Path of the spool directory, None to use a database or in-memory caches
+    :param routing: `round_robin` or `least_backlog`
+    :param workers_per_endpoint: Number of workers (and connections) per endpoint
+    """
+
+    # ----------------------------------------------------------------------
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        endpoints,
+        create_transport,
+        create_worker,
+        database_path=None,
+        spool_path=None,
+        routing=ROUTING_ROUND_ROBIN,
+        workers_per_endpoint=1,
+    ):
+        if routing not in ROUTING_POLICIES:
+            raise ValueError(f"Invalid routing policy '{routing}', use one of: {', '.join(ROUTING_POLICIES)}")
+        if not endpoints:
+            raise ValueError("At least one endpoint is required")
+        if workers_per_endpoint < 1:
+            raise ValueError("At least one worker per endpoint is required")
+
+        self._create_transport = create_transport
+        self._create_worker = create_worker
+        self._routing = routing
+        self._shards = [
+            _Shard(host, port, index, database_path, spool_path)
+            for host, port in endpoints
+            for index in range(workers_per_endpoint)
+        ]
+        self._next_shard = 0
+        self._partitions = [
+            os.path.abspath(path)
+            for shard in self._shards
+            for path in (shard.database_path, shard.spool_path)
+            if path is not None
+        ]
+        self._partitions_claimed = False
+        self._claim_partitions()
+
+    # ----------------------------------------------------------------------
+    def _claim_partitions(self):
+        with _PARTITION_POOLS_LOCK:
+            for partition in self._partitions:
+                pool = _PARTITION_POOLS.get(partition)
+                if pool is not None and pool is not self:
+                    raise ValueError(
+                        f"The cache partition '{partition}' is used by another WorkerPool, "
+                        "use another database_path or spool_path or shut the other pool down first"
+                    )
+            for partition in self._partitions:
+                _PARTITION_POOLS[partition] = self
+            self._partitions_claimed = True
+
+    # ----------------------------------------------------------------------
+    def _release_partitions(self):
+        with _PARTITION_POOLS_LOCK:
+            for partition in self._partitions:
+                if _PARTITION_POOLS.get(partition) is self:
+                    del _PARTITION_POOLS[partition]
+            self._partitions_claimed = False
+
+    # ----------------------------------------------------------------------
+    def enqueue_event(self, event, level=None):
+        shard = self._route()
+        if not shard.is_running():
+            self._start_worker(shard)
+        shard.worker.enqueue_event(event, level=level)
+
+    # ----------------------------------------------------------------------
+    def _route(self):
+        cooldown = constants.ENDPOINT_FAILOVER_COOLDOWN
+        if self._routing == ROUTING_LEAST_BACKLOG:
+            shards = [shard for shard in self._shards if shard.is_available(cooldown)] or self._shards
+            return min(shards, key=lambda shard: shard.backlog)
+
+        shard_count = len(self._shards)
+        for _ in range(shard_count):
+            shard = self._shards[self._next_shard]
+            self._next_shard = (self._next_shard + 1) % shard_count
+            if shard.is_available(cooldown):
+                return shard
+        # all endpoints failed recently, keep distributing the events
+        shard = self._shards[self._next_shard]
+        self._next_shard = (self._next_shard + 1) % shard_count
+        return shard
+
+    # ----------------------------------------------------------------------
+    def _start_worker(self, shard):
+        if not self._partitions_claimed:
+            self._claim_partitions()  # used again after shutdown()
+        if shard.transport is None:
+            shard.transport = self._create_transport(shard.host, shard.port)
+        shard.worker = self._create_worker(
+            host=shard.host,
+            port=shard.port,
+            transport=shard.transport,
+            database_path=shard.database_path,
+            spool_path=shard.spool_path,
+            cache=shard.cache,
+        )
+        shard.worker.name = f"{shard.worker.name}-{shard.host}:{shard.port}-{shard.index}"
+        shard.worker.start()
+
+    # ----------------------------------------------------------------------
+    def flush(self):
+        for shard in self._shards:
+            if shard.is_running():
+                shard.worker.force_flush_queued_events()
+
+    # ----------------------------------------------------------------------
+    def shutdown(self):
+        """Shut down all workers (flushing their events) and close the transports"""
+        running_shards = [shard for shard in self._shards if shard.is_running()]
+        for shard in running_shards:
+            shard.worker.shutdown()
+        for shard in running_shards:
+            shard.worker.join()
+        for shard in self._shards:
+            if shard.transport is not None:
+                shard.transport.close()
+                shard.transport = None
+        self._release_partitions()
+
+    # ----------------------------------------------------------------------
+    def metrics(self):
+        """Backlog and send statistics of each shard"""
+        cooldown = constants.ENDPOINT_FAILOVER_COOLDOWN
+        return [
+            ShardMetrics(
+                host=shard.host,
+                port=shard.port,
+                index=shard.index,
+                backlog=shard.backlog,
+                sent=shard.worker.sent_event_count if shard.worker is not None else 0,
+                send_failures=shard.worker.send_failure_count if shard.worker is not None else 0,
+                dropped=shard.worker.dropped_event_count if shard.worker is not None else 0,
+                available=shard.is_available(cooldown),
+            )
+            for shard in self._shards
+        ]
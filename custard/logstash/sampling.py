@@ -0,0 +1,128 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  sampling.py
+@Time    :  2026/10/18 20:30
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import random
+import time
+
+
+class TokenBucket:
+    """Token bucket refilled with `rate` tokens per second up to `burst` tokens, initially full.
+
+    :param rate: Tokens added per second
+    :param burst: Maximum number of tokens
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, rate, burst):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid token bucket ({rate}, {burst}): the rate must be positive, the burst at least 1")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    # ----------------------------------------------------------------------
+    def refill(self, now):
+        """Add the tokens since the last refill, return True if there is a token to take"""
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.tokens + elapsed * self.rate, self.burst)
+            self.updated = now
+        return self.tokens >= 1
+
+    # ----------------------------------------------------------------------
+    def take(self, now):
+        """Take a token, return False if the bucket is empty"""
+        if self.refill(now):
+            self.tokens -= 1
+            return True
+        return False
+
+
+class RecordSampler:
+    """Decide whether a log record is to be sent to Logstash, before it is formatted.
+
+    Records are sampled by level first: a record of a level with a sample rate is kept with this
+    probability. Then the records are rate limited with a token bucket per logger and one per
+    level, a record is only kept if there are tokens in both buckets.
+    Not thread-safe, the handlers call it from `emit()` which is serialized by the handler lock.
+
+    :param sample_rates: Probability (0 < rate <= 1) to keep records by level number,
+                         e.g. {logging.DEBUG: 0.01, logging.INFO: 0.1}
+    :param logger_rate_limit: (records per second, burst) for each logger, None for no limit
+    :param logger_rate_limits: (records per second, burst) by logger name, overriding
+                               `logger_rate_limit`; None as value for no limit
+    :param level_rate_limits: (records per second, burst) by level number
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, sample_rates=None, logger_rate_limit=None, logger_rate_limits=None, level_rate_limits=None):
+        self._sample_rates = dict(sample_rates or {})
+        for level, rate in self._sample_rates.items():
+            if not 0 < rate <= 1:
+                raise ValueError(f"Invalid sample rate {rate} for level {level}, use 0 < rate <= 1")
+        self._logger_rate_limit = logger_rate_limit
+        self._logger_rate_limits = dict(logger_rate_limits or {})
+        for rate_limit in [logger_rate_limit, *self._logger_rate_limits.values()]:
+            if rate_limit is not None:
+                TokenBucket(*rate_limit)  # fail early
+        self._logger_buckets = {}
+        self._level_buckets = {
+            level: TokenBucket(*rate_limit) for level, rate_limit in (level_rate_limits or {}).items()
+        }
+        self._rate_limit_loggers = bool(logger_rate_limit or self._logger_rate_limits)
+        self._random = random.random
+        self.sampled_out_count = 0
+        self.rate_limited_count = 0
+
+    # ----------------------------------------------------------------------
+    def sample(self, record):
+        """Return the sample rate of the record (1.0 if not sampled) or None if the record is to be dropped"""
+        levelno = record.levelno
+        sample_rate = self._sample_rates.get(levelno, 1.0)
+        if sample_rate < 1.0 and self._random() >= sample_rate:
+            self.sampled_out_count += 1
+            return None
+
+        if self._level_buckets or self._rate_limit_loggers:
+            now = time.monotonic()
+            level_bucket = self._level_buckets.get(levelno)
+            logger_bucket = self._get_logger_bucket(record.name) if self._rate_limit_loggers else None
+            # a token is only taken from the level bucket if the logger bucket has one as well
+            if (level_bucket is not None and not level_bucket.refill(now)) or (
+                logger_bucket is not None and not logger_bucket.take(now)
+            ):
+                self.rate_limited_count += 1
+                return None
+            if level_bucket is not None:
+                level_bucket.tokens -= 1
+        return sample_rate
+
+    # ----------------------------------------------------------------------
+    def _get_logger_bucket(self, name):
+        try:
+            return self._logger_buckets[name]
+        except KeyError:
+            rate_limit = self._logger_rate_limits.get(name, self._logger_rate_limit)
+            bucket = TokenBucket(*rate_limit) if rate_limit is not None else None
+            self._logger_buckets[name] = bucket
+            return bucket
+
+
+# ----------------------------------------------------------------------
+def copy_record(record, **attributes):
+    """Shallow copy of a log record with additional attributes, leaving the record untouched for other handlers"""
+    record_copy = record.__class__.__new__(record.__class__)
+    record_copy.__dict__.update(record.__dict__)
+    record_copy.__dict__.update(attributes)
+    return record_copy
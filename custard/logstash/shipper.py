@@ -0,0 +1,366 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  shipper.py
+@Time    :  2026/10/18 22:05
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from collections import namedtuple
+from threading import Event, Thread, current_thread
+import json
+import os
+import selectors
+import socket
+import struct
+import time
+
+from custard.logstash.constants import constants
+from custard.logstash.transport import TimeoutNotSet
+from custard.logstash.utils import safe_log_via_print
+
+
+# a frame is a 1-byte kind, the 4-byte big-endian log level of an event (FRAME_NO_LEVEL if unknown)
+# and the 4-byte big-endian length of the payload, followed by the payload
+FRAME_HEADER = struct.Struct("!BiI")
+FRAME_KIND_EVENT = 1
+FRAME_KIND_STATS = 2
+FRAME_NO_LEVEL = -(2**31)
+RECEIVE_BUFFER_SIZE = 64 * 1024
+
+ShipperStats = namedtuple("ShipperStats", ("connections", "received_events", "received_bytes", "backlog"))
+
+
+# ----------------------------------------------------------------------
+def pack_frame(kind, payload, level=None):
+    return FRAME_HEADER.pack(kind, FRAME_NO_LEVEL if level is None else level, len(payload)) + payload
+
+
+class ShipperTransport:
+    """Send events to a LogShipper over its Unix domain socket instead of to Logstash.
+
+    The connection is kept open across sends. A connection inherited from the parent process
+    by `fork()` is not used, the child process connects on its own.
+    The log level of each event is sent along, so the shipper's handler applies the priority lane
+    (constants.QUEUE_PRIORITY_LEVEL) and evicts by level as if they were logged in its own process.
+
+    :param host: The path of the Unix domain socket of the LogShipper
+    :param port: Ignored
+    """
+
+    # the worker passes the levels of the events to send()
+    accepts_levels = True
+
+    # ----------------------------------------------------------------------
+    # pylint: disable=unused-argument
+    def __init__(self, host, port=None, timeout=TimeoutNotSet, **kwargs):
+        self._socket_path = host
+        self._timeout = timeout
+        self._sock = None
+        self._pid = None
+
+    # ----------------------------------------------------------------------
+    def send(self, events, use_logging=False, levels=None):  # pylint: disable=unused-argument
+        if self._sock is not None and self._pid != os.getpid():
+            self._close()
+        self._create_socket()
+        if levels is None:
+            levels = [None] * len(events)
+        data = b"".join(
+            pack_frame(FRAME_KIND_EVENT, self._convert_data_to_send(event), level)
+            for event, level in zip(events, levels)
+        )
+        try:
+            self._sock.sendall(data)
+        except OSError as exc:
+            # the shipper might have been restarted, start over with a new connection
+            self._close()
+            raise ConnectionError(f"Sending events to the shipper at {self._socket_path} failed: {exc}") from exc
+
+    # ----------------------------------------------------------------------
+    def _create_socket(self):
+        if self._sock is not None:
+            return
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self._timeout is not TimeoutNotSet:
+            sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._socket_path)
+        except OSError as exc:
+            sock.close()
+            raise ConnectionError(f"Connecting to the shipper at {self._socket_path} failed: {exc}") from exc
+        self._sock = sock
+        self._pid = os.getpid()
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _convert_data_to_send(data):
+        if not isinstance(data, bytes):
+            return bytes(data, "utf-8")
+        return data
+
+    # ----------------------------------------------------------------------
+    def _close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        self._close()
+
+
+class _Connection:
+    __slots__ = ("sock", "buffer", "output", "reply_deadline", "closed")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, sock):
+        self.sock = sock
+        self.buffer = bytearray()
+        # replies not written yet and the time.monotonic() deadline to write them
+        self.output = bytearray()
+        self.reply_deadline = None
+        self.closed = False
+
+
+class LogShipper:
+    """Receive events of other processes on a Unix domain socket and send them with a single handler.
+
+    Under pre-fork servers each worker process would otherwise run its own worker thread,
+    connection and cache, contending on the same database. With a shipper the processes send
+    their events with the ShipperTransport to one process owning the cache and the connections
+    to Logstash. The events of all processes are batched together.
+    All connections are served by a single thread, so routing events to the workers of a handler
+    with multiple endpoints is serialized. Replies are written whenever the client's socket is
+    writable, a client not reading its reply within constants.SHIPPER_REPLY_TIMEOUT is disconnected.
+
+    :param socket_path: The path of the Unix domain socket, an existing file is replaced
+    :param handler: The AsynchronousLogstashHandler sending the received events, closed on shutdown
+    """
+
+    # ----------------------------------------------------------------------
+    def __init__(self, socket_path, handler):
+        self._socket_path = socket_path
+        self._handler = handler
+        self._selector = None
+        self._listener = None
+        self._wakeup_receiver = None
+        self._wakeup_sender = None
+        self._connections = {}
+        self._thread = None
+        self._shutdown_event = Event()
+        self.received_event_count = 0
+        self.received_byte_count = 0
+
+    # ----------------------------------------------------------------------
+    def start(self):
+        """Listen on the socket and serve the connections in a daemon thread"""
+        self._listen()
+        self._thread = Thread(target=self.serve_forever, name=self.__class__.__name__, daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------------------------------------
+    def serve_forever(self):
+        """Serve the connections until `shutdown()` is called, then close the handler"""
+        self._listen()
+        try:
+            while not self._shutdown_event.is_set():
+                for key, mask in self._selector.select(self._get_select_timeout()):
+                    if key.fileobj is self._listener:
+                        self._accept()
+                    elif key.fileobj is self._wakeup_receiver:
+                        self._wakeup_receiver.recv(RECEIVE_BUFFER_SIZE)
+                    else:
+                        if mask & selectors.EVENT_WRITE:
+                            self._write_output(key.data)
+                        if mask & selectors.EVENT_READ and not key.data.closed:
+                            self._receive(key.data)
+                self._close_stalled_connections()
+        finally:
+            self._close()
+
+    # ----------------------------------------------------------------------
+    def shutdown(self):
+        """Stop serving, wait for the serving thread (if started by `start()`) and close the handler"""
+        self._shutdown_event.set()
+        if self._wakeup_sender is not None:
+            try:
+                self._wakeup_sender.send(b"\0")
+            except OSError:
+                pass  # closed already
+        if self._thread is not None and self._thread is not current_thread():
+            self._thread.join()
+
+    # ----------------------------------------------------------------------
+    def stats(self):
+        return ShipperStats(
+            connections=len(self._connections),
+            received_events=self.received_event_count,
+            received_bytes=self.received_byte_count,
+            backlog=self._handler.backlog,
+        )
+
+    # ----------------------------------------------------------------------
+    def _listen(self):
+        if self._listener is not None:
+            return
+
+        try:
+            os.unlink(self._socket_path)
+        except FileNotFoundError:
+            pass
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(self._socket_path)
+        self._listener.listen()
+        self._listener.setblocking(False)
+        self._wakeup_receiver, self._wakeup_sender = socket.socketpair()
+        self._wakeup_receiver.setblocking(False)
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self._listener, selectors.EVENT_READ)
+        self._selector.register(self._wakeup_receiver, selectors.EVENT_READ)
+
+    # ----------------------------------------------------------------------
+    def _accept(self):
+        try:
+            sock, _ = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        connection = _Connection(sock)
+        self._connections[sock.fileno()] = connection
+        self._selector.register(sock, selectors.EVENT_READ, data=connection)
+
+    # ----------------------------------------------------------------------
+    def _receive(self, connection):
+        try:
+            data = connection.sock.recv(RECEIVE_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        if not data:
+            self._close_connection(connection)
+            return
+
+        connection.buffer += data
+        try:
+            self._process_frames(connection)
+        except Exception as exc:
+            safe_log_via_print("error", f"Error on processing events received by the shipper: {exc}")
+            self._close_connection(connection)
+
+    # ----------------------------------------------------------------------
+    def _process_frames(self, connection):
+        buffer = connection.buffer
+        header_size = FRAME_HEADER.size
+        position = 0
+        while len(buffer) - position >= header_size:
+            kind, level, length = FRAME_HEADER.unpack_from(buffer, position)
+            if length > constants.SHIPPER_MAX_FRAME_SIZE:
+                raise ValueError(f"Frame of {length} bytes exceeds constants.SHIPPER_MAX_FRAME_SIZE")
+            end = position + header_size + length
+            if len(buffer) < end:
+                break  # the rest of the frame is still to be received
+            payload = bytes(buffer[position + header_size : end])
+            position = end
+            if kind == FRAME_KIND_EVENT:
+                self.received_event_count += 1
+                self.received_byte_count += length
+                self._handler.enqueue_event(payload, level=None if level == FRAME_NO_LEVEL else level)
+            elif kind == FRAME_KIND_STATS:
+                response = json.dumps(self.stats()._asdict()).encode("utf-8")
+                self._queue_output(connection, pack_frame(FRAME_KIND_STATS, response))
+                if connection.closed:
+                    return
+            else:
+                raise ValueError(f"Invalid frame kind {kind}")
+        del buffer[:position]
+
+    # ----------------------------------------------------------------------
+    def _queue_output(self, connection, data):
+        connection.output += data
+        if connection.reply_deadline is None:
+            connection.reply_deadline = time.monotonic() + constants.SHIPPER_REPLY_TIMEOUT
+        self._write_output(connection)
+
+    # ----------------------------------------------------------------------
+    def _write_output(self, connection):
+        # never blocks, the rest is written once the selector reports the socket writable
+        try:
+            sent = connection.sock.send(connection.output)
+        except BlockingIOError:
+            sent = 0
+        except OSError:
+            self._close_connection(connection)
+            return
+        del connection.output[:sent]
+        if not connection.output:
+            connection.reply_deadline = None
+        events = selectors.EVENT_READ | selectors.EVENT_WRITE if connection.output else selectors.EVENT_READ
+        if self._selector.get_key(connection.sock).events != events:
+            self._selector.modify(connection.sock, events, data=connection)
+
+    # ----------------------------------------------------------------------
+    def _get_select_timeout(self):
+        deadlines = [
+            connection.reply_deadline
+            for connection in self._connections.values()
+            if connection.reply_deadline is not None
+        ]
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
+
+    # ----------------------------------------------------------------------
+    def _close_stalled_connections(self):
+        now = time.monotonic()
+        for connection in list(self._connections.values()):
+            if connection.reply_deadline is not None and now >= connection.reply_deadline:
+                safe_log_via_print("warning", "Closing a shipper connection not reading its reply")
+                self._close_connection(connection)
+
+    # ----------------------------------------------------------------------
+    def _close_connection(self, connection):
+        if connection.closed:
+            return
+        connection.closed = True
+        self._connections.pop(connection.sock.fileno(), None)
+        self._selector.unregister(connection.sock)
+        connection.sock.close()
+
+    # ----------------------------------------------------------------------
+    def _close(self):
+        for connection in list(self._connections.values()):
+            self._close_connection(connection)
+        for sock in (self._listener, self._wakeup_receiver, self._wakeup_sender):
+            sock.close()
+        self._selector.close()
+        try:
+            os.unlink(self._socket_path)
+        except FileNotFoundError:
+            pass
+        self._handler.close()
+
+
+# ----------------------------------------------------------------------
+def query_shipper_stats(socket_path, timeout=None):
+    """Query the ShipperStats of the LogShipper listening on `socket_path`, e.g. from a monitoring process"""
+    timeout = constants.SOCKET_TIMEOUT if timeout is None else timeout
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(pack_frame(FRAME_KIND_STATS, b""))
+        response = bytearray()
+        while True:
+            if len(response) >= FRAME_HEADER.size:
+                _, _, length = FRAME_HEADER.unpack_from(response)
+                if len(response) >= FRAME_HEADER.size + length:
+                    return ShipperStats(**json.loads(bytes(response[FRAME_HEADER.size :])))
+            data = sock.recv(RECEIVE_BUFFER_SIZE)
+            if not data:
+                raise ConnectionError(f"The shipper at {socket_path} closed the connection")
+            response += data
@@ -0,0 +1,479 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  spool.py
+@Time    :  2026/10/18 22:50
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import mmap
+import os
+import re
+import struct
+import time
+import zlib
+
+from custard.logstash.cache import EVICTION_DROP_OLDEST, EVICTION_POLICIES, Cache
+from custard.logstash.constants import constants
+from custard.logstash.database import DatabaseDiskIOError, DatabaseLockedError
+
+try:
+    import fcntl
+except ImportError:  # Windows, the spool directory is not locked
+    fcntl = None
+
+
+# a record is the header followed by the event: the event length, the CRC32 of the event,
+# the entry date (time.time()) and the log level (NO_LEVEL if unknown)
+RECORD_HEADER = struct.Struct("<IIdi")
+NO_LEVEL = -(2**31)
+# the position of the first event not yet sent: a counter, the segment sequence number, the offset and
+# index in the segment and the CRC32 of these; written alternately into two slots of the checkpoint file
+# in place (renaming a new file is slow on some file systems), so a torn write leaves the other slot valid
+CHECKPOINT = struct.Struct("<QQQQ")
+CHECKPOINT_CRC = struct.Struct("<I")
+CHECKPOINT_SLOT_SIZE = 512
+CHECKPOINT_FILE_NAME = "checkpoint"
+# locked exclusively by the instance using the spool directory
+LOCK_FILE_NAME = "lock"
+SEGMENT_FILE_NAME = "segment-{:016d}.log"
+SEGMENT_FILE_NAME_PATTERN = re.compile(r"segment-(\d{16})\.log")
+
+
+class _Segment:
+    __slots__ = ("sequence", "path", "size", "count", "last_entry_date", "map")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, sequence, path):
+        self.sequence = sequence
+        self.path = path
+        self.size = 0
+        self.count = 0
+        self.last_entry_date = None
+        self.map = None
+
+    # ----------------------------------------------------------------------
+    def get_map(self):
+        # re-mapped when the segment grew since it was mapped, i.e. only the last segment
+        if self.map is None or len(self.map) < self.size:
+            self.close_map()
+            with open(self.path, "rb") as file:
+                self.map = mmap.mmap(file.fileno(), self.size, access=mmap.ACCESS_READ)
+        return self.map
+
+    # ----------------------------------------------------------------------
+    def close_map(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+class FileSpoolCache(Cache):
+    """Keeps events on disk in append-only segment files while attempting to publish them to logstash.
+    Persists log messages through restarts and crashes of a process.
+
+    Events are appended to the last segment, a new segment is started when it would exceed
+    `segment_size` bytes. Events are read in order via `mmap`, the position of the first event
+    not yet sent is stored in a checkpoint file whenever events were sent. Segments are deleted
+    as a whole once all their events are sent, expired or evicted, so neither sending nor
+    deleting events rewrites any data. After a crash all events after the checkpoint are sent
+    (again), a partially written event at the end of a segment is discarded.
+
+    Expiry and eviction work at segment granularity: a segment expires when its newest event is
+    older than the TTL, the size budget is enforced by dropping the oldest segments (whatever
+    the eviction policy). Requeuing events puts all fetched events back, the worker always
+    requeues a batch as a whole.
+
+    A spool directory has a single writer: the first instance opening it holds an exclusive lock
+    until it is closed, other instances, also of other processes, raise a DatabaseLockedError
+    meanwhile (the worker retries later). Use a spool directory per handler and process.
+
+    :param path: Path to the spool directory, created if necessary
+    :param event_ttl: Optional parameter used to expire events in the spool after a time
+    :param max_events: Optional maximum number of events in the spool
+    :param max_bytes: Optional maximum size of the events in the spool
+    :param eviction_policy: Accepted for compatibility with the other caches, see above
+    :param segment_size: Maximum size of a segment file (default: `constants.SPOOL_SEGMENT_SIZE`)
+    """
+
+    # ----------------------------------------------------------------------
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+    def __init__(
+        self,
+        path,
+        event_ttl=None,
+        max_events=None,
+        max_bytes=None,
+        eviction_policy=EVICTION_DROP_OLDEST,
+        segment_size=None,
+    ):
+        if eviction_policy not in EVICTION_POLICIES:
+            raise ValueError(f"Invalid eviction policy '{eviction_policy}', use one of: {', '.join(EVICTION_POLICIES)}")
+
+        self._path = path
+        self._event_ttl = event_ttl
+        self._max_events = max_events
+        self._max_bytes = max_bytes
+        self._segment_size = segment_size or constants.SPOOL_SEGMENT_SIZE
+        # oldest first, the last one is opened for appending
+        self._segments = []
+        self._file = None
+        # the first event not yet sent, in the first segment
+        self._ack_offset = 0
+        self._ack_index = 0
+        self._checkpoint = None
+        self._checkpoint_counter = 0
+        self._checkpoint_file = None
+        self._lock_file = None
+        # the next event to be fetched, in self._segments[self._read_position]
+        self._read_position = 0
+        self._read_offset = 0
+        self._read_index = 0
+        self.evicted_count = 0
+
+    # ----------------------------------------------------------------------
+    def _open(self):
+        if self._file is not None:
+            return
+
+        try:
+            os.makedirs(self._path, exist_ok=True)
+            self._lock()
+            self._load_segments()
+            checkpoint_path = os.path.join(self._path, CHECKPOINT_FILE_NAME)
+            self._checkpoint_file = open(  # pylint: disable=consider-using-with
+                os.open(checkpoint_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b", buffering=0
+            )
+            self._file = open(self._segments[-1].path, "ab")  # pylint: disable=consider-using-with
+        except OSError as exc:
+            self._close_segments()
+            raise DatabaseDiskIOError from exc
+
+    # ----------------------------------------------------------------------
+    def _lock(self):
+        lock_path = os.path.join(self._path, LOCK_FILE_NAME)
+        self._lock_file = open(  # pylint: disable=consider-using-with
+            os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644), "r+b", buffering=0
+        )
+        if fcntl is None:
+            return
+        try:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as exc:
+            self._lock_file.close()
+            self._lock_file = None
+            raise DatabaseLockedError(f"The spool directory '{self._path}' is used by another instance") from exc
+
+    # ----------------------------------------------------------------------
+    def _load_segments(self):
+        self._segments = []
+        checkpoint = self._read_checkpoint()
+        sequences = sorted(
+            int(match.group(1))
+            for match in (SEGMENT_FILE_NAME_PATTERN.fullmatch(name) for name in os.listdir(self._path))
+            if match is not None
+        )
+        for sequence in sequences:
+            segment = _Segment(sequence, os.path.join(self._path, SEGMENT_FILE_NAME.format(sequence)))
+            if checkpoint is not None and sequence < checkpoint[0]:
+                os.unlink(segment.path)  # sent, but not deleted before a crash
+                continue
+            self._recover_segment(segment)
+            self._segments.append(segment)
+
+        # segments emptied by the recovery are of no use, except for appending
+        for segment in self._segments[:-1]:
+            if not segment.count:
+                os.unlink(segment.path)
+                self._segments.remove(segment)
+        self._ack_offset = self._ack_index = 0
+        if self._segments and checkpoint is not None and self._segments[0].sequence == checkpoint[0]:
+            self._ack_offset = min(checkpoint[1], self._segments[0].size)
+            self._ack_index = min(checkpoint[2], self._segments[0].count)
+        if not self._segments:
+            last_sequence = max(sequences[-1] if sequences else 0, checkpoint[0] if checkpoint is not None else 0)
+            self._segments.append(self._create_segment(last_sequence + 1))
+        self._checkpoint = checkpoint
+        self._reset_read_position()
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _recover_segment(segment):
+        """Scan the events of the segment, cut off a partially written event at its end"""
+        file_size = os.path.getsize(segment.path)
+        segment.size = file_size
+        if not file_size:
+            return
+
+        data = segment.get_map()
+        offset = 0
+        while offset + RECORD_HEADER.size <= file_size:
+            length, crc, entry_date, _ = RECORD_HEADER.unpack_from(data, offset)
+            end = offset + RECORD_HEADER.size + length
+            if end > file_size or zlib.crc32(data[offset + RECORD_HEADER.size : end]) != crc:
+                break
+            segment.count += 1
+            segment.last_entry_date = entry_date
+            offset = end
+        segment.close_map()
+        segment.size = offset
+        if offset < file_size:
+            os.truncate(segment.path, offset)
+
+    # ----------------------------------------------------------------------
+    def _create_segment(self, sequence):
+        segment = _Segment(sequence, os.path.join(self._path, SEGMENT_FILE_NAME.format(sequence)))
+        with open(segment.path, "ab"):
+            pass
+        return segment
+
+    # ----------------------------------------------------------------------
+    def _roll_segment(self):
+        self._file.close()
+        self._file = None
+        segment = self._create_segment(self._segments[-1].sequence + 1)
+        self._segments.append(segment)
+        self._file = open(segment.path, "ab")  # pylint: disable=consider-using-with
+        return segment
+
+    # ----------------------------------------------------------------------
+    def _read_checkpoint(self):
+        """The latest valid checkpoint (segment sequence number, offset, index) or None"""
+        try:
+            with open(os.path.join(self._path, CHECKPOINT_FILE_NAME), "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            return None
+        checkpoint = None
+        for slot in (0, 1):
+            offset = slot * CHECKPOINT_SLOT_SIZE
+            slot_data = data[offset : offset + CHECKPOINT.size + CHECKPOINT_CRC.size]
+            if len(slot_data) < CHECKPOINT.size + CHECKPOINT_CRC.size:
+                continue
+            (crc,) = CHECKPOINT_CRC.unpack_from(slot_data, CHECKPOINT.size)
+            if zlib.crc32(slot_data[: CHECKPOINT.size]) != crc:
+                continue  # torn write
+            counter, *position = CHECKPOINT.unpack_from(slot_data)
+            if checkpoint is None or counter > self._checkpoint_counter:
+                self._checkpoint_counter = counter
+                checkpoint = tuple(position)
+        return checkpoint
+
+    # ----------------------------------------------------------------------
+    def _write_checkpoint(self):
+        checkpoint = (self._segments[0].sequence, self._ack_offset, self._ack_index)
+        if checkpoint == self._checkpoint:
+            return
+        data = CHECKPOINT.pack(self._checkpoint_counter + 1, *checkpoint)
+        self._checkpoint_file.seek((self._checkpoint_counter + 1) % 2 * CHECKPOINT_SLOT_SIZE)
+        self._checkpoint_file.write(data + CHECKPOINT_CRC.pack(zlib.crc32(data)))
+        if constants.SPOOL_FSYNC:
+            os.fsync(self._checkpoint_file.fileno())
+        self._checkpoint_counter += 1
+        self._checkpoint = checkpoint
+
+    # ----------------------------------------------------------------------
+    def add_event(self, event, level=None):
+        self.add_events([event], [level])
+
+    # ----------------------------------------------------------------------
+    def add_events(self, events, levels=None):
+        if levels is None:
+            levels = [None] * len(events)
+        self._open()
+        entry_date = time.time()
+        segment = self._segments[-1]
+        records = []
+        records_size = 0
+        try:
+            for event, level in zip(events, levels):
+                if not isinstance(event, bytes):
+                    event = event.encode("utf-8")
+                record = (
+                    RECORD_HEADER.pack(len(event), zlib.crc32(event), entry_date, NO_LEVEL if level is None else level)
+                    + event
+                )
+                if segment.size + records_size + len(record) > self._segment_size and segment.size + records_size:
+                    self._append(segment, records, records_size, entry_date)
+                    segment = self._roll_segment()
+                    records = []
+                    records_size = 0
+                records.append(record)
+                records_size += len(record)
+            self._append(segment, records, records_size, entry_date)
+        except OSError as exc:
+            raise DatabaseDiskIOError from exc
+
+    # ----------------------------------------------------------------------
+    def _append(self, segment, records, records_size, entry_date):
+        if not records:
+            return
+        try:
+            self._file.write(b"".join(records))
+            self._file.flush()
+            if constants.SPOOL_FSYNC:
+                os.fsync(self._file.fileno())
+        except OSError:
+            # do not leave a partially written event in front of the next ones
+            self._file.close()
+            self._file = None
+            os.truncate(segment.path, segment.size)
+            self._file = open(segment.path, "ab")  # pylint: disable=consider-using-with
+            raise
+        segment.size += records_size
+        segment.count += len(records)
+        segment.last_entry_date = entry_date
+
+    # ----------------------------------------------------------------------
+    def get_queued_events(self, batch_size=None):
+        self._open()
+        events = []
+        batch_size = batch_size or constants.QUEUED_EVENTS_BATCH_SIZE
+        segment = self._segments[self._read_position]
+        while len(events) < batch_size:
+            if self._read_offset >= segment.size:
+                if self._read_position == len(self._segments) - 1:
+                    break
+                self._read_position += 1
+                self._read_offset = self._read_index = 0
+                segment = self._segments[self._read_position]
+                continue
+
+            data = segment.get_map()
+            offset = self._read_offset
+            while offset < segment.size and len(events) < batch_size:
+                length, _, _, level = RECORD_HEADER.unpack_from(data, offset)
+                start = offset + RECORD_HEADER.size
+                offset = start + length
+                events.append(
+                    {
+                        "id": (segment.sequence, self._read_index),
+                        "event_text": data[start:offset],
+                        "event_level": None if level == NO_LEVEL else level,
+                    }
+                )
+                self._read_index += 1
+            self._read_offset = offset
+        return events
+
+    # ----------------------------------------------------------------------
+    def requeue_queued_events(self, events):
+        # the events are fetched in order, so requeuing puts back all fetched events
+        self._reset_read_position()
+
+    # ----------------------------------------------------------------------
+    def _reset_read_position(self):
+        self._read_position = 0
+        self._read_offset = self._ack_offset
+        self._read_index = self._ack_index
+
+    # ----------------------------------------------------------------------
+    def delete_queued_events(self):
+        if self._file is None:
+            return
+        try:
+            for _ in range(self._read_position):
+                self._remove_first_segment()
+            self._ack_offset = self._read_offset
+            self._ack_index = self._read_index
+            self._write_checkpoint()
+        except OSError as exc:
+            raise DatabaseDiskIOError from exc
+
+    # ----------------------------------------------------------------------
+    def _remove_first_segment(self):
+        """Remove the first segment (all its events are sent or dropped), return the count of dropped events"""
+        segment = self._segments[0]
+        if len(self._segments) == 1:
+            self._roll_segment()
+        dropped_count = segment.count - self._ack_index
+        segment.close_map()
+        del self._segments[0]
+        os.unlink(segment.path)
+        self._ack_offset = self._ack_index = 0
+        if self._read_position:
+            self._read_position -= 1
+        else:
+            # fetched events of the segment are dropped as well
+            self._read_offset = self._read_index = 0
+        return dropped_count
+
+    # ----------------------------------------------------------------------
+    def expire_events(self):
+        if self._event_ttl is None:
+            return 0
+
+        self._open()
+        delete_time = time.time() - self._event_ttl
+        expired_count = 0
+        try:
+            while self._segments[0].count and self._segments[0].last_entry_date < delete_time:
+                expired_count += self._remove_first_segment()
+            if expired_count:
+                self._write_checkpoint()
+        except OSError as exc:
+            raise DatabaseDiskIOError from exc
+        return expired_count
+
+    # ----------------------------------------------------------------------
+    def count_events(self):
+        self._open()
+        return sum(segment.count for segment in self._segments) - self._ack_index
+
+    # ----------------------------------------------------------------------
+    def _count_bytes(self):
+        return sum(segment.size for segment in self._segments) - self._ack_offset
+
+    # ----------------------------------------------------------------------
+    def evict_events(self):
+        if self._max_events is None and self._max_bytes is None:
+            return 0
+
+        self._open()
+        evicted_count = 0
+        try:
+            # events fetched to be sent are kept, like by the other caches
+            while self._segments[0].count and not self._has_fetched_events() and self._exceeds_budget():
+                evicted_count += self._remove_first_segment()
+            if evicted_count:
+                self._write_checkpoint()
+        except OSError as exc:
+            raise DatabaseDiskIOError from exc
+        self.evicted_count += evicted_count
+        return evicted_count
+
+    # ----------------------------------------------------------------------
+    def _has_fetched_events(self):
+        return self._read_position > 0 or self._read_offset > self._ack_offset
+
+    # ----------------------------------------------------------------------
+    def _exceeds_budget(self):
+        if self._max_events is not None and self.count_events() > self._max_events:
+            return True
+        return self._max_bytes is not None and self._count_bytes() > self._max_bytes
+
+    # ----------------------------------------------------------------------
+    def _close_segments(self):
+        for segment in self._segments:
+            segment.close_map()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._checkpoint_file is not None:
+            self._checkpoint_file.close()
+            self._checkpoint_file = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the lock
+            self._lock_file = None
+
+    # ----------------------------------------------------------------------
+    def close(self):
+        if self._file is None:
+            return
+        try:
+            self._write_checkpoint()
+        finally:
+            self._close_segments()
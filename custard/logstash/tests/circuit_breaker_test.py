@@ -0,0 +1,118 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  circuit_breaker_test.py
+@Time    :  2026/10/18 23:30
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import unittest
+
+from custard.logstash.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _create_breaker(self, failure_threshold=3, jitter=0.0):
+        breaker = CircuitBreaker(failure_threshold=failure_threshold, backoff_min=1.0, backoff_max=4.0, jitter=jitter)
+        transitions = []
+        breaker.add_listener(lambda _, old_state, new_state: transitions.append((old_state, new_state)))
+        return breaker, transitions
+
+    # ----------------------------------------------------------------------
+    def test_opens_after_threshold(self):
+        breaker, transitions = self._create_breaker()
+        breaker.record_failure(now=0)
+        breaker.record_failure(now=0)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertTrue(breaker.allow_request(now=0))
+
+        breaker.record_failure(now=0)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertEqual(breaker.retry_delay, 1.0)
+        self.assertFalse(breaker.allow_request(now=0.5))
+        self.assertEqual(transitions, [(STATE_CLOSED, STATE_OPEN)])
+        self.assertEqual(breaker.open_count, 1)
+
+    # ----------------------------------------------------------------------
+    def test_success_resets_failures(self):
+        breaker, transitions = self._create_breaker()
+        breaker.record_failure(now=0)
+        breaker.record_failure(now=0)
+        breaker.record_success()
+        breaker.record_failure(now=0)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertEqual(transitions, [])
+
+    # ----------------------------------------------------------------------
+    def test_half_open_probe(self):
+        breaker, transitions = self._create_breaker(failure_threshold=1)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow_request(now=1.0))
+        self.assertEqual(breaker.state, STATE_HALF_OPEN)
+
+        # failed probe: open again with a doubled delay, capped at the maximum
+        breaker.record_failure(now=1.0)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertEqual(breaker.retry_delay, 2.0)
+        for now in (3.0, 7.0):
+            self.assertTrue(breaker.allow_request(now=now))
+            breaker.record_failure(now=now)
+        self.assertEqual(breaker.retry_delay, 4.0)
+        self.assertFalse(breaker.allow_request(now=10.0))
+
+        self.assertTrue(breaker.allow_request(now=11.0))
+        breaker.record_success()
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertIsNone(breaker.retry_at)
+        self.assertEqual(
+            transitions[:3], [(STATE_CLOSED, STATE_OPEN), (STATE_OPEN, STATE_HALF_OPEN), (STATE_HALF_OPEN, STATE_OPEN)]
+        )
+        self.assertEqual(transitions[-1], (STATE_HALF_OPEN, STATE_CLOSED))
+        self.assertEqual(breaker.open_count, 4)
+
+        # the backoff starts over after the circuit closed
+        breaker.record_failure(now=20.0)
+        self.assertEqual(breaker.retry_delay, 1.0)
+
+    # ----------------------------------------------------------------------
+    def test_forced_failure_while_open_keeps_delay(self):
+        breaker, transitions = self._create_breaker(failure_threshold=1)
+        breaker.record_failure(now=0)
+        breaker.record_failure(now=0.5)
+        self.assertEqual(breaker.retry_at, 1.0)
+        self.assertEqual(len(transitions), 1)
+
+    # ----------------------------------------------------------------------
+    def test_jitter(self):
+        breaker, _ = self._create_breaker(failure_threshold=1, jitter=0.5)
+        for _ in range(20):
+            breaker.record_success()
+            breaker.record_failure(now=0)
+            self.assertGreaterEqual(breaker.retry_delay, 0.5)
+            self.assertLessEqual(breaker.retry_delay, 1.0)
+
+    # ----------------------------------------------------------------------
+    def test_disabled(self):
+        breaker, transitions = self._create_breaker(failure_threshold=None)
+        for _ in range(10):
+            breaker.record_failure(now=0)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        self.assertTrue(breaker.allow_request(now=0))
+        self.assertEqual(transitions, [])
+
+    # ----------------------------------------------------------------------
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=0, backoff_min=1.0, backoff_max=2.0)
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=1, backoff_min=2.0, backoff_max=1.0)
+        with self.assertRaises(ValueError):
+            CircuitBreaker(failure_threshold=1, backoff_min=1.0, backoff_max=2.0, jitter=1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
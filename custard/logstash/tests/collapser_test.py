@@ -0,0 +1,141 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  collapser_test.py
+@Time    :  2026/10/18 19:55
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import makeLogRecord
+import sys
+import unittest
+
+from custard.logstash.collapser import DuplicateCollapser
+
+
+# pylint: disable=protected-access
+
+
+def format_record(record):
+    return record.getMessage().encode()
+
+
+def other_format_record(record):
+    return record.getMessage().encode()
+
+
+def _raise(exc_class):
+    raise exc_class("failed")
+
+
+class DuplicateCollapserTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _add(self, collapser, now, args=("a",), template="message %s", level=20, name="test", **kwargs):
+        record = makeLogRecord({"msg": template % args, "name": name, "created": 1675062335.0 + now, **kwargs})
+        return collapser.add(record, template, args, kwargs.get("format_record", format_record), level, now=now)
+
+    # ----------------------------------------------------------------------
+    def test_collapse(self):
+        collapser = DuplicateCollapser(window=10, max_windows=10, args_sample_size=2)
+        self.assertTrue(self._add(collapser, 0))
+        self.assertFalse(self._add(collapser, 1, args=("b",)))
+        self.assertFalse(self._add(collapser, 2, args=("c",)))
+        self.assertFalse(self._add(collapser, 3, args=("b",)))
+        self.assertEqual(collapser.pop_closed(now=9.9), [])
+
+        closed = collapser.pop_closed(now=10)
+        self.assertEqual(len(closed), 1)
+        record, closed_format_record, level = closed[0]
+        self.assertIs(closed_format_record, format_record)
+        self.assertEqual(level, 20)
+        self.assertEqual(record.msg, "message b")
+        self.assertEqual(record.repeat_count, 3)
+        self.assertEqual(record.repeat_first_timestamp, "2023-01-30T07:05:36.000Z")
+        self.assertEqual(record.repeat_last_timestamp, "2023-01-30T07:05:38.000Z")
+        self.assertEqual(record.repeat_args_sample, ["('b',)", "('c',)"])
+        self.assertEqual(collapser.collapsed_count, 3)
+        self.assertEqual(len(collapser), 0)
+
+        # a new window is opened by the next record
+        self.assertTrue(self._add(collapser, 11))
+
+    # ----------------------------------------------------------------------
+    def test_single_record_not_repeated(self):
+        collapser = DuplicateCollapser(window=10, max_windows=10, args_sample_size=2)
+        self.assertTrue(self._add(collapser, 0))
+        self.assertEqual(collapser.pop_closed(force=True), [])
+        self.assertEqual(len(collapser), 0)
+
+    # ----------------------------------------------------------------------
+    def test_expired_window_closed_on_add(self):
+        collapser = DuplicateCollapser(window=10, max_windows=10, args_sample_size=2)
+        self._add(collapser, 0)
+        self._add(collapser, 1)
+        self.assertTrue(self._add(collapser, 10))
+        self.assertEqual(len(collapser), 1)
+        self.assertEqual([record.repeat_count for record, _, _ in collapser.pop_closed(now=10)], [1])
+
+    # ----------------------------------------------------------------------
+    def test_key(self):
+        collapser = DuplicateCollapser(window=10, max_windows=10, args_sample_size=2)
+        self.assertTrue(self._add(collapser, 0))
+        self.assertTrue(self._add(collapser, 0, template="other %s"))
+        self.assertTrue(self._add(collapser, 0, level=40))
+        self.assertTrue(self._add(collapser, 0, name="other"))
+        self.assertTrue(self._add(collapser, 0, format_record=other_format_record))
+        # the arguments are not part of the key
+        self.assertFalse(self._add(collapser, 0, args=("b",)))
+        # message objects are never collapsed
+        record = makeLogRecord({"msg": {"a": 1}})
+        self.assertTrue(collapser.add(record, record.msg, None, format_record, 20, now=0))
+        self.assertTrue(collapser.add(record, record.msg, None, format_record, 20, now=0))
+        self.assertEqual(len(collapser), 5)
+
+    # ----------------------------------------------------------------------
+    def test_exception_site(self):
+        collapser = DuplicateCollapser(window=10, max_windows=10, args_sample_size=2)
+        exc_infos = []
+        for exc_class in (ValueError, ValueError, KeyError):
+            try:
+                _raise(exc_class)
+            except exc_class:
+                exc_infos.append(sys.exc_info())
+        try:
+            raise ValueError("failed")
+        except ValueError:
+            exc_infos.append(sys.exc_info())
+
+        self.assertTrue(self._add(collapser, 0, exc_info=exc_infos[0]))
+        self.assertFalse(self._add(collapser, 0, exc_info=exc_infos[1]))
+        self.assertTrue(self._add(collapser, 0, exc_info=exc_infos[2]))
+        self.assertTrue(self._add(collapser, 0, exc_info=exc_infos[3]))
+        self.assertTrue(self._add(collapser, 0))
+
+    # ----------------------------------------------------------------------
+    def test_max_windows(self):
+        collapser = DuplicateCollapser(window=10, max_windows=2, args_sample_size=2)
+        for template in ("first %s", "second %s"):
+            self._add(collapser, 0, template=template)
+            self._add(collapser, 1, template=template)
+        self.assertTrue(self._add(collapser, 2, template="third %s"))
+        self.assertEqual(len(collapser), 2)
+        # the oldest window has been closed early
+        closed = collapser.pop_closed(now=2)
+        self.assertEqual([record.msg for record, _, _ in closed], ["first a"])
+        closed = collapser.pop_closed(force=True)
+        self.assertEqual([record.msg for record, _, _ in closed], ["second a"])
+        self.assertEqual(len(collapser), 0)
+
+    # ----------------------------------------------------------------------
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            DuplicateCollapser(window=0, max_windows=10, args_sample_size=2)
+        with self.assertRaises(ValueError):
+            DuplicateCollapser(window=10, max_windows=0, args_sample_size=2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -15,6 +15,7 @@ import sqlite3
 import time
 import unittest
 
+from custard.logstash.cache import EVICTION_DROP_LOWEST_LEVEL, EVICTION_SAMPLE
 from custard.logstash.constants import constants
 from custard.logstash.database import DATABASE_SCHEMA_STATEMENTS, DatabaseCache, DatabaseDiskIOError
 
@@ -88,6 +89,14 @@ class DatabaseCacheTest(unittest.TestCase):
         event = events[0]
         self.assertEqual(event["event_text"], "message")
 
+    # ----------------------------------------------------------------------
+    def test_add_events(self):
+        self.cache.add_events(["message 1", "message 2", "message 3"])
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        events = cursor.execute("SELECT `event_text` FROM `event` ORDER BY `event_id`;").fetchall()
+        self.assertEqual([event["event_text"] for event in events], ["message 1", "message 2", "message 3"])
+
     # ----------------------------------------------------------------------
     def test_get_queued_events(self):
         self.cache.add_event("message")
@@ -159,12 +168,150 @@ class DatabaseCacheTest(unittest.TestCase):
     def test_expire_events(self):
         self.cache._event_ttl = 0
         self.cache.add_event("message")
+        self.assertEqual(self.cache.count_events(), 1)
         time.sleep(1)
-        self.cache.expire_events()
+        self.assertEqual(self.cache.expire_events(), 1)
+        self.assertEqual(self.cache.count_events(), 0)
 
         events = self.cache.get_queued_events()
         self.assertEqual(len(events), 0)
 
+    # ----------------------------------------------------------------------
+    def _pending_texts(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 100
+        return [event["event_text"] for event in self.cache.get_queued_events()]
+
+    # ----------------------------------------------------------------------
+    def test_evict_drop_oldest(self):
+        self.cache._max_events = 2
+        self.cache.add_events([f"message {index}" for index in range(5)])
+        self.assertEqual(self.cache.evict_events(), 3)
+        self.assertEqual(self.cache.evicted_count, 3)
+        self.assertEqual(self._pending_texts(), ["message 3", "message 4"])
+
+    # ----------------------------------------------------------------------
+    def test_evict_drop_lowest_level(self):
+        self.cache._max_events = 3
+        self.cache._eviction_policy = EVICTION_DROP_LOWEST_LEVEL
+        self.cache.add_events(["error 1", "debug 1", "info 1", "debug 2", "info 2"], [40, 10, 20, 10, 20])
+        self.assertEqual(self.cache.evict_events(), 2)
+        self.assertEqual(self._pending_texts(), ["error 1", "info 1", "info 2"])
+
+    # ----------------------------------------------------------------------
+    def test_evict_sample(self):
+        self.cache._max_events = 10
+        self.cache._eviction_policy = EVICTION_SAMPLE
+        self.cache.add_events([f"message {index}" for index in range(100)])
+        for _ in range(100):
+            if not self.cache.evict_events():
+                break
+        self.assertEqual(len(self._pending_texts()), 10)
+
+    # ----------------------------------------------------------------------
+    def test_evict_max_bytes(self):
+        self.cache._max_bytes = 64 * 1024
+        self.cache.add_events(["x" * 1024 for _ in range(200)])
+        self.assertGreater(self.cache.evict_events(), 0)
+        self.assertLess(len(self._pending_texts()), 200)
+
+    # ----------------------------------------------------------------------
+    def test_evict_in_flight_events_are_kept(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 2
+        self.cache._max_events = 1
+        self.cache.add_events(["message 1", "message 2"])
+        self.cache.get_queued_events()
+        self.assertEqual(self.cache.evict_events(), 0)
+
+    # ----------------------------------------------------------------------
+    def test_schema_migration(self):
+        self.cache.close()
+        self.close_connection()
+        os.remove(self.TEST_DB_FILENAME)
+        connection = sqlite3.connect(self.TEST_DB_FILENAME)
+        connection.execute(
+            "CREATE TABLE `event` (`event_id` INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT, "
+            "`event_text` TEXT NOT NULL, `pending_delete` INTEGER NOT NULL, `entry_date` DATETIME NOT NULL);"
+        )
+        connection.execute("INSERT INTO `event` VALUES (1, 'old message', 0, datetime('now'));")
+        connection.commit()
+        connection.close()
+
+        self.cache.add_event("new message", 20)
+        self.assertEqual(self._pending_texts(), ["old message", "new message"])
+
+
+class DatabaseCacheSpoolTest(DatabaseCacheTest):
+    TEST_DB_AUX_FILENAMES = ("test.db-wal", "test.db-shm")
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def setUpClass(cls):
+        # do not re-use the connection of the parent test case, its database file has been removed
+        cls.close_connection()
+        super().setUpClass()
+
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.cache = DatabaseCache(self.TEST_DB_FILENAME, spool=True)
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        super().tearDown()
+        self.cache.close()
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def tearDownClass(cls):
+        cls.close_connection()
+        super().tearDownClass()
+        cls.remove_aux_files()
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def remove_aux_files(cls):
+        for filename in cls.TEST_DB_AUX_FILENAMES:
+            if os.path.isfile(filename):
+                os.remove(filename)
+
+    # ----------------------------------------------------------------------
+    def test_disk_io_exception(self):
+        self.cache.add_event("message")
+        # file permissions are only checked when opening the database and writes go into the
+        # WAL file while any other connection is open, so drop all connections
+        self.cache.close()
+        self.close_connection()
+        with self.assertRaises(DatabaseDiskIOError):
+            # change permissions to produce error
+            os.chmod(os.path.abspath("test.db"), S_IREAD | S_IRGRP | S_IROTH)
+            self.cache.add_event("message")
+        os.chmod(os.path.abspath("test.db"), S_IWUSR | S_IREAD)
+        # the WAL index has been created with the read-only permissions of the database
+        self.cache.close()
+        self.remove_aux_files()
+
+    # ----------------------------------------------------------------------
+    def test_connection_is_kept_open(self):
+        self.cache.add_event("message")
+        connection = self.cache._connection
+        self.assertIsNotNone(connection)
+        self.cache.get_queued_events()
+        self.assertIs(self.cache._connection, connection)
+
+    # ----------------------------------------------------------------------
+    def test_journal_mode(self):
+        self.cache.add_event("message")
+        journal_mode = self.cache._connection.execute("PRAGMA journal_mode;").fetchone()[0]
+        self.assertEqual(journal_mode.upper(), constants.DATABASE_SPOOL_JOURNAL_MODE)
+
+    # ----------------------------------------------------------------------
+    def test_close(self):
+        self.cache.add_event("message")
+        self.cache.close()
+        self.assertIsNone(self.cache._connection)
+        # the connection is re-opened on demand
+        events = self.cache.get_queued_events()
+        self.assertEqual(len(events), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,133 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  event_queue_test.py
+@Time    :  2026/10/18 12:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from queue import Empty
+from threading import Thread
+import time
+import unittest
+
+from custard.logstash.event_queue import (
+    OVERFLOW_BLOCK,
+    OVERFLOW_DROP_NEWEST,
+    OVERFLOW_DROP_OLDEST,
+    EventQueue,
+)
+
+
+class EventQueueTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _drain(self, queue):
+        events = []
+        while True:
+            try:
+                events.append(queue.get_nowait())
+            except Empty:
+                return events
+
+    # ----------------------------------------------------------------------
+    def test_fifo_order(self):
+        queue = EventQueue()
+        for event in (b"c", b"a", b"b"):
+            queue.put(event)
+        self.assertEqual(self._drain(queue), [b"c", b"a", b"b"])
+
+    # ----------------------------------------------------------------------
+    def test_empty(self):
+        queue = EventQueue()
+        with self.assertRaises(Empty):
+            queue.get_nowait()
+
+    # ----------------------------------------------------------------------
+    def test_priority_lane(self):
+        queue = EventQueue()
+        queue.put(b"info 1")
+        queue.put(b"error 1", priority=True)
+        queue.put(b"info 2")
+        queue.put(b"error 2", priority=True)
+        self.assertEqual(queue.qsize(), 4)
+        self.assertEqual(self._drain(queue), [b"error 1", b"error 2", b"info 1", b"info 2"])
+
+    # ----------------------------------------------------------------------
+    def test_invalid_overflow_policy(self):
+        with self.assertRaises(ValueError):
+            EventQueue(maxsize=1, overflow="drop_all")
+
+    # ----------------------------------------------------------------------
+    def test_drop_newest(self):
+        queue = EventQueue(maxsize=2, overflow=OVERFLOW_DROP_NEWEST)
+        self.assertTrue(queue.put(b"1"))
+        self.assertTrue(queue.put(b"2"))
+        self.assertFalse(queue.put(b"3"))
+        self.assertEqual(queue.dropped_count, 1)
+        self.assertEqual(self._drain(queue), [b"1", b"2"])
+
+    # ----------------------------------------------------------------------
+    def test_drop_oldest(self):
+        queue = EventQueue(maxsize=2, overflow=OVERFLOW_DROP_OLDEST)
+        queue.put(b"error", priority=True)
+        queue.put(b"1")
+        self.assertTrue(queue.put(b"2"))
+        self.assertTrue(queue.put(b"3"))
+        self.assertEqual(queue.dropped_count, 2)
+        # the priority lane is only dropped if the normal lane is empty
+        self.assertEqual(self._drain(queue), [b"error", b"3"])
+
+    # ----------------------------------------------------------------------
+    def test_block_timeout(self):
+        queue = EventQueue(maxsize=1, overflow=OVERFLOW_BLOCK)
+        queue.put(b"1")
+        self.assertFalse(queue.put(b"2", timeout=0.05))
+        self.assertEqual(queue.dropped_count, 1)
+
+    # ----------------------------------------------------------------------
+    def test_block_until_consumed(self):
+        queue = EventQueue(maxsize=1, overflow=OVERFLOW_BLOCK)
+        queue.put(b"1")
+
+        def consume():
+            time.sleep(0.05)
+            queue.get_nowait()
+
+        consumer = Thread(target=consume)
+        consumer.start()
+        self.assertTrue(queue.put(b"2", timeout=5))
+        consumer.join()
+        self.assertEqual(queue.dropped_count, 0)
+        self.assertEqual(self._drain(queue), [b"2"])
+
+    # ----------------------------------------------------------------------
+    def test_requeue(self):
+        queue = EventQueue(maxsize=2, overflow=OVERFLOW_DROP_NEWEST)
+        queue.put(b"1")
+        queue.put(b"2")
+        events = [queue.get_nowait(), queue.get_nowait()]
+        queue.put(b"3")
+        queue.requeue(events)
+        # requeued events are not subject to the size limit and keep their order
+        self.assertEqual(self._drain(queue), [b"1", b"2", b"3"])
+        self.assertEqual(queue.dropped_count, 0)
+
+    # ----------------------------------------------------------------------
+    def test_requeue_priority(self):
+        queue = EventQueue()
+        queue.put(b"error 1", priority=True)
+        queue.put(b"info 1")
+        events = [queue.get_nowait(), queue.get_nowait()]
+        queue.put(b"error 2", priority=True)
+        queue.put(b"info 2")
+        queue.requeue(events[1:])
+        queue.requeue(events[:1], priority=True)
+        # events taken from the priority lane stay ahead of newer priority events
+        self.assertEqual(self._drain(queue), [b"error 1", b"error 2", b"info 1", b"info 2"])
+
+
+if __name__ == "__main__":
+    unittest.main()
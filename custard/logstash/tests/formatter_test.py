@@ -9,12 +9,18 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  None
 """
-from logging import FileHandler, makeLogRecord
+from datetime import date, datetime
+from logging import FileHandler, getLogger, makeLogRecord
+import json
 import os
 import sys
+import traceback
 import unittest
+import uuid
 
-from custard.logstash.formatter import LogstashFormatter
+from custard.logstash.constants import constants
+from custard.logstash.formatter import LogstashFormatter, TracebackCache, format_timestamp
+from custard.utils.serializer import COMPONENT_LOGSTASH, StdlibJsonSerializer, available_serializers, set_serializer
 
 
 # pylint: disable=protected-access
@@ -66,6 +72,270 @@ class LogstashFormatterTest(unittest.TestCase):
         result = formatter._format_timestamp(test_time_microsecond2)
         self.assertEqual(result, "2023-01-30T07:05:35.025Z")
 
+    def test_format_timestamp_rounded_to_next_second(self):
+        formatter = LogstashFormatter()
+        formatter._format_timestamp(1675062335.5)
+        # the microseconds are rounded up to the next second like datetime.utcfromtimestamp() does
+        result = formatter._format_timestamp(1675062335.9999996)
+        self.assertEqual(result, "2023-01-30T07:05:36.000Z")
+
+    def test_format_timestamp_same_as_datetime(self):
+        formatter = LogstashFormatter()
+        for time_ in (0, 1.9999994, 1.9999995, -1.5, 1675062335.0000005, 1675062335.999, 1675062336.0):
+            timestamp = datetime.utcfromtimestamp(time_)
+            expected = f"{timestamp.strftime('%Y-%m-%dT%H:%M:%S')}.{int(timestamp.microsecond / 1000):03}Z"
+            self.assertEqual(formatter._format_timestamp(time_), expected)
+
+    def test_format_timestamp_shared(self):
+        # e.g. the DuplicateCollapser formats the timestamps of collapsed records the same way
+        self.assertEqual(format_timestamp(1675062335.025757), "2023-01-30T07:05:35.025Z")
+        self.assertEqual(format_timestamp(1675062335.9999996), "2023-01-30T07:05:36.000Z")
+        self.assertEqual(format_timestamp(1675062335.5), LogstashFormatter()._format_timestamp(1675062335.5))
+
+    def test_serializer(self):
+        record = makeLogRecord({"msg": "тест", "when": date(2023, 1, 30), "request_id": uuid.UUID(int=1)})
+        expected = LogstashFormatter(serializer="json").format(record)
+        self.assertEqual(json.loads(expected)["message"], "тест")
+        for name in available_serializers():
+            with self.subTest(serializer=name):
+                self.assertEqual(json.loads(LogstashFormatter(serializer=name).format(record)), json.loads(expected))
+
+    def test_default_serializer_keeps_json_module_output(self):
+        record = makeLogRecord({"msg": "test", "ratio": float("nan")})
+        formatted = LogstashFormatter().format(record)
+        # the separators and NaN of the json module, even with orjson or ujson installed
+        self.assertIn('"message": "test", ', formatted)
+        self.assertIn('"ratio": NaN', formatted)
+
+    def test_serializer_of_component(self):
+        set_serializer(COMPONENT_LOGSTASH, "json")
+        try:
+            self.assertIsInstance(LogstashFormatter()._serializer, StdlibJsonSerializer)
+        finally:
+            set_serializer(COMPONENT_LOGSTASH, None)
+
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            LogstashFormatter(serializer="does-not-exist")
+
+
+class CustomLayoutFormatter(LogstashFormatter):
+    def _move_extra_record_fields_to_prefix(self, message):
+        pass  # keep extra record fields on the top level
+
+
+class LogstashFormatterLayoutTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._skip_list = constants.FORMATTER_RECORD_FIELD_SKIP_LIST
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.FORMATTER_RECORD_FIELD_SKIP_LIST = self._skip_list
+
+    # ----------------------------------------------------------------------
+    def _create_records(self):
+        extras = [
+            {},
+            {"custom": "value", "count": 1, "ratio": 0.5, "flag": True, "nothing": None},
+            {"nested": {"id": uuid.UUID(int=1), "items": (1, [2, 3]), "day": date(2023, 1, 30)}, "obj": object},
+            # overriding top-level fields, dynamic and static extra fields as well as the prefix itself
+            {"host": "other", "type": "custom", "tags": ["t"], "path": "/api", "line": 0, "env": "test"},
+            {"extra": "shadowed", "stack_trace": "shadowed", "@metadata": {"index": "logs"}},
+        ]
+        records = []
+        for extra in extras:
+            records.append(
+                getLogger("test").makeRecord("test", 20, "test.py", 42, "%s %d", ("a", 1), None, extra=extra)
+            )
+        try:
+            raise ValueError("layout")
+        except ValueError:
+            records.append(makeLogRecord({"msg": "exception", "exc_info": sys.exc_info(), "custom": "value"}))
+        message_record = makeLogRecord({"msg": "formatted"})
+        message_record.message = "formatted before"
+        records.append(message_record)
+        return records
+
+    # ----------------------------------------------------------------------
+    def _assert_same_as_generic_layout(self, formatter):
+        for record in self._create_records():
+            expected = formatter._serialize(formatter._build_message(record))
+            self.assertEqual(formatter.format(record), expected)
+
+    # ----------------------------------------------------------------------
+    def test_compiled_layout(self):
+        for kwargs in (
+            {},
+            {"extra_prefix": ""},
+            {"extra_prefix": "env"},
+            {"tags": ["a"], "metadata": {"beat": "b"}, "extra": {"env": "prod", "path": "static"}},
+        ):
+            with self.subTest(**kwargs):
+                formatter = LogstashFormatter(**kwargs)
+                self._assert_same_as_generic_layout(formatter)
+                self.assertTrue(formatter._layout[1])
+
+    # ----------------------------------------------------------------------
+    def test_compiled_layout_follows_skip_list(self):
+        formatter = LogstashFormatter()
+        formatter.format(makeLogRecord({}))
+        constants.FORMATTER_RECORD_FIELD_SKIP_LIST = self._skip_list + ["custom", "func_name"]
+        self._assert_same_as_generic_layout(formatter)
+        self.assertTrue(formatter._layout[1])
+        self.assertNotIn("custom", formatter.format(self._create_records()[1]))
+
+    # ----------------------------------------------------------------------
+    def test_generic_layout_for_skipped_base_field(self):
+        constants.FORMATTER_RECORD_FIELD_SKIP_LIST = self._skip_list + ["pid"]
+        formatter = LogstashFormatter()
+        self._assert_same_as_generic_layout(formatter)
+        self.assertFalse(formatter._layout[1])
+
+    # ----------------------------------------------------------------------
+    def test_generic_layout_for_customized_subclass(self):
+        formatter = CustomLayoutFormatter()
+        self._assert_same_as_generic_layout(formatter)
+        self.assertFalse(formatter._layout[1])
+
+
+def _raise_value_error(message):
+    raise ValueError(message)
+
+
+def _exc_info(function, *args):
+    try:
+        function(*args)
+    except BaseException:  # pylint: disable=broad-except
+        return sys.exc_info()
+    return None
+
+
+def _raise_chained(message):
+    try:
+        _raise_value_error(message)
+    except ValueError as exc:
+        raise KeyError("cause") from exc
+
+
+def _raise_in_handler(message):
+    try:
+        _raise_value_error(message)
+    except ValueError:
+        {}[message]  # pylint: disable=pointless-statement
+
+
+def _raise_suppressed(message):
+    try:
+        _raise_value_error(message)
+    except ValueError:
+        raise RuntimeError(message) from None
+
+
+def _raise_with_cycle(message):
+    first, second = ValueError(message), KeyError(message)
+    first.__context__, second.__context__ = second, first
+    raise first
+
+
+class TracebackCacheTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._cache_size = constants.FORMATTER_TRACEBACK_CACHE_SIZE
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.FORMATTER_TRACEBACK_CACHE_SIZE = self._cache_size
+
+    # ----------------------------------------------------------------------
+    def _assert_same_as_traceback_module(self, cache, exc_info):
+        self.assertEqual(cache.format(*exc_info), "".join(traceback.format_exception(*exc_info)))
+
+    # ----------------------------------------------------------------------
+    def test_same_as_traceback_module(self):
+        cache = TracebackCache(16)
+        functions = (_raise_value_error, _raise_chained, _raise_in_handler, _raise_suppressed, _raise_with_cycle)
+        for message in ("first", "second"):
+            for function in functions:
+                with self.subTest(function=function.__name__, message=message):
+                    self._assert_same_as_traceback_module(cache, _exc_info(function, message))
+        self._assert_same_as_traceback_module(cache, (ValueError, ValueError("not raised"), None))
+        self._assert_same_as_traceback_module(cache, (None, None, None))
+        self.assertEqual(cache.info(), (len(functions), len(functions) + 1, 16, len(functions) + 1))
+
+    # ----------------------------------------------------------------------
+    def test_message_stitched_into_cached_stack(self):
+        cache = TracebackCache(16)
+        first = cache.format(*_exc_info(_raise_value_error, "first"))
+        second = cache.format(*_exc_info(_raise_value_error, "second"))
+        self.assertTrue(first.endswith("ValueError: first\n"))
+        self.assertTrue(second.endswith("ValueError: second\n"))
+        self.assertEqual(first[: -len("first\n")], second[: -len("second\n")])
+        self.assertEqual(cache.info().hits, 1)
+
+    # ----------------------------------------------------------------------
+    def test_keyed_by_frames_and_type(self):
+        cache = TracebackCache(16)
+        cache.format(*_exc_info(_raise_value_error, "message"))
+        cache.format(*_exc_info(_raise_chained, "message"))
+        cache.format(*_exc_info(_raise_in_handler, "message"))
+        exc_type, exc_value, exc_traceback = _exc_info(_raise_value_error, "message")
+        self._assert_same_as_traceback_module(cache, (TypeError, TypeError("message"), exc_traceback))
+        self.assertEqual(cache.info().misses, 4)
+
+    # ----------------------------------------------------------------------
+    def test_least_recently_used_evicted(self):
+        cache = TracebackCache(2)
+        cache.format(*_exc_info(_raise_value_error, "message"))
+        cache.format(*_exc_info(_raise_chained, "message"))
+        cache.format(*_exc_info(_raise_value_error, "message"))
+        cache.format(*_exc_info(_raise_in_handler, "message"))
+        self.assertEqual(cache.info(), (1, 3, 2, 2))
+        cache.format(*_exc_info(_raise_value_error, "message"))
+        cache.format(*_exc_info(_raise_chained, "message"))
+        self.assertEqual(cache.info(), (2, 4, 2, 2))
+
+    # ----------------------------------------------------------------------
+    def test_disabled(self):
+        cache = TracebackCache(0)
+        for _ in range(2):
+            self._assert_same_as_traceback_module(cache, _exc_info(_raise_chained, "message"))
+        self.assertEqual(cache.info(), (0, 0, 0, 0))
+
+    # ----------------------------------------------------------------------
+    def test_capture_locals_bypasses_cache(self):
+        cache = TracebackCache(16, capture_locals=True)
+        for message in ("first", "second"):
+            stack_trace = cache.format(*_exc_info(_raise_value_error, message))
+            self.assertIn(f"message = '{message}'", stack_trace)
+        self.assertEqual(cache.info(), (0, 0, 16, 0))
+
+    # ----------------------------------------------------------------------
+    @unittest.skipIf(sys.version_info < (3, 11), "exception groups require Python 3.11")
+    def test_exception_group_bypasses_cache(self):
+        def raise_group():
+            raise ExceptionGroup("group", [ValueError("member")])  # noqa: F821 pylint: disable=undefined-variable
+
+        cache = TracebackCache(16)
+        self._assert_same_as_traceback_module(cache, _exc_info(raise_group))
+        self.assertEqual(cache.info(), (0, 0, 16, 0))
+
+    # ----------------------------------------------------------------------
+    def test_formatter(self):
+        constants.FORMATTER_TRACEBACK_CACHE_SIZE = 4
+        formatter = LogstashFormatter()
+        for message in ("first", "second"):
+            exc_info = _exc_info(_raise_chained, message)
+            record = makeLogRecord({"msg": "failed", "exc_info": exc_info})
+            stack_trace = json.loads(formatter.format(record))["extra"]["stack_trace"]
+            self.assertEqual(stack_trace, "".join(traceback.format_exception(*exc_info)))
+        self.assertEqual(formatter.traceback_cache_info(), (1, 1, 4, 1))
+
+        formatter = LogstashFormatter(capture_locals=True)
+        stack_trace = json.loads(formatter.format(record))["extra"]["stack_trace"]
+        self.assertIn("message = 'second'", stack_trace)
+        self.assertEqual(formatter.traceback_cache_info().currsize, 0)
+
 
 if __name__ == "__main__":
     unittest.main()
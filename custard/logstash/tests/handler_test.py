@@ -0,0 +1,155 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  handler_test.py
+@Time    :  2026/10/18 17:05
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import makeLogRecord
+import json
+import logging
+from unittest import mock
+import sys
+import unittest
+
+from custard.logstash.handler import AsynchronousLogstashHandler, SynchronousLogstashHandler
+from custard.logstash.sampling import RecordSampler
+from custard.logstash.tests.worker_test import RecordingTransport
+
+
+# pylint: disable=protected-access
+
+
+class AsynchronousLogstashHandlerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _create_handler(self, transport, **kwargs):
+        return AsynchronousLogstashHandler("localhost", 5959, None, transport=transport, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def _create_record(self, args, exc_info=None):
+        return makeLogRecord(
+            {"msg": "items: %s", "args": args, "levelno": logging.INFO, "levelname": "INFO", "exc_info": exc_info}
+        )
+
+    # ----------------------------------------------------------------------
+    def test_deferred_formatting(self):
+        transport = RecordingTransport(1)
+        handler = self._create_handler(transport, deferred_formatting=True)
+        items = ["a", "b"]
+        record = self._create_record((items,))
+        expected = json.loads(handler._format_record(record))
+        handler.emit(record)
+        # changes after logging must not show up in the event
+        items.append("c")
+        handler.close()
+
+        self.assertEqual(len(transport.events), 1)
+        event = json.loads(transport.events[0])
+        self.assertEqual(event, expected)
+        self.assertEqual(event["message"], "items: ['a', 'b']")
+
+    # ----------------------------------------------------------------------
+    def test_deferred_formatting_exception(self):
+        transport = RecordingTransport(1)
+        handler = self._create_handler(transport, deferred_formatting=True)
+        try:
+            raise ValueError("deferred")
+        except ValueError:
+            record = self._create_record(("a",), exc_info=sys.exc_info())
+        handler.emit(record)
+        handler.close()
+
+        event = json.loads(transport.events[0])
+        self.assertIn("ValueError: deferred", event["extra"]["stack_trace"])
+
+    # ----------------------------------------------------------------------
+    def test_snapshot_record(self):
+        record = self._create_record(("a",))
+        record.custom = "value"
+        snapshot = AsynchronousLogstashHandler._snapshot_record(record)
+        self.assertIsNot(snapshot, record)
+        self.assertEqual(snapshot.msg, "items: a")
+        self.assertIsNone(snapshot.args)
+        self.assertEqual(snapshot.custom, "value")
+        self.assertEqual(snapshot.created, record.created)
+        # the original record is left untouched for other handlers
+        self.assertEqual(record.msg, "items: %s")
+
+    # ----------------------------------------------------------------------
+    def test_immediate_formatting(self):
+        transport = RecordingTransport(1)
+        handler = self._create_handler(transport)
+        handler._start_worker_thread()
+        worker = handler._worker_thread
+        with mock.patch.object(worker, "enqueue_event", wraps=worker.enqueue_event) as enqueue_event:
+            handler.emit(self._create_record(("a",)))
+        handler.close()
+
+        event = enqueue_event.call_args[0][0]
+        self.assertIsInstance(event, bytes)
+        self.assertEqual(json.loads(transport.events[0])["message"], "items: a")
+
+    # ----------------------------------------------------------------------
+    def test_collapse_duplicates(self):
+        transport = RecordingTransport(3)
+        handler = self._create_handler(transport, collapse_duplicates=True)
+        for index in range(5):
+            handler.emit(self._create_record((index,)))
+        handler.emit(makeLogRecord({"msg": "other", "levelno": logging.INFO, "levelname": "INFO"}))
+        worker = handler._worker_thread
+        # the open window is closed on shutdown
+        handler.close()
+
+        events = [json.loads(event) for event in transport.events]
+        self.assertEqual([event["message"] for event in events], ["items: 0", "other", "items: 4"])
+        self.assertNotIn("repeat_count", events[0]["extra"])
+        self.assertEqual(events[2]["extra"]["repeat_count"], 4)
+        self.assertEqual(events[2]["extra"]["repeat_args_sample"], ["(1,)", "(2,)", "(3,)", "(4,)"])
+        self.assertIn("repeat_first_timestamp", events[2]["extra"])
+        self.assertIn("repeat_last_timestamp", events[2]["extra"])
+        self.assertEqual(worker.collapsed_event_count, 4)
+
+    # ----------------------------------------------------------------------
+    def test_sampler(self):
+        for kwargs in ({}, {"deferred_formatting": True}, {"collapse_duplicates": True}):
+            with self.subTest(**kwargs):
+                transport = RecordingTransport(2)
+                sampler = RecordSampler(sample_rates={logging.INFO: 0.5})
+                handler = self._create_handler(transport, sampler=sampler, **kwargs)
+                records = [self._create_record(("a",)), self._create_record(("b",)), self._create_record(("c",))]
+                with mock.patch.object(sampler, "_random", side_effect=[0.1, 0.9, 0.2]):
+                    with mock.patch.object(handler, "_format_record", wraps=handler._format_record) as format_record:
+                        for record in records:
+                            handler.emit(record)
+                        handler.close()
+
+                events = [json.loads(event) for event in transport.events]
+                self.assertEqual([event["message"] for event in events], ["items: a", "items: c"])
+                self.assertEqual(events[0]["extra"]["sample_rate"], 0.5)
+                # dropped records are not formatted
+                self.assertEqual(format_record.call_count, 2)
+                # the record is left untouched for other handlers
+                self.assertFalse(hasattr(records[0], "sample_rate"))
+
+
+class SynchronousLogstashHandlerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_sampler(self):
+        transport = RecordingTransport(1)
+        sampler = RecordSampler(logger_rate_limit=(0.001, 1))
+        handler = SynchronousLogstashHandler("localhost", 5959, transport=transport, sampler=sampler)
+        for msg in ("first", "second"):
+            handler.emit(makeLogRecord({"msg": msg, "levelno": logging.ERROR, "levelname": "ERROR"}))
+        handler.close()
+
+        self.assertEqual([json.loads(event)["message"] for event in transport.events], ["first"])
+        self.assertNotIn("sample_rate", json.loads(transport.events[0])["extra"])
+        self.assertEqual(sampler.rate_limited_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
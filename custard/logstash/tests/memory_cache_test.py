@@ -9,17 +9,25 @@
 @License :  (C)Copyright 2022-2026
 @Desc    :  None
 """
-import datetime
+import time
 import unittest
 
+from custard.logstash.cache import EVICTION_DROP_LOWEST_LEVEL, EVICTION_SAMPLE
 from custard.logstash.constants import constants
-from custard.logstash.memory_cache import MemoryCache
+from custard.logstash.memory_cache import CachedEvent, MemoryCache
 
 
 # pylint: disable=protected-access
 
 
 class MemoryCacheTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _create_cache(self, event_count, event_ttl=None):
+        cache = MemoryCache({}, event_ttl=event_ttl)
+        for index in range(event_count):
+            cache.add_event(f"message {index + 1}")
+        return cache
+
     # ----------------------------------------------------------------------
     def test_add_event(self):
         cache = MemoryCache({})
@@ -29,73 +37,221 @@ class MemoryCacheTest(unittest.TestCase):
         self.assertEqual(event["event_text"], "message")
         self.assertEqual(event["pending_delete"], False)
 
+    # ----------------------------------------------------------------------
+    def test_add_event_monotonic_ids(self):
+        cache = self._create_cache(3)
+        self.assertEqual(list(cache._cache), [1, 2, 3])
+
     # ----------------------------------------------------------------------
     def test_get_queued_events(self):
-        cache = MemoryCache({"id1": {"pending_delete": True}, "id2": {"pending_delete": False}})
+        cache = self._create_cache(2)
+        constants.QUEUED_EVENTS_BATCH_SIZE = 1
+        self.assertEqual(len(cache.get_queued_events()), 1)
+        constants.QUEUED_EVENTS_BATCH_SIZE = 3
         self.assertEqual(len(cache.get_queued_events()), 1)
 
     # ----------------------------------------------------------------------
     def test_get_queued_events_batch_size(self):
         constants.QUEUED_EVENTS_BATCH_SIZE = 3
 
-        cache = MemoryCache(
-            {
-                "id1": {"pending_delete": True},
-                "id2": {"pending_delete": False},
-                "id3": {"pending_delete": False},
-                "id4": {"pending_delete": False},
-                "id5": {"pending_delete": False},
-                "id6": {"pending_delete": False},
-            }
-        )
+        cache = self._create_cache(6)
         events = cache.get_queued_events()
         # expect only 3 events according to QUEUED_EVENTS_BATCH_SIZE
         self.assertEqual(len(events), constants.QUEUED_EVENTS_BATCH_SIZE)
+        self.assertEqual([event["event_text"] for event in events], ["message 1", "message 2", "message 3"])
 
     # ----------------------------------------------------------------------
     def test_get_queued_events_batch_size_underrun(self):
         constants.QUEUED_EVENTS_BATCH_SIZE = 3
 
-        cache = MemoryCache(
-            {
-                "id1": {"pending_delete": True},
-                "id2": {"pending_delete": False},
-            }
-        )
+        cache = self._create_cache(1)
         events = cache.get_queued_events()
         # expect only 1 event as there are no more available
         self.assertEqual(len(events), 1)
 
     # ----------------------------------------------------------------------
     def test_get_queued_events_pending_delete_check(self):
-        cache = MemoryCache({"id1": {"pending_delete": False}})
+        cache = self._create_cache(1)
         queued_events = cache.get_queued_events()
         self.assertEqual(len(queued_events), 1)
-        self.assertTrue(queued_events[0])
+        self.assertTrue(queued_events[0]["pending_delete"])
+        self.assertEqual(len(cache.get_queued_events()), 0)
 
     # ----------------------------------------------------------------------
     def test_requeue_queued_events(self):
-        cache = MemoryCache({"id1": {"pending_delete": True}})
-        self.assertEqual(len(cache.get_queued_events()), 0)
-        cache.requeue_queued_events([{"id": "id1"}])
+        constants.QUEUED_EVENTS_BATCH_SIZE = 2
+        cache = self._create_cache(3)
+        events = cache.get_queued_events()
+        self.assertEqual(len(events), 2)
+        cache.requeue_queued_events(events)
+
+        events = cache.get_queued_events()
+        # requeued events are fetched first again
+        self.assertEqual([event["event_text"] for event in events], ["message 1", "message 2"])
+
+    # ----------------------------------------------------------------------
+    def test_requeue_unknown_event(self):
+        cache = self._create_cache(1)
+        with self.assertLogs(MemoryCache.logger, level="WARNING"):
+            cache.requeue_queued_events([{"id": 42}])
         self.assertEqual(len(cache.get_queued_events()), 1)
 
     # ----------------------------------------------------------------------
     def test_delete_queued_events(self):
-        cache = MemoryCache(
-            {"id1": {"pending_delete": True, "id": "id1"}, "id2": {"pending_delete": False, "id": "id2"}}
-        )
+        constants.QUEUED_EVENTS_BATCH_SIZE = 1
+        cache = self._create_cache(2)
+        cache.get_queued_events()
         cache.delete_queued_events()
         self.assertEqual(len(cache._cache), 1)
+        self.assertEqual(len(cache._in_flight), 0)
+
+    # ----------------------------------------------------------------------
+    def test_dont_delete_unqueued_events(self):
+        cache = self._create_cache(1)
+        cache.delete_queued_events()
+        self.assertEqual(len(cache.get_queued_events()), 1)
 
     # ----------------------------------------------------------------------
     def test_expire_events(self):
-        cache = MemoryCache(
-            {
-                "id1": {"pending_delete": False, "id": "id1", "entry_date": datetime.datetime.fromtimestamp(0)},
-                "id2": {"pending_delete": False, "id": "id2", "entry_date": datetime.datetime.now()},
-            },
-            event_ttl=100,
-        )
+        cache = MemoryCache({}, event_ttl=100)
+        cache.add_event("message 1")
+        cache.add_event("message 2")
+        # age the first event
+        cache._cache[1].entry_date -= 200
+        self.assertEqual(cache.expire_events(), 1)
+        self.assertEqual(list(cache._cache), [2])
+        self.assertEqual(len(cache._expiry), 1)
+        self.assertEqual(cache.count_events(), 1)
+
+    # ----------------------------------------------------------------------
+    def test_expire_in_flight_events(self):
+        cache = self._create_cache(1, event_ttl=0)
+        cache.get_queued_events()
+        time.sleep(0.01)
         cache.expire_events()
+        self.assertEqual(len(cache._cache), 0)
+        self.assertEqual(len(cache._in_flight), 0)
+
+    # ----------------------------------------------------------------------
+    def test_expired_events_are_not_queued(self):
+        cache = self._create_cache(2, event_ttl=0)
+        time.sleep(0.01)
+        cache.expire_events()
+        self.assertEqual(len(cache._pending), 0)
+        self.assertEqual(cache.get_queued_events(), [])
+
+    # ----------------------------------------------------------------------
+    def test_reuse_cache(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 1
+        cache = self._create_cache(3)
+        cache.get_queued_events()
+
+        # a new worker thread re-uses the cache of the previous one
+        cache = MemoryCache(cache._cache)
+        self.assertEqual(list(cache._in_flight), [1])
+        self.assertEqual([event.id for event in cache._pending], [2, 3])
+        cache.add_event("message 4")
+        self.assertEqual(list(cache._cache), [1, 2, 3, 4])
+
+    # ----------------------------------------------------------------------
+    def test_cached_event_item_access(self):
+        event = CachedEvent(1, "message", 0)
+        self.assertEqual(event["id"], 1)
+        with self.assertRaises(KeyError):
+            event["unknown"]  # pylint: disable=pointless-statement
+
+
+class MemoryCacheEvictionTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._eviction_batch_size = constants.CACHE_EVICTION_BATCH_SIZE
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.CACHE_EVICTION_BATCH_SIZE = self._eviction_batch_size
+
+    # ----------------------------------------------------------------------
+    def _pending_texts(self, cache):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 100
+        return [event["event_text"] for event in cache.get_queued_events()]
+
+    # ----------------------------------------------------------------------
+    def test_invalid_eviction_policy(self):
+        with self.assertRaises(ValueError):
+            MemoryCache({}, eviction_policy="drop_all")
+
+    # ----------------------------------------------------------------------
+    def test_no_budget(self):
+        cache = MemoryCache({})
+        cache.add_event("message")
+        self.assertEqual(cache.evict_events(), 0)
+
+    # ----------------------------------------------------------------------
+    def test_drop_oldest_max_events(self):
+        cache = MemoryCache({}, max_events=2)
+        for index in range(5):
+            cache.add_event(f"message {index}")
+        self.assertEqual(cache.evict_events(), 3)
+        self.assertEqual(cache.evicted_count, 3)
+        self.assertEqual(self._pending_texts(cache), ["message 3", "message 4"])
+
+    # ----------------------------------------------------------------------
+    def test_drop_oldest_max_bytes(self):
+        cache = MemoryCache({}, max_bytes=10)
+        for index in range(5):
+            cache.add_event(f"event {index}")  # 7 bytes each
+        self.assertEqual(cache.evict_events(), 4)
+        self.assertEqual(self._pending_texts(cache), ["event 4"])
+        self.assertEqual(cache._event_bytes, 7)
+
+    # ----------------------------------------------------------------------
+    def test_eviction_batch_size(self):
+        constants.CACHE_EVICTION_BATCH_SIZE = 2
+        cache = MemoryCache({}, max_events=1)
+        for index in range(5):
+            cache.add_event(f"message {index}")
+        self.assertEqual(cache.evict_events(), 2)
+        self.assertEqual(cache.evict_events(), 2)
+        self.assertEqual(cache.evict_events(), 0)
         self.assertEqual(len(cache._cache), 1)
+
+    # ----------------------------------------------------------------------
+    def test_in_flight_events_are_not_evicted(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 2
+        cache = MemoryCache({}, max_events=1)
+        cache.add_event("message 1")
+        cache.add_event("message 2")
+        cache.get_queued_events()
+        self.assertEqual(cache.evict_events(), 0)
+        self.assertEqual(len(cache._cache), 2)
+
+    # ----------------------------------------------------------------------
+    def test_drop_lowest_level(self):
+        cache = MemoryCache({}, max_events=3, eviction_policy=EVICTION_DROP_LOWEST_LEVEL)
+        cache.add_event("error 1", 40)
+        cache.add_event("debug 1", 10)
+        cache.add_event("info 1", 20)
+        cache.add_event("debug 2", 10)
+        cache.add_event("info 2", 20)
+        self.assertEqual(cache.evict_events(), 2)
+        self.assertEqual(self._pending_texts(cache), ["error 1", "info 1", "info 2"])
+
+    # ----------------------------------------------------------------------
+    def test_sample(self):
+        cache = MemoryCache({}, max_events=10, eviction_policy=EVICTION_SAMPLE)
+        for index in range(100):
+            cache.add_event(f"message {index}")
+        self.assertEqual(cache.evict_events(), 90)
+        texts = self._pending_texts(cache)
+        self.assertEqual(len(texts), 10)
+        # the remaining events keep their order
+        self.assertEqual(texts, sorted(texts, key=lambda text: int(text.split()[1])))
+
+    # ----------------------------------------------------------------------
+    def test_compact_indexes(self):
+        cache = MemoryCache({}, max_events=10, eviction_policy=EVICTION_SAMPLE, event_ttl=3600)
+        for index in range(5000):
+            cache.add_event(f"message {index}")
+            cache.evict_events()
+        # evicted events do not accumulate in the index queues
+        self.assertLessEqual(len(cache._expiry), 4 * 10 + 1024)
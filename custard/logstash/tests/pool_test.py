@@ -0,0 +1,257 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  pool_test.py
+@Time    :  2026/10/18 21:35
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import makeLogRecord
+import json
+import logging
+import unittest
+
+from custard.logstash.constants import constants
+from custard.logstash.handler import AsynchronousLogstashHandler
+from custard.logstash.pool import WorkerPool, get_shard_database_path
+from custard.logstash.tests.shipper_test import wait_for
+from custard.logstash.tests.worker_test import RecordingTransport
+
+
+# pylint: disable=protected-access
+
+
+class FakeWorker:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.name = "LogProcessingWorker"
+        self.events = []
+        self.available = True
+        self.started = False
+        self.sent_event_count = 0
+        self.send_failure_count = 0
+        self.dropped_event_count = 0
+
+    def start(self):
+        self.started = True
+
+    def is_alive(self):
+        return self.started
+
+    def is_available(self, cooldown):  # pylint: disable=unused-argument
+        return self.available
+
+    @property
+    def backlog(self):
+        return len(self.events)
+
+    def enqueue_event(self, event, level=None):  # pylint: disable=unused-argument
+        self.events.append(event)
+
+    def shutdown(self):
+        self.started = False
+
+    def join(self):
+        pass
+
+
+class WorkerPoolTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def _create_pool(self, endpoints=(("a", 1), ("b", 2)), **kwargs):
+        return WorkerPool(
+            list(endpoints),
+            create_transport=lambda host, port: RecordingTransport(0),
+            create_worker=FakeWorker,
+            **kwargs,
+        )
+
+    # ----------------------------------------------------------------------
+    def _events_by_shard(self, pool):
+        return [shard.worker.events if shard.worker is not None else [] for shard in pool._shards]
+
+    # ----------------------------------------------------------------------
+    def test_round_robin(self):
+        pool = self._create_pool(workers_per_endpoint=2)
+        for index in range(6):
+            pool.enqueue_event(index)
+        self.assertEqual(self._events_by_shard(pool), [[0, 4], [1, 5], [2], [3]])
+        self.assertEqual(pool._shards[1].worker.name, "LogProcessingWorker-a:1-1")
+
+    # ----------------------------------------------------------------------
+    def test_least_backlog(self):
+        pool = self._create_pool(routing="least_backlog")
+        pool.enqueue_event(0)
+        pool.enqueue_event(1)
+        pool._shards[1].worker.events.extend([2, 3])
+        pool.enqueue_event(4)
+        pool.enqueue_event(5)
+        self.assertEqual(self._events_by_shard(pool), [[0, 4, 5], [1, 2, 3]])
+
+    # ----------------------------------------------------------------------
+    def test_failover(self):
+        for routing in ("round_robin", "least_backlog"):
+            with self.subTest(routing=routing):
+                pool = self._create_pool(routing=routing)
+                pool.enqueue_event(0)
+                pool.enqueue_event(1)
+                pool._shards[0].worker.available = False
+                for index in range(2, 5):
+                    pool.enqueue_event(index)
+                self.assertEqual(self._events_by_shard(pool), [[0], [1, 2, 3, 4]])
+                # with all endpoints down the events are still distributed
+                pool._shards[1].worker.available = False
+                pool.enqueue_event(5)
+                self.assertEqual(pool._shards[0].worker.events[1:], [5])
+                self.assertEqual(sum(len(events) for events in self._events_by_shard(pool)), 6)
+
+    # ----------------------------------------------------------------------
+    def test_partitions(self):
+        pool = self._create_pool(database_path="/tmp/logstash.db", workers_per_endpoint=2)
+        for index in range(4):
+            pool.enqueue_event(index)
+        workers = [shard.worker for shard in pool._shards]
+        self.assertEqual(
+            [worker.kwargs["database_path"] for worker in workers],
+            ["/tmp/logstash.a_1_0.db", "/tmp/logstash.a_1_1.db", "/tmp/logstash.b_2_0.db", "/tmp/logstash.b_2_1.db"],
+        )
+        self.assertEqual(len({id(worker.kwargs["cache"]) for worker in workers}), 4)
+        self.assertEqual(len({id(worker.kwargs["transport"]) for worker in workers}), 4)
+        self.assertIs(workers[0].kwargs["cache"], pool._shards[0].cache)
+        self.assertIsNone(get_shard_database_path(None, "a", 1, 0))
+        pool.shutdown()
+
+    # ----------------------------------------------------------------------
+    def test_shared_partitions(self):
+        pool = self._create_pool(database_path="/tmp/logstash.db")
+        # the second pool would write to the same database partitions
+        with self.assertRaises(ValueError):
+            self._create_pool(endpoints=[("b", 2)], database_path="/tmp/logstash.db")
+        other_pool = self._create_pool(spool_path="/tmp/logstash.spool")
+        pool.shutdown()
+        self._create_pool(endpoints=[("b", 2)], database_path="/tmp/logstash.db").shutdown()
+        other_pool.shutdown()
+        # in-memory caches are never shared
+        pools = [self._create_pool(), self._create_pool()]
+        for pool in pools:
+            pool.enqueue_event(0)
+        self.assertIsNot(pools[0]._shards[0].worker.kwargs["cache"], pools[1]._shards[0].worker.kwargs["cache"])
+
+    # ----------------------------------------------------------------------
+    def test_restart_worker(self):
+        pool = self._create_pool(endpoints=[("a", 1)])
+        pool.enqueue_event(0)
+        worker = pool._shards[0].worker
+        worker.started = False  # died
+        pool.enqueue_event(1)
+        self.assertIsNot(pool._shards[0].worker, worker)
+        # the transport is kept across worker restarts
+        self.assertIs(pool._shards[0].worker.kwargs["transport"], worker.kwargs["transport"])
+
+    # ----------------------------------------------------------------------
+    def test_metrics(self):
+        pool = self._create_pool()
+        pool.enqueue_event(0)
+        pool._shards[0].worker.available = False
+        metrics = pool.metrics()
+        self.assertEqual(
+            [(metric.host, metric.backlog, metric.available) for metric in metrics],
+            [
+                ("a", 1, False),
+                ("b", 0, True),
+            ],
+        )
+
+    # ----------------------------------------------------------------------
+    def test_invalid(self):
+        for kwargs in ({"routing": "random"}, {"workers_per_endpoint": 0}, {"endpoints": []}):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                self._create_pool(**kwargs)
+
+
+class EndpointsHandlerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._cooldown = constants.ENDPOINT_FAILOVER_COOLDOWN
+        self._flush_constants = (
+            constants.QUEUE_CHECK_INTERVAL,
+            constants.QUEUED_EVENTS_FLUSH_COUNT,
+            constants.QUEUED_EVENTS_FLUSH_INTERVAL,
+        )
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.ENDPOINT_FAILOVER_COOLDOWN = self._cooldown
+        (
+            constants.QUEUE_CHECK_INTERVAL,
+            constants.QUEUED_EVENTS_FLUSH_COUNT,
+            constants.QUEUED_EVENTS_FLUSH_INTERVAL,
+        ) = self._flush_constants
+
+    # ----------------------------------------------------------------------
+    def test_send_to_endpoints(self):
+        transports = {}
+
+        def create_transport(host, port, **kwargs):  # pylint: disable=unused-argument
+            return transports.setdefault((host, port), RecordingTransport(0))
+
+        handler = AsynchronousLogstashHandler(
+            None, None, None, transport=create_transport, endpoints=[("a", 1), ("b", 2)]
+        )
+        for index in range(4):
+            handler.emit(makeLogRecord({"msg": f"message {index}", "levelno": logging.INFO}))
+        handler.close()
+
+        self.assertEqual(sorted(transports), [("a", 1), ("b", 2)])
+        self.assertEqual([len(transport.events) for transport in transports.values()], [2, 2])
+        self.assertEqual([metric.sent for metric in handler.endpoint_metrics()], [2, 2])
+        # the singleton worker is not used
+        self.assertIsNone(handler._transport)
+
+    # ----------------------------------------------------------------------
+    def test_handlers_on_same_endpoints(self):
+        transports = []
+
+        def create_transport(host, port, **kwargs):  # pylint: disable=unused-argument
+            transports.append(RecordingTransport(0))
+            return transports[-1]
+
+        handlers = [
+            AsynchronousLogstashHandler(None, None, None, transport=create_transport, endpoints=[("a", 1), ("b", 2)])
+            for _ in range(2)
+        ]
+        # all events are cached right away and stay cached until the handlers are closed
+        constants.QUEUE_CHECK_INTERVAL = 0.01
+        constants.QUEUED_EVENTS_FLUSH_COUNT = 1000
+        constants.QUEUED_EVENTS_FLUSH_INTERVAL = 60.0
+        # the workers of both handlers set up their caches before any event is cached
+        shards = [(handler._worker_pool, shard) for handler in handlers for shard in handler._worker_pool._shards]
+        for pool, shard in shards:
+            pool._start_worker(shard)
+        self.assertTrue(wait_for(lambda: all(shard.worker._database is not None for _, shard in shards)))
+        for index in range(100):
+            for handler_index, handler in enumerate(handlers):
+                handler.emit(
+                    makeLogRecord({"msg": f"handler {handler_index} message {index}", "levelno": logging.INFO})
+                )
+        self.assertTrue(
+            wait_for(lambda: all(not shard.worker._queue.qsize() and not shard.worker._events for _, shard in shards))
+        )
+        for handler in handlers:
+            handler.close()
+
+        # each handler caches its events in memory caches of its own, no event is lost or sent twice
+        messages = [json.loads(event)["message"] for transport in transports for event in transport.events]
+        expected = [f"handler {handler_index} message {index}" for handler_index in range(2) for index in range(100)]
+        self.assertEqual(sorted(messages), sorted(expected))
+
+    # ----------------------------------------------------------------------
+    def test_transport_instance(self):
+        with self.assertRaises(ValueError):
+            AsynchronousLogstashHandler(None, None, None, transport=RecordingTransport(0), endpoints=[("a", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  sampling_test.py
+@Time    :  2026/10/18 20:45
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import DEBUG, ERROR, INFO, makeLogRecord
+from unittest import mock
+import unittest
+
+from custard.logstash.sampling import RecordSampler, TokenBucket, copy_record
+
+
+# pylint: disable=protected-access
+
+
+def _record(level=INFO, name="test"):
+    return makeLogRecord({"msg": "message", "levelno": level, "name": name})
+
+
+class TokenBucketTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_take(self):
+        bucket = TokenBucket(rate=2, burst=3)
+        now = bucket.updated
+        self.assertEqual([bucket.take(now) for _ in range(4)], [True, True, True, False])
+        # refilled with 2 tokens per second
+        self.assertFalse(bucket.take(now + 0.4))
+        self.assertTrue(bucket.take(now + 0.5))
+        self.assertFalse(bucket.take(now + 0.5))
+        # never more than burst tokens
+        self.assertEqual([bucket.take(now + 100) for _ in range(4)], [True, True, True, False])
+
+    # ----------------------------------------------------------------------
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=0, burst=1)
+        with self.assertRaises(ValueError):
+            TokenBucket(rate=1, burst=0)
+
+
+class RecordSamplerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_no_limits(self):
+        sampler = RecordSampler()
+        self.assertEqual(sampler.sample(_record(DEBUG)), 1.0)
+
+    # ----------------------------------------------------------------------
+    def test_sample_rates(self):
+        sampler = RecordSampler(sample_rates={DEBUG: 0.25, INFO: 0.5})
+        with mock.patch.object(sampler, "_random", side_effect=[0.1, 0.3, 0.4, 0.6]):
+            self.assertEqual(sampler.sample(_record(DEBUG)), 0.25)
+            self.assertIsNone(sampler.sample(_record(DEBUG)))
+            self.assertEqual(sampler.sample(_record(INFO)), 0.5)
+            self.assertIsNone(sampler.sample(_record(INFO)))
+            # levels without sample rate are not sampled
+            self.assertEqual(sampler.sample(_record(ERROR)), 1.0)
+        self.assertEqual(sampler.sampled_out_count, 2)
+
+    # ----------------------------------------------------------------------
+    def test_sample_rate_distribution(self):
+        sampler = RecordSampler(sample_rates={DEBUG: 0.1})
+        kept = sum(sampler.sample(_record(DEBUG)) is not None for _ in range(20000))
+        self.assertAlmostEqual(kept / 20000, 0.1, delta=0.02)
+
+    # ----------------------------------------------------------------------
+    def test_logger_rate_limit(self):
+        sampler = RecordSampler(logger_rate_limit=(0.001, 2), logger_rate_limits={"noisy": (0.001, 1), "vip": None})
+        self.assertEqual([sampler.sample(_record()) is not None for _ in range(3)], [True, True, False])
+        self.assertEqual([sampler.sample(_record(name="other")) is not None for _ in range(3)], [True, True, False])
+        self.assertEqual([sampler.sample(_record(name="noisy")) is not None for _ in range(2)], [True, False])
+        self.assertTrue(all(sampler.sample(_record(name="vip")) is not None for _ in range(10)))
+        self.assertEqual(sampler.rate_limited_count, 3)
+
+    # ----------------------------------------------------------------------
+    def test_level_rate_limit(self):
+        sampler = RecordSampler(level_rate_limits={INFO: (0.001, 2)})
+        self.assertEqual(
+            [sampler.sample(_record(name=str(index))) is not None for index in range(3)], [True, True, False]
+        )
+        self.assertEqual(sampler.sample(_record(ERROR)), 1.0)
+
+    # ----------------------------------------------------------------------
+    def test_level_token_kept_if_logger_limited(self):
+        sampler = RecordSampler(logger_rate_limit=(0.001, 1), level_rate_limits={INFO: (0.001, 2)})
+        self.assertIsNotNone(sampler.sample(_record(name="a")))
+        self.assertIsNone(sampler.sample(_record(name="a")))
+        # the record dropped by the logger bucket did not use up the level bucket
+        self.assertIsNotNone(sampler.sample(_record(name="b")))
+        self.assertIsNone(sampler.sample(_record(name="c")))
+
+    # ----------------------------------------------------------------------
+    def test_sampled_before_rate_limited(self):
+        sampler = RecordSampler(sample_rates={INFO: 0.5}, logger_rate_limit=(0.001, 1))
+        with mock.patch.object(sampler, "_random", side_effect=[0.9, 0.1]):
+            self.assertIsNone(sampler.sample(_record()))
+            self.assertEqual(sampler.sample(_record()), 0.5)
+
+    # ----------------------------------------------------------------------
+    def test_invalid(self):
+        for kwargs in (
+            {"sample_rates": {DEBUG: 0}},
+            {"sample_rates": {DEBUG: 1.5}},
+            {"logger_rate_limit": (0, 1)},
+            {"logger_rate_limits": {"test": (1, 0)}},
+            {"level_rate_limits": {DEBUG: (-1, 1)}},
+        ):
+            with self.subTest(**kwargs), self.assertRaises(ValueError):
+                RecordSampler(**kwargs)
+
+    # ----------------------------------------------------------------------
+    def test_copy_record(self):
+        record = _record()
+        record_copy = copy_record(record, sample_rate=0.5)
+        self.assertEqual(record_copy.sample_rate, 0.5)
+        self.assertEqual(record_copy.msg, record.msg)
+        self.assertFalse(hasattr(record, "sample_rate"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  shipper_test.py
+@Time    :  2026/10/18 22:20
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import makeLogRecord
+import logging
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+import unittest
+
+from custard.logstash.constants import constants
+from custard.logstash.handler import AsynchronousLogstashHandler
+from custard.logstash.shipper import (
+    FRAME_KIND_EVENT,
+    FRAME_KIND_STATS,
+    LogShipper,
+    ShipperTransport,
+    pack_frame,
+    query_shipper_stats,
+)
+from custard.logstash.tests.worker_test import RecordingTransport
+
+
+# pylint: disable=protected-access
+
+
+class FileTransport:
+    """appends the events to a file, readable by the test process"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        with open(self.path, "ab") as file:
+            file.write(b"".join(events))
+
+    def close(self):
+        pass
+
+
+def run_shipper(socket_path, events_path):
+    constants.QUEUED_EVENTS_FLUSH_INTERVAL = 0.1
+    handler = AsynchronousLogstashHandler("localhost", 5959, None, transport=FileTransport(events_path))
+    shipper = LogShipper(socket_path, handler)
+    signal.signal(signal.SIGTERM, lambda *args: shipper.shutdown())
+    shipper.serve_forever()
+
+
+def run_producer(socket_path, producer, count):
+    handler = AsynchronousLogstashHandler(
+        socket_path, None, None, transport="custard.logstash.shipper.ShipperTransport"
+    )
+    for index in range(count):
+        handler.emit(makeLogRecord({"msg": f"producer {producer} message {index}", "levelno": logging.INFO}))
+    handler.close()
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+class LogShipperTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._directory = tempfile.mkdtemp()
+        self._socket_path = os.path.join(self._directory, "shipper.sock")
+        self._transport = RecordingTransport(0)
+        self._handler = AsynchronousLogstashHandler("localhost", 5959, None, transport=self._transport)
+        self._shipper = LogShipper(self._socket_path, self._handler)
+        self._shipper.start()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        self._shipper.shutdown()
+        shutil.rmtree(self._directory)
+
+    # ----------------------------------------------------------------------
+    def test_receive_events(self):
+        transport = ShipperTransport(self._socket_path)
+        transport.send([b"message 1\n", "message 2\n"])
+        transport.send([b"message 3\n"])
+        self.assertTrue(wait_for(lambda: self._shipper.received_event_count == 3))
+        stats = query_shipper_stats(self._socket_path)
+        self.assertEqual(stats.connections, 2)  # the transport and the stats query
+        self.assertEqual(stats.received_events, 3)
+        self.assertEqual(stats.received_bytes, 30)
+        transport.close()
+
+        self._shipper.shutdown()
+        self.assertEqual(self._transport.events, [b"message 1\n", b"message 2\n", b"message 3\n"])
+        self.assertFalse(os.path.exists(self._socket_path))
+
+    # ----------------------------------------------------------------------
+    def test_levels(self):
+        levels = []
+        enqueue_event = self._handler.enqueue_event
+
+        def record_level(event, level=None):
+            levels.append(level)
+            enqueue_event(event, level=level)
+
+        self._handler.enqueue_event = record_level
+        transport = ShipperTransport(self._socket_path)
+        transport.send([b"error\n", b"info\n", b"unknown\n"], levels=[logging.ERROR, logging.INFO, None])
+        transport.send([b"no levels\n"])
+        self.assertTrue(wait_for(lambda: self._shipper.received_event_count == 4))
+        transport.close()
+        # the shipper's handler gets the levels like those of records logged in its own process
+        self.assertEqual(levels, [logging.ERROR, logging.INFO, None, None])
+
+    # ----------------------------------------------------------------------
+    def test_client_not_reading_replies(self):
+        reply_timeout = constants.SHIPPER_REPLY_TIMEOUT
+        constants.SHIPPER_REPLY_TIMEOUT = 1.0
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+                sock.connect(self._socket_path)
+                # far more replies than fit into the socket buffers, without reading any of them
+                sock.sendall(pack_frame(FRAME_KIND_STATS, b"") * 20000)
+                self.assertTrue(wait_for(lambda: self._shipper.stats().connections == 1))
+
+                # the other connections are served meanwhile
+                transport = ShipperTransport(self._socket_path)
+                transport.send([b"message 1\n"])
+                self.assertTrue(wait_for(lambda: self._shipper.received_event_count == 1, timeout=0.5))
+                transport.close()
+
+                # the stalled client is disconnected once the reply timeout elapsed
+                self.assertTrue(wait_for(lambda: self._shipper.stats().connections == 0))
+        finally:
+            constants.SHIPPER_REPLY_TIMEOUT = reply_timeout
+
+    # ----------------------------------------------------------------------
+    def test_partial_frames(self):
+        data = pack_frame(FRAME_KIND_EVENT, b"message 1\n") + pack_frame(FRAME_KIND_EVENT, b"message 2\n")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self._socket_path)
+            for chunk in (data[:3], data[3:20], data[20:]):
+                sock.sendall(chunk)
+                time.sleep(0.05)
+            self.assertTrue(wait_for(lambda: self._shipper.received_event_count == 2))
+        self._shipper.shutdown()
+        self.assertEqual(self._transport.events, [b"message 1\n", b"message 2\n"])
+
+    # ----------------------------------------------------------------------
+    def test_invalid_frame(self):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(self._socket_path)
+            sock.sendall(pack_frame(99, b"junk"))
+            # the shipper closes the connection
+            self.assertEqual(sock.recv(1), b"")
+        self.assertEqual(self._shipper.received_event_count, 0)
+
+    # ----------------------------------------------------------------------
+    def test_shipper_unavailable(self):
+        transport = ShipperTransport(os.path.join(self._directory, "missing.sock"))
+        with self.assertRaises(ConnectionError):
+            transport.send([b"message\n"])
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "forking producers requires Linux")
+class ForkedProducersTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def test_forked_producers(self):
+        producer_count, event_count = 4, 50
+        context = multiprocessing.get_context("fork")
+        directory = tempfile.mkdtemp()
+        socket_path = os.path.join(directory, "shipper.sock")
+        events_path = os.path.join(directory, "events")
+        shipper = context.Process(target=run_shipper, args=(socket_path, events_path))
+        shipper.start()
+        try:
+            self.assertTrue(wait_for(lambda: os.path.exists(socket_path)))
+            producers = [
+                context.Process(target=run_producer, args=(socket_path, producer, event_count))
+                for producer in range(producer_count)
+            ]
+            for producer in producers:
+                producer.start()
+            for producer in producers:
+                producer.join(30)
+                self.assertEqual(producer.exitcode, 0)
+
+            self.assertTrue(
+                wait_for(lambda: query_shipper_stats(socket_path).received_events >= producer_count * event_count)
+            )
+            self.assertTrue(wait_for(lambda: self._read_messages(events_path) >= producer_count * event_count))
+            # one event per record, no duplicates
+            self.assertEqual(self._read_messages(events_path), producer_count * event_count)
+        finally:
+            shipper.terminate()
+            shipper.join(30)
+            shutil.rmtree(directory)
+        self.assertEqual(shipper.exitcode, 0)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _read_messages(events_path):
+        if not os.path.exists(events_path):
+            return 0
+        with open(events_path, "rb") as file:
+            return sum(b"producer " in line for line in file)
+
+
+if __name__ == "__main__":
+    unittest.main()
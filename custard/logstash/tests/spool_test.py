@@ -0,0 +1,250 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  spool_test.py
+@Time    :  2026/10/18 23:05
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from custard.logstash.constants import constants
+from custard.logstash.database import DatabaseLockedError
+from custard.logstash.spool import CHECKPOINT_FILE_NAME, CHECKPOINT_SLOT_SIZE, RECORD_HEADER, FileSpoolCache
+from custard.logstash.tests.worker_test import RecordingTransport
+from custard.logstash.worker import LogProcessingWorker
+
+
+# pylint: disable=protected-access
+
+
+class FileSpoolCacheTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._batch_size = constants.QUEUED_EVENTS_BATCH_SIZE
+        constants.QUEUED_EVENTS_BATCH_SIZE = 100
+        self.path = tempfile.mkdtemp()
+        self.cache = self._create_cache()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = self._batch_size
+        self.cache.close()
+        shutil.rmtree(self.path)
+
+    # ----------------------------------------------------------------------
+    def _create_cache(self, **kwargs):
+        return FileSpoolCache(self.path, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def _pending_texts(self, cache=None):
+        return [event["event_text"] for event in (cache or self.cache).get_queued_events()]
+
+    # ----------------------------------------------------------------------
+    def _segment_files(self):
+        return sorted(name for name in os.listdir(self.path) if name.startswith("segment-"))
+
+    # ----------------------------------------------------------------------
+    def test_add_events(self):
+        self.cache.add_event(b"message 1", 20)
+        self.cache.add_events(["message 2", b"message 3"], [None, 40])
+        events = self.cache.get_queued_events()
+        self.assertEqual([event["event_text"] for event in events], [b"message 1", b"message 2", b"message 3"])
+        self.assertEqual([event["event_level"] for event in events], [20, None, 40])
+        self.assertEqual(self.cache.count_events(), 3)
+
+    # ----------------------------------------------------------------------
+    def test_get_queued_events_batch_size(self):
+        constants.QUEUED_EVENTS_BATCH_SIZE = 2
+        self.cache.add_events([f"message {index}" for index in range(5)])
+        self.assertEqual(self._pending_texts(), [b"message 0", b"message 1"])
+        self.assertEqual(self._pending_texts(), [b"message 2", b"message 3"])
+        self.assertEqual(self._pending_texts(), [b"message 4"])
+        self.assertEqual(self._pending_texts(), [])
+
+    # ----------------------------------------------------------------------
+    def test_requeue_queued_events(self):
+        self.cache.add_events(["message 1", "message 2"])
+        events = self.cache.get_queued_events()
+        self.cache.requeue_queued_events(events)
+        self.assertEqual(self._pending_texts(), [b"message 1", b"message 2"])
+
+    # ----------------------------------------------------------------------
+    def test_delete_queued_events(self):
+        self.cache.add_events(["message 1", "message 2"])
+        self.cache.get_queued_events()
+        self.cache.add_event("message 3")
+        self.cache.delete_queued_events()
+        self.assertEqual(self.cache.count_events(), 1)
+        self.assertEqual(self._pending_texts(), [b"message 3"])
+
+    # ----------------------------------------------------------------------
+    def test_segments(self):
+        cache = self._create_cache(segment_size=RECORD_HEADER.size * 2 + 20)
+        cache.add_events([f"message {index}" for index in range(5)])
+        cache.add_event("message 5")
+        # two events per segment
+        self.assertEqual(len(self._segment_files()), 3)
+
+        constants.QUEUED_EVENTS_BATCH_SIZE = 3
+        self.assertEqual(self._pending_texts(cache), [b"message 0", b"message 1", b"message 2"])
+        cache.delete_queued_events()
+        # whole segments are deleted once all their events are sent
+        self.assertEqual(len(self._segment_files()), 2)
+        self.assertEqual(self._pending_texts(cache), [b"message 3", b"message 4", b"message 5"])
+        cache.delete_queued_events()
+        self.assertEqual(len(self._segment_files()), 1)
+        self.assertEqual(cache.count_events(), 0)
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_reopen(self):
+        self.cache.add_events([f"message {index}" for index in range(4)])
+        constants.QUEUED_EVENTS_BATCH_SIZE = 2
+        self.cache.get_queued_events()
+        self.cache.delete_queued_events()
+        self.cache.get_queued_events()  # in flight, not yet sent
+        self.cache.close()
+
+        cache = self._create_cache()
+        self.assertEqual(cache.count_events(), 2)
+        self.assertEqual(self._pending_texts(cache), [b"message 2", b"message 3"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_crash_recovery(self):
+        self.cache.add_events([f"message {index}" for index in range(3)])
+        constants.QUEUED_EVENTS_BATCH_SIZE = 1
+        self.cache.get_queued_events()
+        self.cache.delete_queued_events()
+        # crash while appending an event, without closing the cache; the lock is released with the process
+        self.cache._lock_file.close()
+        self.cache._lock_file = None
+        segment_path = os.path.join(self.path, self._segment_files()[-1])
+        size = os.path.getsize(segment_path)
+        with open(segment_path, "ab") as file:
+            file.write(RECORD_HEADER.pack(100, 0, 0.0, 20) + b"partial")
+
+        cache = self._create_cache()
+        constants.QUEUED_EVENTS_BATCH_SIZE = 100
+        self.assertEqual(self._pending_texts(cache), [b"message 1", b"message 2"])
+        self.assertEqual(os.path.getsize(segment_path), size)
+        cache.add_event("message 3")
+        cache.requeue_queued_events([])
+        self.assertEqual(self._pending_texts(cache), [b"message 1", b"message 2", b"message 3"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_second_instance(self):
+        self.cache.add_event("message 0")
+        cache = self._create_cache()
+        # e.g. a second handler or process with the same spool_path
+        with self.assertRaises(DatabaseLockedError):
+            cache.add_event("message 1")
+        with self.assertRaises(DatabaseLockedError):
+            cache.get_queued_events()
+        self.cache.close()
+
+        cache.add_event("message 1")
+        self.assertEqual(self._pending_texts(cache), [b"message 0", b"message 1"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_torn_checkpoint(self):
+        self.cache.add_events([f"message {index}" for index in range(3)])
+        constants.QUEUED_EVENTS_BATCH_SIZE = 1
+        for _ in range(2):
+            self.cache.get_queued_events()
+            self.cache.delete_queued_events()
+        self.cache.close()
+        # the latest checkpoint is corrupt, the previous one is used
+        with open(os.path.join(self.path, CHECKPOINT_FILE_NAME), "r+b") as file:
+            file.seek(CHECKPOINT_SLOT_SIZE * (self.cache._checkpoint_counter % 2) + 10)
+            file.write(b"\xff")
+
+        cache = self._create_cache()
+        constants.QUEUED_EVENTS_BATCH_SIZE = 100
+        self.assertEqual(self._pending_texts(cache), [b"message 1", b"message 2"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_expire_events(self):
+        cache = self._create_cache(event_ttl=100, segment_size=RECORD_HEADER.size * 2 + 20)
+        cache.add_events([f"message {index}" for index in range(5)])
+        # age the events of the first two segments, events expire by segment
+        cache._segments[0].last_entry_date -= 200
+        cache._segments[1].last_entry_date -= 200
+        self.assertEqual(cache.expire_events(), 4)
+        self.assertEqual(self._pending_texts(cache), [b"message 4"])
+        self.assertEqual(len(self._segment_files()), 1)
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_expire_in_flight_events(self):
+        cache = self._create_cache(event_ttl=100)
+        cache.add_events(["message 1", "message 2"])
+        cache.get_queued_events()
+        cache._segments[0].last_entry_date -= 200
+        self.assertEqual(cache.expire_events(), 2)
+        cache.delete_queued_events()
+        cache.add_event("message 3")
+        self.assertEqual(self._pending_texts(cache), [b"message 3"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_evict_events(self):
+        cache = self._create_cache(max_events=2, segment_size=RECORD_HEADER.size * 2 + 20)
+        cache.add_events([f"message {index}" for index in range(5)])
+        # whole segments are evicted until the budget is met
+        self.assertEqual(cache.evict_events(), 4)
+        self.assertEqual(cache.evicted_count, 4)
+        self.assertEqual(self._pending_texts(cache), [b"message 4"])
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_evict_in_flight_events_are_kept(self):
+        cache = self._create_cache(max_events=1)
+        cache.add_events(["message 1", "message 2"])
+        cache.get_queued_events()
+        self.assertEqual(cache.evict_events(), 0)
+        cache.close()
+
+    # ----------------------------------------------------------------------
+    def test_invalid_eviction_policy(self):
+        with self.assertRaises(ValueError):
+            self._create_cache(eviction_policy="random")
+
+    # ----------------------------------------------------------------------
+    def test_worker(self):
+        transport = RecordingTransport(3)
+        worker = LogProcessingWorker(
+            host="localhost",
+            port=5959,
+            transport=transport,
+            ssl_enable=False,
+            ssl_verify=False,
+            keyfile=None,
+            certfile=None,
+            ca_certs=None,
+            database_path=None,
+            spool_path=os.path.join(self.path, "worker"),
+            cache={},
+            event_ttl=None,
+        )
+        worker.start()
+        for index in range(3):
+            worker.enqueue_event(f"message {index}\n".encode())
+        worker.shutdown()
+        worker.join()
+        self.assertEqual(transport.events, [b"message 0\n", b"message 1\n", b"message 2\n"])
+        self.assertIsInstance(worker._database, FileSpoolCache)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,482 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  transport_test.py
+@Time    :  2026/10/18 14:05
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from tempfile import TemporaryDirectory
+from threading import Lock
+import gzip
+import json
+import shutil
+import socket
+import ssl
+import struct
+import time
+import unittest
+import zlib
+
+from custard.logstash.benchmarks.servers import (
+    BeatsStandInServer,
+    HttpStandInServer,
+    TcpStandInServer,
+    UdpStandInServer,
+    create_self_signed_certificate,
+)
+from custard.logstash.constants import constants
+from custard.logstash.transport import BeatsTransport, HttpTransport, TcpTransport, UdpTransport
+
+
+# pylint: disable=protected-access
+
+
+class HttpTransportTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.requests = []
+        self.headers = []
+        self.server = HttpStandInServer(self._on_request)
+        self.server.start()
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        self.server.stop()
+
+    # ----------------------------------------------------------------------
+    def _on_request(self, body, headers):
+        self.requests.append(body)
+        self.headers.append(headers)
+
+    # ----------------------------------------------------------------------
+    def _create_transport(self, **kwargs):
+        return HttpTransport("127.0.0.1", self.server.port, timeout=5.0, ssl_enable=False, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def test_send(self):
+        transport = self._create_transport()
+        transport.send([b'{"message": "a"}\n', '{"message": "b"}\n'])
+        transport.close()
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(json.loads(self.requests[0]), [{"message": "a"}, {"message": "b"}])
+
+    # ----------------------------------------------------------------------
+    def test_batches_max_content_length(self):
+        event = b'{"message": "%d"}\n'
+        # 16 bytes per event without the line break, two events and the JSON array need 35 bytes
+        transport = self._create_transport(max_content_length=35)
+        transport.send([event % index for index in range(5)])
+        transport.close()
+        self.assertEqual([len(json.loads(body)) for body in self.requests], [2, 2, 1])
+        self.assertTrue(all(len(body) <= 35 for body in self.requests))
+
+    # ----------------------------------------------------------------------
+    def test_skip_oversized_event(self):
+        transport = self._create_transport(max_content_length=20)
+        transport.send([b'{"message": "a"}\n', b'{"message": "too long"}\n'])
+        transport.close()
+        self.assertEqual([json.loads(body) for body in self.requests], [[{"message": "a"}]])
+
+    # ----------------------------------------------------------------------
+    def test_keep_alive(self):
+        transport = self._create_transport()
+        for _ in range(3):
+            transport.send([b'{"message": "a"}\n'])
+        transport.close()
+        self.assertEqual(len(self.requests), 3)
+        self.assertEqual(self.server.connection_count, 1)
+
+    # ----------------------------------------------------------------------
+    def test_send_gzip(self):
+        transport = self._create_transport(compression="gzip", compression_level=1)
+        transport.send([b'{"message": "a"}\n', b'{"message": "b"}\n'])
+        transport.close()
+        self.assertEqual(self.headers[0]["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(self.requests[0])), [{"message": "a"}, {"message": "b"}])
+
+    # ----------------------------------------------------------------------
+    def test_send_deflate(self):
+        transport = self._create_transport(compression="deflate")
+        transport.send([b'{"message": "a"}\n'] * 100)
+        transport.close()
+        self.assertEqual(self.headers[0]["Content-Encoding"], "deflate")
+        body = zlib.decompress(self.requests[0])
+        self.assertEqual(json.loads(body), [{"message": "a"}] * 100)
+        self.assertLess(len(self.requests[0]), len(body))
+
+    # ----------------------------------------------------------------------
+    def test_no_content_encoding_without_compression(self):
+        transport = self._create_transport()
+        transport.send([b'{"message": "a"}\n'])
+        transport.close()
+        self.assertNotIn("Content-Encoding", self.headers[0])
+
+    # ----------------------------------------------------------------------
+    def test_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            self._create_transport(compression="brotli")
+
+
+class TcpTransportTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.received = []
+        self._lock = Lock()
+        self.server = self._create_server()
+        self.server.start()
+        self._constants = {
+            name: getattr(constants, name)
+            for name in ("TCP_RECONNECT_BACKOFF_MIN", "TCP_RECONNECT_BACKOFF_MAX", "TCP_MAX_CONNECTION_AGE")
+        }
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        self.server.stop()
+        for name, value in self._constants.items():
+            setattr(constants, name, value)
+
+    # ----------------------------------------------------------------------
+    def _create_server(self):
+        return TcpStandInServer(self._on_event)
+
+    # ----------------------------------------------------------------------
+    def _on_event(self, line):
+        with self._lock:
+            self.received.append(line)
+
+    # ----------------------------------------------------------------------
+    def _create_transport(self, **kwargs):
+        return TcpTransport("127.0.0.1", self.server.port, False, False, None, None, None, timeout=5.0, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def _wait_for_bytes(self, size):
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            with self._lock:
+                stream = b"".join(self.received)
+            if len(stream) >= size:
+                return stream
+            time.sleep(0.01)
+        self.fail(f"Received only {len(stream)} of {size} bytes")
+
+    # ----------------------------------------------------------------------
+    def test_send(self):
+        events = [b'{"message": "a"}\n', '{"message": "b"}\n']
+        self._create_transport().send(events)
+        self.assertEqual(self._wait_for_bytes(34), b'{"message": "a"}\n{"message": "b"}\n')
+
+    # ----------------------------------------------------------------------
+    def test_send_compressed_frame(self):
+        events = [b'{"message": "%d"}\n' % index for index in range(100)]
+        for compression, decompress in (("gzip", gzip.decompress), ("deflate", zlib.decompress)):
+            with self.subTest(compression=compression):
+                with self._lock:
+                    self.received.clear()
+                self._create_transport(compression=compression, compression_level=9).send(events)
+                header = self._wait_for_bytes(4)[:4]
+                (frame_length,) = struct.unpack("!I", header)
+                stream = self._wait_for_bytes(4 + frame_length)
+                self.assertEqual(len(stream), 4 + frame_length)
+                self.assertEqual(decompress(stream[4:]), b"".join(events))
+
+    # ----------------------------------------------------------------------
+    def test_invalid_compression(self):
+        with self.assertRaises(ValueError):
+            self._create_transport(compression="lz4")
+
+    # ----------------------------------------------------------------------
+    def test_connection_per_send(self):
+        transport = self._create_transport()
+        for _ in range(3):
+            transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(51)
+        self.assertEqual(self.server.connection_count, 3)
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection(self):
+        transport = self._create_transport(keep_connection=True)
+        for _ in range(3):
+            transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(51)
+        transport.close()
+        self.assertEqual(self.server.connection_count, 1)
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection_reconnect_after_peer_closed(self):
+        transport = self._create_transport(keep_connection=True)
+        transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(17)
+        self.server.close_connections()
+        time.sleep(0.1)
+        # the probe notices the closed connection, the event is not sent into the void
+        transport.send([b'{"message": "b"}\n'])
+        self.assertEqual(self._wait_for_bytes(34), b'{"message": "a"}\n{"message": "b"}\n')
+        transport.close()
+        self.assertEqual(self.server.connection_count, 2)
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection_max_age(self):
+        constants.TCP_MAX_CONNECTION_AGE = 0
+        transport = self._create_transport(keep_connection=True)
+        for _ in range(3):
+            transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(51)
+        transport.close()
+        self.assertEqual(self.server.connection_count, 3)
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection_reconnect_backoff(self):
+        constants.TCP_RECONNECT_BACKOFF_MIN = 0.2
+        constants.TCP_RECONNECT_BACKOFF_MAX = 0.3
+        port = self.server.port
+        self.server.stop()
+        transport = TcpTransport("127.0.0.1", port, False, False, None, None, None, timeout=5.0, keep_connection=True)
+        with self.assertRaises(ConnectionRefusedError):
+            transport.send([b'{"message": "a"}\n'])
+        # no connect attempt within the backoff delay
+        with self.assertRaisesRegex(ConnectionError, "deferred"):
+            transport.send([b'{"message": "a"}\n'])
+        time.sleep(0.25)
+        with self.assertRaises(ConnectionRefusedError):
+            transport.send([b'{"message": "a"}\n'])
+        self.assertEqual(transport._reconnect_backoff, 0.3)
+
+        self.server = TcpStandInServer(self._on_event, port=port)
+        self.server.start()
+        time.sleep(0.35)
+        transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(17)
+        transport.close()
+        self.assertIsNone(transport._reconnect_backoff)
+
+
+@unittest.skipIf(shutil.which("openssl") is None, "openssl command line tool not available")
+class TcpTransportTlsTest(TcpTransportTest):
+    # ----------------------------------------------------------------------
+    @classmethod
+    def setUpClass(cls):
+        cls._certificate_directory = TemporaryDirectory()
+        cls.certfile, cls.keyfile = create_self_signed_certificate(cls._certificate_directory.name)
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def tearDownClass(cls):
+        cls._certificate_directory.cleanup()
+
+    # ----------------------------------------------------------------------
+    def _create_server(self, port=0):
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ssl_context.load_cert_chain(self.certfile, self.keyfile)
+        return TcpStandInServer(self._on_event, port=port, ssl_context=ssl_context)
+
+    # ----------------------------------------------------------------------
+    def _create_transport(self, **kwargs):
+        return TcpTransport("127.0.0.1", self.server.port, True, True, None, None, self.certfile, timeout=5.0, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def test_ssl_context_built_once(self):
+        transport = self._create_transport()
+        transport.send([b'{"message": "a"}\n'])
+        ssl_context = transport._ssl_context
+        transport.send([b'{"message": "a"}\n'])
+        self._wait_for_bytes(34)
+        self.assertIsNotNone(ssl_context)
+        self.assertIs(transport._ssl_context, ssl_context)
+        self.assertEqual(self.server.connection_count, 2)
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection_reconnect_backoff(self):
+        pass  # covered without TLS
+
+
+class BeatsTransportTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.received = []
+        self.server = None
+        self._constants = {
+            name: getattr(constants, name)
+            for name in (
+                "BEATS_WINDOW_SIZE_INITIAL",
+                "BEATS_WINDOW_SIZE_MIN",
+                "BEATS_WINDOW_SIZE_MAX",
+                "BEATS_WINDOW_GROW_LATENCY",
+                "TCP_MAX_CONNECTION_AGE",
+            )
+        }
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        if self.server is not None:
+            self.server.stop()
+        for name, value in self._constants.items():
+            setattr(constants, name, value)
+
+    # ----------------------------------------------------------------------
+    def _start_server(self, ack_delay=0.0):
+        self.server = BeatsStandInServer(self.received.append, ack_delay=ack_delay)
+        self.server.start()
+
+    # ----------------------------------------------------------------------
+    def _create_transport(self, timeout=5.0, **kwargs):
+        return BeatsTransport("127.0.0.1", self.server.port, False, False, None, None, None, timeout=timeout, **kwargs)
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _create_events(count):
+        return [f'{{"message": "{index}"}}' for index in range(count)]
+
+    # ----------------------------------------------------------------------
+    def test_send(self):
+        self._start_server()
+        transport = self._create_transport()
+        transport.send(self._create_events(25))
+        transport.send(self._create_events(5))
+        transport.close()
+        # all events were acknowledged before send() returned
+        self.assertEqual(self.received, [event.encode() for event in self._create_events(25) + self._create_events(5)])
+        self.assertEqual(self.server.connection_count, 1)
+        self.assertEqual(transport.stats().connects, 1)
+
+    # ----------------------------------------------------------------------
+    def test_connection_per_send(self):
+        self._start_server()
+        transport = self._create_transport(keep_connection=False)
+        for _ in range(3):
+            transport.send(self._create_events(2))
+        self.assertEqual(len(self.received), 6)
+        self.assertEqual(self.server.connection_count, 3)
+
+    # ----------------------------------------------------------------------
+    def test_reconnect_after_peer_closed(self):
+        self._start_server()
+        transport = self._create_transport()
+        transport.send(self._create_events(1))
+        self.server.close_connections()
+        time.sleep(0.1)
+        transport.send(self._create_events(1))
+        transport.close()
+        self.assertEqual(len(self.received), 2)
+        self.assertEqual(self.server.connection_count, 2)
+
+    # ----------------------------------------------------------------------
+    def test_max_connection_age(self):
+        constants.TCP_MAX_CONNECTION_AGE = 0
+        self._start_server()
+        transport = self._create_transport()
+        for _ in range(3):
+            transport.send(self._create_events(1))
+        transport.close()
+        self.assertEqual(self.server.connection_count, 3)
+
+    # ----------------------------------------------------------------------
+    def test_window_grows_on_fast_acks(self):
+        constants.BEATS_WINDOW_SIZE_INITIAL = 2
+        constants.BEATS_WINDOW_SIZE_MAX = 8
+        self._start_server()
+        transport = self._create_transport()
+        transport.send(self._create_events(30))
+        transport.close()
+        stats = transport.stats()
+        # windows of 2, 4, 8, 8 and 8 events
+        self.assertEqual(stats.window_size, 8)
+        self.assertEqual(stats.windows, 5)
+        self.assertEqual(stats.events, 30)
+        self.assertGreaterEqual(stats.max_latency, stats.average_latency)
+        self.assertEqual(len(self.received), 30)
+
+    # ----------------------------------------------------------------------
+    def test_window_kept_on_slow_acks(self):
+        constants.BEATS_WINDOW_SIZE_INITIAL = 2
+        constants.BEATS_WINDOW_GROW_LATENCY = 0.01
+        self._start_server(ack_delay=0.05)
+        transport = self._create_transport()
+        transport.send(self._create_events(6))
+        transport.close()
+        self.assertEqual(transport.stats().window_size, 2)
+        self.assertEqual(transport.stats().windows, 3)
+        self.assertGreaterEqual(transport.stats().last_latency, 0.05)
+
+    # ----------------------------------------------------------------------
+    def test_window_shrinks_on_timeout(self):
+        constants.BEATS_WINDOW_SIZE_INITIAL = 8
+        self._start_server(ack_delay=0.5)
+        transport = self._create_transport(timeout=0.1)
+        with self.assertRaises(socket.timeout):
+            transport.send(self._create_events(8))
+        transport.close()
+        self.assertEqual(transport.stats().window_size, 4)
+        self.assertEqual(transport.stats().timeouts, 1)
+        self.assertEqual(transport.stats().windows, 0)
+
+
+class UdpTransportTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self.datagrams = []
+        self.server = UdpStandInServer(self.datagrams.append)
+        self.server.start()
+
+    # ----------------------------------------------------------------------
+    def _create_transport(self, **kwargs):
+        return UdpTransport("127.0.0.1", self.server.port, **kwargs)
+
+    # ----------------------------------------------------------------------
+    def _stop_server(self):
+        # stopping the server waits for all datagrams sent before
+        self.server.stop()
+        return self.datagrams
+
+    # ----------------------------------------------------------------------
+    def test_send_one_event_per_datagram(self):
+        self._create_transport().send([b'{"message": "a"}\n', '{"message": "b"}\n'])
+        self.assertEqual(self._stop_server(), [b'{"message": "a"}\n', b'{"message": "b"}\n'])
+
+    # ----------------------------------------------------------------------
+    def test_pack_events(self):
+        events = [b'{"message": "%d"}\n' % index for index in range(10)]  # 17 bytes each
+        transport = self._create_transport(pack_events=True, max_datagram_size=40)
+        transport.send(events[:3] + [event.rstrip() for event in events[3:]])
+        datagrams = self._stop_server()
+        self.assertEqual([len(datagram) for datagram in datagrams], [34, 34, 34, 34, 34])
+        self.assertEqual(b"".join(datagrams), b"".join(events))
+
+    # ----------------------------------------------------------------------
+    def test_pack_events_oversized_event(self):
+        large_event = b'{"message": "%s"}\n' % (b"x" * 100)
+        transport = self._create_transport(pack_events=True, max_datagram_size=40)
+        transport.send([b'{"message": "a"}\n', large_event, b'{"message": "b"}\n'])
+        # the large event is sent as a whole in a datagram of its own
+        self.assertEqual(self._stop_server(), [b'{"message": "a"}\n', large_event, b'{"message": "b"}\n'])
+
+    # ----------------------------------------------------------------------
+    def test_pack_events_skip_event_exceeding_udp_payload(self):
+        transport = self._create_transport(pack_events=True)
+        transport.send([b"x" * 70000 + b"\n", b'{"message": "a"}\n'])
+        self.assertEqual(self._stop_server(), [b'{"message": "a"}\n'])
+
+    # ----------------------------------------------------------------------
+    def test_pack_events_without_sendmsg(self):
+        transport = self._create_transport(pack_events=True, max_datagram_size=40)
+        transport._use_sendmsg = False
+        transport.send([b'{"message": "a"}\n', b'{"message": "b"}\n', b'{"message": "c"}\n'])
+        self.assertEqual(self._stop_server(), [b'{"message": "a"}\n{"message": "b"}\n', b'{"message": "c"}\n'])
+
+    # ----------------------------------------------------------------------
+    def test_keep_connection(self):
+        transport = self._create_transport(keep_connection=True, pack_events=True)
+        transport.send([b'{"message": "a"}\n'])
+        sock = transport._sock
+        transport.send([b'{"message": "b"}\n'])
+        self.assertIs(transport._sock, sock)
+        transport.close()
+        self.assertIsNone(transport._sock)
+        self.assertEqual(len(self._stop_server()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,293 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  worker_test.py
+@Time    :  2026/10/18 11:02
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from logging import makeLogRecord
+from threading import Event
+import time
+import unittest
+
+from custard.logstash.circuit_breaker import STATE_CLOSED, STATE_OPEN
+from custard.logstash.constants import constants
+from custard.logstash.worker import CollapsibleEvent, DeferredEvent, LogProcessingWorker
+
+
+# pylint: disable=protected-access
+
+
+class RecordingTransport:
+    def __init__(self, expected_count):
+        self.events = []
+        self.expected_count = expected_count
+        self.completed = Event()
+
+    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+        self.events.extend(events)
+        if len(self.events) >= self.expected_count:
+            self.completed.set()
+
+    def close(self):
+        pass
+
+
+class LevelRecordingTransport(RecordingTransport):
+    accepts_levels = True
+
+    def __init__(self, expected_count):
+        super().__init__(expected_count)
+        self.levels = []
+
+    def send(self, events, use_logging=False, levels=None):
+        self.levels.extend(levels)
+        super().send(events, use_logging=use_logging)
+
+
+class FailingTransport(RecordingTransport):
+    def __init__(self):
+        super().__init__(expected_count=0)
+        self.failing = True
+        self.send_count = 0
+
+    def send(self, events, use_logging=False):
+        self.send_count += 1
+        if self.failing:
+            raise ConnectionError("Logstash is unreachable")
+        super().send(events, use_logging=use_logging)
+
+
+class LogProcessingWorkerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._drain_batch_size = constants.QUEUE_DRAIN_BATCH_SIZE
+        self._queued_events_batch_size = constants.QUEUED_EVENTS_BATCH_SIZE
+        self._queue_priority_level = constants.QUEUE_PRIORITY_LEVEL
+        constants.QUEUED_EVENTS_BATCH_SIZE = 50
+        self._circuit_breaker_constants = (
+            constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            constants.CIRCUIT_BREAKER_BACKOFF_MIN,
+            constants.CIRCUIT_BREAKER_JITTER,
+        )
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        constants.QUEUE_DRAIN_BATCH_SIZE = self._drain_batch_size
+        constants.QUEUED_EVENTS_BATCH_SIZE = self._queued_events_batch_size
+        constants.QUEUE_PRIORITY_LEVEL = self._queue_priority_level
+        (
+            constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            constants.CIRCUIT_BREAKER_BACKOFF_MIN,
+            constants.CIRCUIT_BREAKER_JITTER,
+        ) = self._circuit_breaker_constants
+
+    # ----------------------------------------------------------------------
+    def _create_worker(self, transport):
+        return LogProcessingWorker(
+            host="localhost",
+            port=5959,
+            transport=transport,
+            ssl_enable=False,
+            ssl_verify=False,
+            keyfile=None,
+            certfile=None,
+            ca_certs=None,
+            database_path=None,
+            cache={},
+            event_ttl=None,
+        )
+
+    # ----------------------------------------------------------------------
+    def _run_worker(self, event_count):
+        transport = RecordingTransport(event_count)
+        worker = self._create_worker(transport)
+        worker.start()
+        # let the worker go to sleep on the empty queue
+        time.sleep(0.2)
+        try:
+            for index in range(event_count):
+                worker.enqueue_event(f"message {index}".encode())
+            transport.completed.wait(constants.QUEUE_CHECK_INTERVAL / 2)
+        finally:
+            worker.shutdown()
+            worker.join()
+        return worker, transport
+
+    # ----------------------------------------------------------------------
+    def test_drain_wakes_up_on_count_threshold(self):
+        constants.QUEUE_DRAIN_BATCH_SIZE = 100
+        event_count = constants.QUEUED_EVENTS_FLUSH_COUNT + 10
+
+        _, transport = self._run_worker(event_count)
+        # all events must have been sent before the regular check interval elapsed
+        self.assertTrue(transport.completed.is_set())
+        self.assertEqual(len(transport.events), event_count)
+
+    # ----------------------------------------------------------------------
+    def test_drain_fetches_events_in_batches(self):
+        constants.QUEUE_DRAIN_BATCH_SIZE = 3
+        worker = self._create_worker(RecordingTransport(0))
+        for index in range(5):
+            worker.enqueue_event(f"message {index}".encode())
+
+        worker._fetch_event()
+        self.assertEqual(len(worker._events), 3)
+        worker._fetch_event()
+        self.assertEqual(len(worker._events), 2)
+        self.assertEqual(worker._drain_pending_count, 0)
+        self.assertEqual(worker._drain_pending_bytes, 0)
+
+    # ----------------------------------------------------------------------
+    def test_shutdown_without_drain_mode(self):
+        constants.QUEUE_DRAIN_BATCH_SIZE = None
+
+        worker, transport = self._run_worker(3)
+        # events are sent on shutdown at the latest
+        self.assertEqual(len(transport.events), 3)
+        self.assertEqual(worker._queue.qsize(), 0)
+
+    # ----------------------------------------------------------------------
+    def test_requeue_keeps_priority_lane(self):
+        constants.QUEUE_DRAIN_BATCH_SIZE = 10
+        constants.QUEUE_PRIORITY_LEVEL = 40
+        worker = self._create_worker(RecordingTransport(0))
+        worker.enqueue_event(b"error 1", level=40)
+        worker.enqueue_event(b"info 1", level=20)
+        worker._fetch_event()
+        worker.enqueue_event(b"error 2", level=40)
+        worker.enqueue_event(b"info 2", level=20)
+        # e.g. writing the events to the cache failed
+        worker._requeue_event()
+
+        worker._fetch_event()
+        self.assertEqual(worker._events, [(b"error 1", 40), (b"error 2", 40), (b"info 1", 20), (b"info 2", 20)])
+
+    # ----------------------------------------------------------------------
+    def test_send_levels(self):
+        transport = LevelRecordingTransport(3)
+        worker = self._create_worker(transport)
+        worker.enqueue_event(b"error", level=40)
+        worker.enqueue_event(b"info", level=20)
+        worker.enqueue_event(b"unknown")
+        worker.start()
+        worker.shutdown()
+        worker.join()
+        # transports accepting levels get the level of each event, e.g. to forward it to a LogShipper
+        self.assertEqual(transport.events, [b"error", b"info", b"unknown"])
+        self.assertEqual(transport.levels, [40, 20, None])
+
+    # ----------------------------------------------------------------------
+    def test_format_deferred_events(self):
+        def format_record(record):
+            if record.msg == "broken":
+                raise ValueError(record.msg)
+            return record.msg.encode()
+
+        worker = self._create_worker(RecordingTransport(0))
+        worker._setup_logger()
+        worker._safe_log = lambda *args, **kwargs: None
+        worker._events = [
+            (DeferredEvent(makeLogRecord({"msg": "a"}), format_record), 20),
+            (b"b", 20),
+            (DeferredEvent(makeLogRecord({"msg": "broken"}), format_record), 40),
+        ]
+        worker._format_deferred_events()
+        # events failing to be formatted are dropped
+        self.assertEqual(worker._events, [(b"a", 20), (b"b", 20)])
+
+    # ----------------------------------------------------------------------
+    def test_collapse_events(self):
+        def format_record(record):
+            return f"{record.msg} {getattr(record, 'repeat_count', 0)}".encode()
+
+        def create_event(index):
+            record = makeLogRecord({"msg": f"message {index}"})
+            return CollapsibleEvent(record, format_record, "message %d", (index,))
+
+        transport = RecordingTransport(2)
+        worker = self._create_worker(transport)
+        worker.start()
+        time.sleep(0.2)
+        try:
+            for index in range(3):
+                worker.enqueue_event(create_event(index), level=20)
+            # flushing closes all windows, otherwise only the first event would be sent
+            worker.force_flush_queued_events()
+            self.assertTrue(transport.completed.wait(constants.QUEUE_CHECK_INTERVAL * 2))
+        finally:
+            worker.shutdown()
+            worker.join()
+
+        self.assertEqual(transport.events, [b"message 0 0", b"message 2 2"])
+        self.assertEqual(worker.collapsed_event_count, 2)
+
+    # ----------------------------------------------------------------------
+    def test_send_statistics(self):
+        worker, transport = self._run_worker(3)
+        self.assertEqual(len(transport.events), 3)
+        self.assertEqual(worker.sent_event_count, 3)
+        self.assertEqual(worker.backlog, 0)
+        self.assertTrue(worker.is_available(cooldown=30))
+
+        worker._update_send_statistics(failed=True)
+        self.assertEqual(worker.send_failure_count, 1)
+        self.assertFalse(worker.is_available(cooldown=30))
+        self.assertTrue(worker.is_available(cooldown=0))
+        worker._update_send_statistics(sent_count=1)
+        self.assertTrue(worker.is_available(cooldown=30))
+
+    # ----------------------------------------------------------------------
+    def test_circuit_breaker(self):
+        constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD = 2
+        constants.CIRCUIT_BREAKER_BACKOFF_MIN = 0.2
+        constants.CIRCUIT_BREAKER_JITTER = 0.0
+        transport = FailingTransport()
+        worker = self._create_worker(transport)
+        # drive the flush synchronously instead of starting the thread
+        worker._reset_flush_counters()
+        worker._setup_logger()
+        worker._setup_database()
+        for index in range(10):
+            worker._database.add_event(f"message {index}".encode())
+        fetched_batch_sizes = []
+        get_queued_events = worker._database.get_queued_events
+
+        def recording_get_queued_events(batch_size=None):
+            events = get_queued_events(batch_size=batch_size)
+            fetched_batch_sizes.append(len(events))
+            return events
+
+        worker._database.get_queued_events = recording_get_queued_events
+
+        worker._flush_queued_events(force=False)
+        self.assertEqual(fetched_batch_sizes, [])  # neither the interval nor the count has been reached
+        worker._flush_queued_events(force=True)
+        worker._flush_queued_events(force=True)
+        self.assertEqual(worker.circuit_state, STATE_OPEN)
+        self.assertEqual(transport.send_count, 2)
+
+        # no cache reads while the circuit is open
+        worker._non_flushed_event_count = constants.QUEUED_EVENTS_FLUSH_COUNT + 1
+        for _ in range(5):
+            worker._flush_queued_events()
+        self.assertEqual(transport.send_count, 2)
+        self.assertEqual(fetched_batch_sizes, [10, 10])
+
+        # a single event probes the endpoint before the backlog is released
+        time.sleep(0.25)
+        transport.failing = False
+        worker._flush_queued_events()
+        self.assertEqual(worker.circuit_state, STATE_CLOSED)
+        self.assertEqual(fetched_batch_sizes[2:], [constants.CIRCUIT_BREAKER_PROBE_BATCH_SIZE, 9, 0])
+        self.assertEqual(len(transport.events), 10)
+        self.assertEqual(worker.circuit_breaker.open_count, 1)
+        worker._close_database()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -10,21 +10,31 @@
 @Desc    :  None
 """
 from abc import ABC, abstractmethod
-from typing import Iterator, Union
-import json
+from collections import namedtuple
+from typing import Iterator, Tuple, Union
 import logging
+import select
 import socket
 import ssl
+import struct
+import time
+import zlib
 
 from requests.auth import HTTPBasicAuth
 import pylogbeat
 import requests
 
-from custard.logstash.utils import ichunked
+from custard.logstash.constants import constants
+from custard.logstash.utils import COMPRESSION_METHODS, compress
 
 
 logger = logging.getLogger(__name__)
 
+BeatsTransportStats = namedtuple(
+    "BeatsTransportStats",
+    ("window_size", "windows", "events", "connects", "timeouts", "last_latency", "average_latency", "max_latency"),
+)
+
 
 class TimeoutNotSet:
     pass
@@ -74,7 +84,24 @@ class Transport(ABC):
         pass
 
 
+# the maximum payload of an UDP datagram over IPv4
+UDP_MAX_PAYLOAD_SIZE = 65507
+
+
 class UdpTransport:
+    """Send events as UDP datagrams, by default one event per datagram.
+
+    With `pack_events` set, as many newline-delimited events as fit into `max_datagram_size`
+    bytes are sent in one datagram. Events are never split: an event larger than
+    `max_datagram_size` is sent in a datagram of its own (to be fragmented by IP), an event
+    larger than the maximum UDP payload is skipped.
+
+    :param keep_connection: Keep the socket open across sends
+    :param pack_events: Pack multiple events into one datagram
+    :param max_datagram_size: Maximum datagram size for packed events
+                              (default: `constants.UDP_MAX_DATAGRAM_SIZE`)
+    """
+
     _keep_connection = False
 
     # ----------------------------------------------------------------------
@@ -84,12 +111,19 @@ class UdpTransport:
         self._port = port
         self._timeout = timeout
         self._sock = None
+        self._keep_connection = kwargs.get("keep_connection", False)
+        self._pack_events = kwargs.get("pack_events", False)
+        self._max_datagram_size = kwargs.get("max_datagram_size", constants.UDP_MAX_DATAGRAM_SIZE)
+        # scatter/gather sends save joining the events of a datagram, not available on Windows
+        self._use_sendmsg = hasattr(socket.socket, "sendmsg")
+        self._use_logging = False
 
     # ----------------------------------------------------------------------
-    def send(self, events, use_logging=False):  # pylint: disable=unused-argument
+    def send(self, events, use_logging=False):
         # Ideally we would keep the socket open but this is risky because we might not notice
         # a broken TCP connection and send events into the dark.
         # On UDP we push into the dark by design :)
+        self._use_logging = use_logging
         self._create_socket()
         try:
             self._send(events)
@@ -108,8 +142,44 @@ class UdpTransport:
 
     # ----------------------------------------------------------------------
     def _send(self, events):
+        if not self._pack_events:
+            for event in events:
+                self._send_via_socket(event)
+            return
+
+        for datagram in self._pack_datagrams(events):
+            self._send_datagram(datagram)
+
+    # ----------------------------------------------------------------------
+    def _pack_datagrams(self, events):
+        """Group the events into lists of newline-terminated events of at most `max_datagram_size` bytes"""
+        datagram = []
+        datagram_size = 0
         for event in events:
-            self._send_via_socket(event)
+            event = self._convert_data_to_send(event)
+            if not event.endswith(b"\n"):
+                event += b"\n"
+            if len(event) > UDP_MAX_PAYLOAD_SIZE:
+                if self._use_logging:
+                    logger.warning(
+                        "The event size <%s> is greater than the max UDP payload size. Skipping event.", len(event)
+                    )
+                continue
+            if datagram and datagram_size + len(event) > self._max_datagram_size:
+                yield datagram
+                datagram = []
+                datagram_size = 0
+            datagram.append(event)
+            datagram_size += len(event)
+        if datagram:
+            yield datagram
+
+    # ----------------------------------------------------------------------
+    def _send_datagram(self, datagram):
+        if self._use_sendmsg:
+            self._sock.sendmsg(datagram, (), 0, (self._host, self._port))
+        else:
+            self._sock.sendto(b"".join(datagram), (self._host, self._port))
 
     # ----------------------------------------------------------------------
     def _send_via_socket(self, data):
@@ -135,23 +205,109 @@ class UdpTransport:
 
 
 class TcpTransport(UdpTransport):
+    """Send events newline-delimited over a TCP (or TLS) connection.
+
+    With `compression` set, all events of one `send()` call are joined and compressed into
+    a single frame: a 4-byte big-endian length followed by the gzip or deflate compressed
+    newline-delimited events. The receiving side has to unpack the frames before handing
+    the events to logstash, e.g. a relay in front of the `tcp` input.
+
+    With `keep_connection` set, the connection (and its TLS session) is reused across sends.
+    Before each send a non-blocking probe checks whether the peer closed the connection in the
+    meantime, connections older than `constants.TCP_MAX_CONNECTION_AGE` are re-established and
+    failed connects are retried only after an exponentially growing delay
+    (`constants.TCP_RECONNECT_BACKOFF_MIN` to `constants.TCP_RECONNECT_BACKOFF_MAX`).
+
+    :param keep_connection: Keep the connection open across sends
+    :param compression: Optional compression method of the frames, `gzip` or `deflate`
+    :param compression_level: The zlib compression level (0-9, -1 for the zlib default)
+    """
+
     # ----------------------------------------------------------------------
     def __init__(  # pylint: disable=too-many-arguments
         self, host, port, ssl_enable, ssl_verify, keyfile, certfile, ca_certs, timeout=TimeoutNotSet, **kwargs
     ):
-        super().__init__(host, port)
+        super().__init__(host, port, keep_connection=kwargs.get("keep_connection", False))
         self._ssl_enable = ssl_enable
         self._ssl_verify = ssl_verify
         self._keyfile = keyfile
         self._certfile = certfile
         self._ca_certs = ca_certs
         self._timeout = timeout
+        self._ssl_context = None
+        self._connected_at = None
+        self._reconnect_backoff = None
+        self._next_connect_attempt = None
+        self._compression = kwargs.get("compression", None)
+        self._compression_level = kwargs.get("compression_level", zlib.Z_DEFAULT_COMPRESSION)
+        if self._compression is not None and self._compression not in COMPRESSION_METHODS:
+            raise ValueError(
+                f"Invalid compression method '{self._compression}', use one of: {', '.join(COMPRESSION_METHODS)}"
+            )
+
+    # ----------------------------------------------------------------------
+    def send(self, events, use_logging=False):
+        if not self._keep_connection:
+            super().send(events, use_logging=use_logging)
+            return
+
+        self._check_connection()
+        self._create_socket()
+        try:
+            self._send(events)
+        except Exception:
+            # the state of a connection after a failed write is unknown, start over with a new one
+            self._close(force=True)
+            raise
+
+    # ----------------------------------------------------------------------
+    def _check_connection(self):
+        if self._sock is None:
+            return
+
+        max_age = constants.TCP_MAX_CONNECTION_AGE
+        if max_age is not None and time.monotonic() - self._connected_at > max_age:
+            self._close(force=True)
+        elif not self._is_connection_alive():
+            self._close(force=True)
+
+    # ----------------------------------------------------------------------
+    def _is_connection_alive(self):
+        # Logstash never sends data on this connection, so a readable socket usually means
+        # the peer closed (EOF) or reset it
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+            if not readable:
+                return True
+            if not self._ssl_enable:
+                return bool(self._sock.recv(1, socket.MSG_PEEK))
+            return self._is_tls_connection_alive()
+        except OSError:
+            return False
+
+    # ----------------------------------------------------------------------
+    def _is_tls_connection_alive(self):
+        # TLS 1.3 servers send session tickets after the handshake, let the TLS layer process
+        # the pending records without blocking: no application data means the connection is fine
+        timeout = self._sock.gettimeout()
+        self._sock.setblocking(False)
+        try:
+            return bool(self._sock.recv(1))
+        except ssl.SSLWantReadError:
+            return True
+        finally:
+            self._sock.settimeout(timeout)
 
     # ----------------------------------------------------------------------
     def _create_socket(self):
         if self._sock is not None:
             return
 
+        if self._keep_connection and self._next_connect_attempt is not None:
+            remaining = self._next_connect_attempt - time.monotonic()
+            if remaining > 0:
+                raise ConnectionError(f"Reconnecting to {self._host}:{self._port} deferred for {remaining:.1f}s")
+
         # from logging.handlers.SocketHandler
         self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         if self._timeout is not TimeoutNotSet:
@@ -159,39 +315,115 @@ class TcpTransport(UdpTransport):
 
         try:
             self._sock.connect((self._host, self._port))
-            # non-SSL
-            if not self._ssl_enable:
-                return
             # SSL
-            cert_reqs = ssl.CERT_REQUIRED
-            ssl_context = ssl.create_default_context(cafile=self._ca_certs)
-            if not self._ssl_verify:
-                if self._ca_certs:
-                    cert_reqs = ssl.CERT_OPTIONAL
-                else:
-                    cert_reqs = ssl.CERT_NONE
-
-            ssl_context.verify_mode = cert_reqs
-            ssl_context.check_hostname = False
-            ssl_context.load_cert_chain(self._certfile, self._keyfile)
-            self._sock = ssl_context.wrap_socket(self._sock, server_side=False)
+            if self._ssl_enable:
+                self._sock = self._get_ssl_context().wrap_socket(self._sock, server_side=False)
         except socket.error:
-            self._close()
+            self._close(force=True)
+            self._defer_reconnect()
             raise
 
+        self._connected_at = time.monotonic()
+        self._reconnect_backoff = None
+        self._next_connect_attempt = None
+
+    # ----------------------------------------------------------------------
+    def _defer_reconnect(self):
+        if not self._keep_connection:
+            return
+
+        if self._reconnect_backoff is None:
+            self._reconnect_backoff = constants.TCP_RECONNECT_BACKOFF_MIN
+        else:
+            self._reconnect_backoff = min(self._reconnect_backoff * 2, constants.TCP_RECONNECT_BACKOFF_MAX)
+        self._next_connect_attempt = time.monotonic() + self._reconnect_backoff
+
+    # ----------------------------------------------------------------------
+    def _get_ssl_context(self):
+        # built once per transport, loading the CA and certificate files is expensive
+        if self._ssl_context is not None:
+            return self._ssl_context
+
+        cert_reqs = ssl.CERT_REQUIRED
+        ssl_context = ssl.create_default_context(cafile=self._ca_certs)
+        if not self._ssl_verify:
+            if self._ca_certs:
+                cert_reqs = ssl.CERT_OPTIONAL
+            else:
+                cert_reqs = ssl.CERT_NONE
+
+        ssl_context.verify_mode = cert_reqs
+        ssl_context.check_hostname = False
+        if self._certfile:
+            ssl_context.load_cert_chain(self._certfile, self._keyfile)
+        self._ssl_context = ssl_context
+        return ssl_context
+
+    # ----------------------------------------------------------------------
+    def _send(self, events):
+        if self._compression is None:
+            super()._send(events)
+            return
+
+        payload = b"".join(self._convert_data_to_send(event) for event in events)
+        if not payload:
+            return
+        frame = compress(payload, self._compression, self._compression_level)
+        self._sock.sendall(struct.pack("!I", len(frame)) + frame)
+
     # ----------------------------------------------------------------------
     def _send_via_socket(self, data):
         data_to_send = self._convert_data_to_send(data)
         self._sock.sendall(data_to_send)
 
 
+class _BeatsClient(pylogbeat.PyLogBeatClient):
+    # ----------------------------------------------------------------------
+    @property
+    def socket(self):
+        return self._socket
+
+    # ----------------------------------------------------------------------
+    def set_use_logging(self, use_logging):
+        self._use_logging = use_logging
+
+    # ----------------------------------------------------------------------
+    def _create_and_connect_socket(self):
+        super()._create_and_connect_socket()
+        # the window size and the payload are written separately, do not let Nagle's algorithm
+        # hold back the payload until the server's delayed ACK of the window size frame
+        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    # ----------------------------------------------------------------------
+    def _reinit_last_ack(self):
+        super()._reinit_last_ack()
+        # sequence numbers start over with each window like in the Beats clients, so a
+        # long-lived connection never exceeds the 32-bit sequence numbers of the protocol
+        self._sequence = 0
+
+
 class BeatsTransport:
-    _batch_size = 10
+    """Send events with the Beats (Lumberjack v2) protocol to the Logstash `beats` input.
+
+    The connection (and its TLS session) is kept open across sends unless `keep_connection` is
+    False. Like for the TcpTransport, a connection closed by the peer in the meantime or older
+    than `constants.TCP_MAX_CONNECTION_AGE` is re-established before the next send.
+
+    Events are sent in windows, Logstash acknowledges each window before the next one is sent.
+    The window size adapts to the link: it starts at `constants.BEATS_WINDOW_SIZE_INITIAL`, is
+    doubled (up to `constants.BEATS_WINDOW_SIZE_MAX`) whenever a full window is acknowledged within
+    `constants.BEATS_WINDOW_GROW_LATENCY` seconds and halved (down to `constants.BEATS_WINDOW_SIZE_MIN`)
+    whenever waiting for the acknowledgement times out. `stats()` returns the current window size
+    and the latencies of the windows sent so far.
+
+    :param keep_connection: Keep the connection open across sends
+    """
 
     # ----------------------------------------------------------------------
     def __init__(  # pylint: disable=too-many-arguments
         self, host, port, ssl_enable, ssl_verify, keyfile, certfile, ca_certs, timeout=TimeoutNotSet, **kwargs
     ):
+        self._keep_connection = kwargs.pop("keep_connection", True)
         timeout_ = None if timeout is TimeoutNotSet else timeout
         self._client_arguments = dict(
             host=host,
@@ -204,17 +436,108 @@ class BeatsTransport:
             ca_certs=ca_certs,
             **kwargs,
         )
+        self._client = None
+        self._connected_at = None
+        self.window_size = constants.BEATS_WINDOW_SIZE_INITIAL
+        # per-window statistics
+        self.window_count = 0
+        self.event_count = 0
+        self.connect_count = 0
+        self.timeout_count = 0
+        self.last_window_latency = None
+        self.max_window_latency = 0.0
+        self._window_latency_sum = 0.0
 
     # ----------------------------------------------------------------------
     def close(self):
-        pass  # nothing to do
+        self._close()
 
     # ----------------------------------------------------------------------
     def send(self, events, use_logging=False):
-        client = pylogbeat.PyLogBeatClient(use_logging=use_logging, **self._client_arguments)
-        with client:
-            for events_subset in ichunked(events, self._batch_size):
-                client.send(events_subset)
+        self._check_connection()
+        client = self._get_client(use_logging)
+        try:
+            position = 0
+            while position < len(events):
+                window = events[position : position + self.window_size]
+                self._send_window(client, window)
+                position += len(window)
+        except Exception:
+            # the state of a connection after a failed window is unknown, start over with a new one
+            self._close()
+            raise
+        if not self._keep_connection:
+            self._close()
+
+    # ----------------------------------------------------------------------
+    def stats(self):
+        return BeatsTransportStats(
+            window_size=self.window_size,
+            windows=self.window_count,
+            events=self.event_count,
+            connects=self.connect_count,
+            timeouts=self.timeout_count,
+            last_latency=self.last_window_latency,
+            average_latency=self._window_latency_sum / self.window_count if self.window_count else None,
+            max_latency=self.max_window_latency,
+        )
+
+    # ----------------------------------------------------------------------
+    def _check_connection(self):
+        if self._client is None:
+            return
+
+        max_age = constants.TCP_MAX_CONNECTION_AGE
+        if max_age is not None and time.monotonic() - self._connected_at > max_age:
+            self._close()
+        elif not self._is_connection_alive():
+            self._close()
+
+    # ----------------------------------------------------------------------
+    def _is_connection_alive(self):
+        # Logstash sends nothing between windows, so a readable socket means the peer closed
+        # (e.g. after the `client_inactivity_timeout` of the beats input) or reset the connection
+        try:
+            readable, _, _ = select.select([self._client.socket], [], [], 0)
+        except (OSError, ValueError):
+            return False
+        return not readable
+
+    # ----------------------------------------------------------------------
+    def _get_client(self, use_logging):
+        if self._client is None:
+            client = _BeatsClient(use_logging=use_logging, **self._client_arguments)
+            client.connect()
+            self._client = client
+            self._connected_at = time.monotonic()
+            self.connect_count += 1
+        self._client.set_use_logging(use_logging)
+        return self._client
+
+    # ----------------------------------------------------------------------
+    def _send_window(self, client, window):
+        started = time.perf_counter()
+        try:
+            client.send(window)
+        except socket.timeout:
+            self.timeout_count += 1
+            self.window_size = max(self.window_size // 2, constants.BEATS_WINDOW_SIZE_MIN)
+            raise
+        latency = time.perf_counter() - started
+
+        self.window_count += 1
+        self.event_count += len(window)
+        self.last_window_latency = latency
+        self.max_window_latency = max(self.max_window_latency, latency)
+        self._window_latency_sum += latency
+        if len(window) == self.window_size and latency <= constants.BEATS_WINDOW_GROW_LATENCY:
+            self.window_size = min(self.window_size * 2, constants.BEATS_WINDOW_SIZE_MAX)
+
+    # ----------------------------------------------------------------------
+    def _close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
 
 
 class HttpTransport(Transport):
@@ -243,9 +566,15 @@ class HttpTransport(Transport):
     :type username: str
     :param password: Password for basic authorization. (Default: "")
     :type password: str
-    :param max_content_length: The max content of an HTTP request in bytes.
-    (Default: 100MB)
+    :param max_content_length: The max content of an HTTP request in bytes,
+    measured before compression. (Default: 100MB)
     :type max_content_length: int
+    :param compression: Compress the request bodies with `gzip` or `deflate`
+    and set the `Content-Encoding` header accordingly. (Default: None)
+    :type compression: str
+    :param compression_level: The zlib compression level, 0-9 or -1 for the
+    zlib default. (Default: -1)
+    :type compression_level: int
     """
 
     def __init__(
@@ -262,6 +591,12 @@ class HttpTransport(Transport):
         self._username = kwargs.get("username", None)
         self._password = kwargs.get("password", None)
         self._max_content_length = kwargs.get("max_content_length", 100 * 1024 * 1024)
+        self._compression = kwargs.get("compression", None)
+        self._compression_level = kwargs.get("compression_level", zlib.Z_DEFAULT_COMPRESSION)
+        if self._compression is not None and self._compression not in COMPRESSION_METHODS:
+            raise ValueError(
+                f"Invalid compression method '{self._compression}', use one of: {', '.join(COMPRESSION_METHODS)}"
+            )
         self.__session = None
 
     @property
@@ -277,40 +612,73 @@ class HttpTransport(Transport):
             protocol = "https"
         return f"{protocol}://{self._host}:{self._port}"
 
-    def __batches(self, events: list) -> Iterator[list]:
+    def __batches(self, events: list) -> Iterator[Tuple[bytes, int]]:
         """Generate dynamic sized batches based on the max content length.
 
+        A batch is a JSON array built by concatenating the already serialized
+        events, its size is tracked incrementally from the event sizes.
+
         :param events: A list of events.
         :type events: list
-        :return: A iterator which generates batches of events.
-        :rtype: Iterator[list]
+        :return: A iterator which generates the JSON array and the count of events per batch.
+        :rtype: Iterator[Tuple[bytes, int]]
         """
         current_batch = []
-        event_iter = iter(events)
-        while True:
-            try:
-                current_event = next(event_iter)
-            except StopIteration:
-                current_event = None
-                if not current_batch:
-                    return
-                yield current_batch
-            if current_event is None:
-                return
-            if len(current_event) > self._max_content_length:
+        # the brackets of the JSON array
+        current_size = 2
+        for event in events:
+            event = self.__encode_event(event)
+            if len(event) + 2 > self._max_content_length:
                 msg = "The event size <%s> is greater than the max content length <%s>."
                 msg += "Skipping event."
                 if self._use_logging:
-                    logger.warning(msg, len(current_event), self._max_content_length)
+                    logger.warning(msg, len(event), self._max_content_length)
                 continue
-            obj = json.loads(current_event)
-            content_length = len(json.dumps(current_batch + [obj]).encode("utf8"))
-            if content_length > self._max_content_length:
-                batch = current_batch
-                current_batch = [obj]
-                yield batch
-            else:
-                current_batch += [obj]
+            # one more byte for the separating comma
+            if current_batch and current_size + 1 + len(event) > self._max_content_length:
+                yield b"[" + b",".join(current_batch) + b"]", len(current_batch)
+                current_batch = []
+                current_size = 2
+            if current_batch:
+                current_size += 1
+            current_batch.append(event)
+            current_size += len(event)
+        if current_batch:
+            yield b"[" + b",".join(current_batch) + b"]", len(current_batch)
+
+    @staticmethod
+    def __encode_event(event: Union[bytes, str]) -> bytes:
+        """Encode the event and strip the trailing line break added by the handler.
+
+        :param event: A serialized event.
+        :type event: bytes or str
+        :return: The event as bytes.
+        :rtype: bytes
+        """
+        if isinstance(event, str):
+            event = event.encode("utf-8")
+        return event.rstrip()
+
+    def __get_session(self) -> requests.Session:
+        """The HTTP session is kept across sends to re-use its pooled connections.
+
+        :return: The HTTP session.
+        :rtype: requests.Session
+        """
+        if self.__session is None:
+            self.__session = requests.Session()
+        return self.__session
+
+    def __headers(self) -> dict:
+        """The request headers, including the content encoding if the bodies are compressed.
+
+        :return: The HTTP headers.
+        :rtype: dict
+        """
+        headers = {"Content-Type": "application/json"}
+        if self._compression is not None:
+            headers["Content-Encoding"] = self._compression
+        return headers
 
     def __auth(self) -> HTTPBasicAuth:
         """The authentication method for the logstash pipeline. If the username
@@ -327,6 +695,7 @@ class HttpTransport(Transport):
         """Close the HTTP session."""
         if self.__session is not None:
             self.__session.close()
+            self.__session = None
 
     def send(self, events: list, **kwargs):
         """Send events to the logstash pipeline.
@@ -338,23 +707,27 @@ class HttpTransport(Transport):
         as much of the events as possible in one request. If the total size of
         the received events is greater than the maximal content length the
         events will be divide into batches.
+        The HTTP session and its connections are kept open until `close()` is called.
+        If compression is enabled each batch is compressed here, i.e. on the thread
+        calling `send()` which is the worker thread for asynchronous handlers.
 
         :param events: A list of events
         :type events: list
         """
-        self.__session = requests.Session()
-        for batch in self.__batches(events):
+        session = self.__get_session()
+        headers = self.__headers()
+        for body, event_count in self.__batches(events):
+            if self._compression is not None:
+                body = compress(body, self._compression, self._compression_level)
             if self._use_logging:
-                logger.debug("Batch length: %s, Batch size: %s", len(batch), len(json.dumps(batch).encode("utf8")))
-            response = self.__session.post(
+                logger.debug("Batch length: %s, Batch size: %s", event_count, len(body))
+            response = session.post(
                 self.url,
-                headers={"Content-Type": "application/json"},
-                json=batch,
+                headers=headers,
+                data=body,
                 verify=self._ssl_verify,
                 timeout=self._timeout,
                 auth=self.__auth(),
             )
             if response.status_code != 200:
-                self.close()
                 response.raise_for_status()
-        self.close()
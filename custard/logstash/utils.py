@@ -16,6 +16,12 @@ from importlib import import_module
 from itertools import chain, islice
 import sys
 import traceback
+import zlib
+
+
+COMPRESSION_GZIP = "gzip"
+COMPRESSION_DEFLATE = "deflate"
+COMPRESSION_METHODS = (COMPRESSION_GZIP, COMPRESSION_DEFLATE)
 
 
 # ----------------------------------------------------------------------
@@ -33,6 +39,19 @@ def ichunked(seq, chunk_size):
         yield list(chain((element,), chunk_iterable))
 
 
+# ----------------------------------------------------------------------
+def compress(data, method, level=zlib.Z_DEFAULT_COMPRESSION):
+    """Compress data in gzip or deflate (i.e. zlib, as used by HTTP's Content-Encoding) format."""
+    if method == COMPRESSION_GZIP:
+        wbits = 16 + zlib.MAX_WBITS
+    elif method == COMPRESSION_DEFLATE:
+        wbits = zlib.MAX_WBITS
+    else:
+        raise ValueError(f"Invalid compression method '{method}', use one of: {', '.join(COMPRESSION_METHODS)}")
+    compressor = zlib.compressobj(level, zlib.DEFLATED, wbits)
+    return compressor.compress(data) + compressor.flush()
+
+
 # ----------------------------------------------------------------------
 def safe_log_via_print(log_level, message, *args, **kwargs):
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
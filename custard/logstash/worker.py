@@ -11,17 +11,22 @@
 """
 from datetime import datetime
 from logging import getLogger as get_logger
-from queue import Empty, PriorityQueue
+from queue import Empty
 from socket import gaierror as socket_gaierror
-from threading import Event, Thread
+from threading import Event, Lock, Thread
+import time
 
 from limits import parse as parse_rate_limit
 from limits.storage import MemoryStorage
 from limits.strategies import FixedWindowRateLimiter
 
+from custard.logstash.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+from custard.logstash.collapser import DuplicateCollapser
 from custard.logstash.constants import constants
 from custard.logstash.database import DatabaseCache, DatabaseDiskIOError, DatabaseLockedError
+from custard.logstash.event_queue import EventQueue
 from custard.logstash.memory_cache import MemoryCache
+from custard.logstash.spool import FileSpoolCache
 from custard.logstash.utils import safe_log_via_print
 
 
@@ -29,6 +34,44 @@ class ProcessingError(Exception):
     """"""
 
 
+class DeferredEvent:
+    """A snapshot of a log record to be formatted by the worker thread instead of the logging thread.
+
+    :param record: The snapshot of the log record
+    :param format_record: Callable formatting the record into the event to be cached
+    """
+
+    __slots__ = ("record", "format_record")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, record, format_record):
+        self.record = record
+        self.format_record = format_record
+
+    # ----------------------------------------------------------------------
+    def __len__(self):
+        # estimated event size for the drain mode byte counters, the message is already resolved
+        return len(self.record.msg)
+
+
+class CollapsibleEvent(DeferredEvent):
+    """A deferred event which the worker thread collapses with its duplicates, see DuplicateCollapser.
+
+    :param record: The snapshot of the log record
+    :param format_record: Callable formatting the record into the event to be cached
+    :param template: The message template of the original record
+    :param args: The message arguments of the original record
+    """
+
+    __slots__ = ("template", "args")
+
+    # ----------------------------------------------------------------------
+    def __init__(self, record, format_record, template, args):
+        super().__init__(record, format_record)
+        self.template = template
+        self.args = args
+
+
 class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attributes
     """"""
 
@@ -43,6 +86,8 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
         self._certfile = kwargs.pop("certfile")
         self._ca_certs = kwargs.pop("ca_certs")
         self._database_path = kwargs.pop("database_path")
+        self._database_spool = kwargs.pop("database_spool", False)
+        self._spool_path = kwargs.pop("spool_path", None)
         self._memory_cache = kwargs.pop("cache")
         self._event_ttl = kwargs.pop("event_ttl")
 
@@ -52,32 +97,128 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
         self._shutdown_event = Event()
         self._flush_event = Event()
-        self._queue = PriorityQueue()
+        self._queue = EventQueue(maxsize=constants.QUEUE_MAX_SIZE, overflow=constants.QUEUE_OVERFLOW)
+        # drain mode: wake up on count/byte thresholds and process events in batches
+        self._drain_batch_size = constants.QUEUE_DRAIN_BATCH_SIZE
+        self._drain_event = Event()
+        self._drain_lock = Lock()
+        self._drain_pending_count = 0
+        self._drain_pending_bytes = 0
+        self._collapser = DuplicateCollapser(
+            window=constants.COLLAPSE_WINDOW,
+            max_windows=constants.COLLAPSE_MAX_WINDOWS,
+            args_sample_size=constants.COLLAPSE_ARGS_SAMPLE_SIZE,
+        )
 
-        self._event = None
+        # backlog and send statistics, written by the worker thread only
+        self._cached_event_count = 0
+        self.sent_event_count = 0
+        self.send_failure_count = 0
+        self._consecutive_send_failures = 0
+        self._last_send_failure = None
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=constants.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            backoff_min=constants.CIRCUIT_BREAKER_BACKOFF_MIN,
+            backoff_max=constants.CIRCUIT_BREAKER_BACKOFF_MAX,
+            jitter=constants.CIRCUIT_BREAKER_JITTER,
+        )
+        self.circuit_breaker.add_listener(self._log_circuit_state_change)
+
+        self._events = None
         self._database = None
         self._last_event_flush_date = None
         self._non_flushed_event_count = None
+        self._non_flushed_event_bytes = None
         self._logger = None
         self._rate_limit_storage = None
         self._rate_limit_strategy = None
         self._rate_limit_item = None
 
     # ----------------------------------------------------------------------
-    def enqueue_event(self, event):
+    def enqueue_event(self, event, level=None):
         # called from other threads
-        self._queue.put(event)
+        priority = level is not None and self._is_priority_level(level)
+        if not self._queue.put((event, level), priority=priority, timeout=constants.QUEUE_BLOCK_TIMEOUT):
+            return  # dropped due to a full queue
+        if self._drain_batch_size:
+            self._notify_drain(len(event))
+
+    # ----------------------------------------------------------------------
+    @staticmethod
+    def _is_priority_level(level):
+        priority_level = constants.QUEUE_PRIORITY_LEVEL
+        return priority_level is not None and level >= priority_level
+
+    # ----------------------------------------------------------------------
+    @property
+    def dropped_event_count(self):
+        """Count of events discarded because the internal queue was full"""
+        return self._queue.dropped_count
+
+    # ----------------------------------------------------------------------
+    @property
+    def collapsed_event_count(self):
+        """Count of events collapsed into the event of a previous duplicate"""
+        return self._collapser.collapsed_count
+
+    # ----------------------------------------------------------------------
+    @property
+    def backlog(self):
+        """Count of events not yet sent, in the internal queue and in the cache"""
+        return self._queue.qsize() + self._cached_event_count
+
+    # ----------------------------------------------------------------------
+    def is_available(self, cooldown):
+        """False if the last attempt to send events failed less than `cooldown` seconds ago"""
+        if not self._consecutive_send_failures:
+            return True
+        return time.monotonic() - self._last_send_failure >= cooldown
+
+    # ----------------------------------------------------------------------
+    @property
+    def circuit_state(self):
+        """State of the circuit breaker around sending events: `closed`, `open` or `half_open`"""
+        return self.circuit_breaker.state
+
+    # ----------------------------------------------------------------------
+    def _log_circuit_state_change(self, breaker, old_state, new_state):  # pylint: disable=unused-argument
+        if new_state == STATE_OPEN:
+            self._safe_log(
+                "warning",
+                "Sending events failed %d times in a row, pausing for %.1f seconds (%d events pending)",
+                breaker.consecutive_failures,
+                breaker.retry_delay,
+                self.backlog,
+                extra=dict(circuit_state=new_state, retry_delay=breaker.retry_delay),
+            )
+        elif new_state == STATE_CLOSED:
+            self._safe_log("info", "Sending events succeeded again", extra=dict(circuit_state=new_state))
+        else:
+            self._safe_log("debug", "Probing with a batch of %d events", constants.CIRCUIT_BREAKER_PROBE_BATCH_SIZE)
+
+    # ----------------------------------------------------------------------
+    def _notify_drain(self, event_size):
+        with self._drain_lock:
+            self._drain_pending_count += 1
+            self._drain_pending_bytes += event_size
+            if (
+                self._drain_pending_count >= constants.QUEUE_DRAIN_WAKEUP_COUNT
+                or self._drain_pending_bytes >= constants.QUEUE_DRAIN_WAKEUP_BYTES
+            ):
+                self._drain_event.set()
 
     # ----------------------------------------------------------------------
     def shutdown(self):
         # called from other threads
         self._shutdown_event.set()
+        self._drain_event.set()
 
     # ----------------------------------------------------------------------
     def run(self):
         self._reset_flush_counters()
         self._setup_logger()
         self._setup_database()
+        self._count_cached_events()
         try:
             self._fetch_events()
         except Exception as exc:
@@ -86,15 +227,20 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
             self._log_general_error(exc)
         # check for empty queue and report if not
         self._warn_about_non_empty_queue_on_shutdown()
+        self._warn_about_dropped_events_on_shutdown()
+        self._warn_about_evicted_events_on_shutdown()
+        self._close_database()
 
     # ----------------------------------------------------------------------
     def force_flush_queued_events(self):
         self._flush_event.set()
+        self._drain_event.set()
 
     # ----------------------------------------------------------------------
     def _reset_flush_counters(self):
         self._last_event_flush_date = datetime.now()
         self._non_flushed_event_count = 0
+        self._non_flushed_event_bytes = 0
 
     # ----------------------------------------------------------------------
     def _clear_flush_event(self):
@@ -102,7 +248,8 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
     # ----------------------------------------------------------------------
     def _setup_logger(self):
-        self._logger = get_logger(self.name)
+        # the same logger for all workers, their thread names might differ
+        self._logger = get_logger(self.__class__.__name__)
         # rate limit our own messages to not spam around in case of temporary network errors, etc
         rate_limit_setting = constants.ERROR_LOG_RATE_LIMIT
         if rate_limit_setting:
@@ -112,10 +259,46 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
     # ----------------------------------------------------------------------
     def _setup_database(self):
-        if self._database_path:
-            self._database = DatabaseCache(path=self._database_path, event_ttl=self._event_ttl)
+        if self._spool_path:
+            self._database = FileSpoolCache(
+                path=self._spool_path,
+                event_ttl=self._event_ttl,
+                max_events=constants.CACHE_MAX_EVENTS,
+                max_bytes=constants.CACHE_MAX_BYTES,
+                eviction_policy=constants.CACHE_EVICTION_POLICY,
+            )
+        elif self._database_path:
+            self._database = DatabaseCache(
+                path=self._database_path,
+                event_ttl=self._event_ttl,
+                spool=self._database_spool,
+                max_events=constants.CACHE_MAX_EVENTS,
+                max_bytes=constants.CACHE_MAX_BYTES,
+                eviction_policy=constants.CACHE_EVICTION_POLICY,
+            )
         else:
-            self._database = MemoryCache(cache=self._memory_cache, event_ttl=self._event_ttl)
+            self._database = MemoryCache(
+                cache=self._memory_cache,
+                event_ttl=self._event_ttl,
+                max_events=constants.CACHE_MAX_EVENTS,
+                max_bytes=constants.CACHE_MAX_BYTES,
+                eviction_policy=constants.CACHE_EVICTION_POLICY,
+            )
+
+    # ----------------------------------------------------------------------
+    def _count_cached_events(self):
+        # events left in the cache by a previous worker, e.g. of the persistent database
+        try:
+            self._cached_event_count = self._database.count_events()
+        except Exception as exc:
+            self._safe_log("exception", "Error counting the cached events: %s", exc, exc=exc)
+
+    # ----------------------------------------------------------------------
+    def _close_database(self):
+        try:
+            self._database.close()
+        except Exception as exc:
+            self._safe_log("exception", "Error on closing the event cache: %s", exc, exc=exc)
 
     # ----------------------------------------------------------------------
     def _fetch_events(self):
@@ -123,6 +306,10 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
             try:
                 self._fetch_event()
                 self._process_event()
+                if self._drain_batch_size:
+                    # do not wait for an empty queue to flush under sustained load
+                    self._flush_queued_events()
+                    self._evict_events()
             except Empty:
                 # Flush queued (in database) events after internally queued events has been
                 # processed, i.e. the queue is empty.
@@ -132,8 +319,9 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
                 force_flush = self._flush_requested()
                 self._flush_queued_events(force=force_flush)
-                self._delay_processing()
+                self._wait_for_events()
                 self._expire_events()
+                self._evict_events()
             except (DatabaseLockedError, ProcessingError, DatabaseDiskIOError):
                 if self._shutdown_requested():
                     return
@@ -143,7 +331,37 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
     # ----------------------------------------------------------------------
     def _fetch_event(self):
-        self._event = self._queue.get(block=False)
+        try:
+            self._fetch_queued_event()
+        except Empty:
+            # the events of closed collapse windows, all windows are closed on shutdown and flush
+            events = self._pop_collapsed_events(force=self._shutdown_requested() or self._flush_requested())
+            if not events:
+                raise
+            self._events = events
+
+    # ----------------------------------------------------------------------
+    def _fetch_queued_event(self):
+        if not self._drain_batch_size:
+            self._events = [self._queue.get_nowait()]
+            return
+
+        events = []
+        try:
+            while len(events) < self._drain_batch_size:
+                events.append(self._queue.get_nowait())
+        except Empty:
+            if not events:
+                raise
+        self._events = events
+        self._update_drain_counters(events)
+
+    # ----------------------------------------------------------------------
+    def _update_drain_counters(self, events):
+        events_size = sum(len(event) for event, _ in events)
+        with self._drain_lock:
+            self._drain_pending_count = max(self._drain_pending_count - len(events), 0)
+            self._drain_pending_bytes = max(self._drain_pending_bytes - events_size, 0)
 
     # ----------------------------------------------------------------------
     def _process_event(self):
@@ -163,16 +381,34 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
             self._log_processing_error(exc)
             raise ProcessingError from exc
         else:
-            self._event = None
+            self._events = None
 
     # ----------------------------------------------------------------------
     def _expire_events(self):
         try:
-            self._database.expire_events()
+            expired_count = self._database.expire_events()
         except (DatabaseLockedError, DatabaseDiskIOError):
             # Nothing to handle, if it fails, we will either successfully publish
             # these messages next time or we will delete them on the next pass.
-            pass
+            return
+        self._cached_event_count = max(self._cached_event_count - (expired_count or 0), 0)
+
+    # ----------------------------------------------------------------------
+    def _evict_events(self):
+        try:
+            evicted_count = self._database.evict_events()
+        except (DatabaseLockedError, DatabaseDiskIOError):
+            # Nothing to handle, eviction continues on the next pass.
+            return
+        if evicted_count:
+            self._cached_event_count = max(self._cached_event_count - evicted_count, 0)
+            self._safe_log("debug", "Evicted %d events exceeding the cache budget", evicted_count)
+
+    # ----------------------------------------------------------------------
+    @property
+    def evicted_event_count(self):
+        """Count of cached events evicted because the cache exceeded its budget"""
+        return self._database.evicted_count if self._database is not None else 0
 
     # ----------------------------------------------------------------------
     def _log_processing_error(self, exception):
@@ -184,6 +420,16 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
     def _delay_processing(self):
         self._shutdown_event.wait(constants.QUEUE_CHECK_INTERVAL)
 
+    # ----------------------------------------------------------------------
+    def _wait_for_events(self):
+        if not self._drain_batch_size:
+            self._delay_processing()
+            return
+
+        # woken up early by enqueue_event() once the count or byte threshold has been crossed
+        self._drain_event.wait(constants.QUEUE_CHECK_INTERVAL)
+        self._drain_event.clear()
+
     # ----------------------------------------------------------------------
     def _shutdown_requested(self):
         return self._shutdown_event.is_set()
@@ -194,46 +440,131 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
     # ----------------------------------------------------------------------
     def _requeue_event(self):
-        self._queue.put(self._event)
+        if not self._events:
+            return
+        # back into the lane put() chose, priority events must not fall behind newer priority events
+        priority_events = []
+        normal_events = []
+        for event, level in self._events:
+            if level is not None and self._is_priority_level(level):
+                priority_events.append((event, level))
+            else:
+                normal_events.append((event, level))
+        if normal_events:
+            self._queue.requeue(normal_events)
+        if priority_events:
+            self._queue.requeue(priority_events, priority=True)
+
+    # ----------------------------------------------------------------------
+    def _collapse_events(self):
+        events = []
+        for event, level in self._events:
+            if isinstance(event, CollapsibleEvent) and not self._collapser.add(
+                event.record, event.template, event.args, event.format_record, level
+            ):
+                continue
+            events.append((event, level))
+        # under sustained load the queue is never empty, so close expired windows here as well
+        events.extend(self._pop_collapsed_events())
+        self._events = events
+
+    # ----------------------------------------------------------------------
+    def _pop_collapsed_events(self, force=False):
+        if not self._collapser:
+            return []  # no open windows
+        return [
+            (DeferredEvent(record, format_record), level)
+            for record, format_record, level in self._collapser.pop_closed(force=force)
+        ]
+
+    # ----------------------------------------------------------------------
+    def _format_deferred_events(self):
+        events = []
+        for event, level in self._events:
+            if isinstance(event, DeferredEvent):
+                try:
+                    event = event.format_record(event.record)
+                except Exception as exc:
+                    # like Handler.handleError() for synchronously formatted records, drop the event
+                    self._safe_log("exception", "Error formatting log record: %s", exc, exc=exc)
+                    continue
+            events.append((event, level))
+        # requeued as formatted events if writing them to the database fails
+        self._events = events
 
     # ----------------------------------------------------------------------
     def _write_event_to_database(self):
-        self._database.add_event(self._event)
-        self._non_flushed_event_count += 1
+        self._collapse_events()
+        self._format_deferred_events()
+        if not self._events:
+            return
+        if len(self._events) == 1:
+            event, level = self._events[0]
+            self._database.add_event(event, level)
+        else:
+            events, levels = zip(*self._events)
+            self._database.add_events(list(events), list(levels))
+        self._cached_event_count += len(self._events)
+        self._non_flushed_event_count += len(self._events)
+        if self._drain_batch_size:
+            self._non_flushed_event_bytes += sum(len(event) for event, _ in self._events)
 
     # ----------------------------------------------------------------------
     def _flush_queued_events(self, force=False):
         # check if necessary and abort if not
         if not force and not self._queued_event_interval_reached() and not self._queued_event_count_reached():
             return
+        # while the circuit is open, do not even read the cached events (forced flushes still try once)
+        if not self.circuit_breaker.allow_request() and not force:
+            return
 
         self._clear_flush_event()
 
         while True:
-            queued_events = self._fetch_queued_events_for_flush()
+            # a half-open circuit sends a small probe batch before releasing the backlog
+            batch_size = None
+            if self.circuit_breaker.state == STATE_HALF_OPEN:
+                batch_size = constants.CIRCUIT_BREAKER_PROBE_BATCH_SIZE
+            queued_events = self._fetch_queued_events_for_flush(batch_size=batch_size)
             if not queued_events:
                 break
 
             try:
                 events = [event["event_text"] for event in queued_events]
-                self._send_events(events)
+                self._send_events(events, queued_events)
             # Log connection and network errors as warnings as they are rather harmless
             except (ConnectionError, TimeoutError, socket_gaierror) as exc:
                 self._safe_log("warning", "An error occurred while sending events: %s", exc)
                 self._database.requeue_queued_events(queued_events)
+                self._update_send_statistics(failed=True)
                 break
             except Exception as exc:
                 self._safe_log("exception", "An error occurred while sending events: %s", exc, exc=exc)
                 self._database.requeue_queued_events(queued_events)
+                self._update_send_statistics(failed=True)
                 break
             else:
                 self._delete_queued_events_from_database()
                 self._reset_flush_counters()
+                self._update_send_statistics(sent_count=len(queued_events))
+
+    # ----------------------------------------------------------------------
+    def _update_send_statistics(self, sent_count=0, failed=False):
+        if failed:
+            self.send_failure_count += 1
+            self._consecutive_send_failures += 1
+            self._last_send_failure = time.monotonic()
+            self.circuit_breaker.record_failure()
+            return
+        self.sent_event_count += sent_count
+        self._cached_event_count = max(self._cached_event_count - sent_count, 0)
+        self._consecutive_send_failures = 0
+        self.circuit_breaker.record_success()
 
     # ----------------------------------------------------------------------
-    def _fetch_queued_events_for_flush(self):
+    def _fetch_queued_events_for_flush(self, batch_size=None):
         try:
-            return self._database.get_queued_events()
+            return self._database.get_queued_events(batch_size=batch_size)
         except DatabaseLockedError as exc:
             self._safe_log(
                 "debug", "Database is locked, will try again later (queue length %d)", self._queue.qsize(), exc=exc
@@ -263,11 +594,18 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
 
     # ----------------------------------------------------------------------
     def _queued_event_count_reached(self):
-        return self._non_flushed_event_count > constants.QUEUED_EVENTS_FLUSH_COUNT
+        if self._non_flushed_event_count > constants.QUEUED_EVENTS_FLUSH_COUNT:
+            return True
+        return bool(self._drain_batch_size) and self._non_flushed_event_bytes >= constants.QUEUE_DRAIN_WAKEUP_BYTES
 
     # ----------------------------------------------------------------------
-    def _send_events(self, events):
+    def _send_events(self, events, queued_events):
         use_logging = not self._shutdown_requested()
+        if getattr(self._transport, "accepts_levels", False):
+            # e.g. the ShipperTransport, to keep the priority and eviction by level on the receiving side
+            levels = [event["event_level"] for event in queued_events]
+            self._transport.send(events, use_logging=use_logging, levels=levels)
+            return
         self._transport.send(events, use_logging=use_logging)
 
     # ----------------------------------------------------------------------
@@ -327,3 +665,24 @@ class LogProcessingWorker(Thread):  # pylint: disable=too-many-instance-attribut
                 "This indicates a previous error.",
                 extra=dict(queue_size=queue_size),
             )
+
+    # ----------------------------------------------------------------------
+    def _warn_about_dropped_events_on_shutdown(self):
+        dropped_count = self.dropped_event_count
+        if dropped_count:
+            self._safe_log(
+                "warn",
+                f"{dropped_count} events have been dropped because the queue was full "
+                f"(constants.QUEUE_MAX_SIZE = {constants.QUEUE_MAX_SIZE}).",
+                extra=dict(dropped_count=dropped_count),
+            )
+
+    # ----------------------------------------------------------------------
+    def _warn_about_evicted_events_on_shutdown(self):
+        evicted_count = self.evicted_event_count
+        if evicted_count:
+            self._safe_log(
+                "warn",
+                f"{evicted_count} cached events have been evicted because the cache exceeded its budget.",
+                extra=dict(evicted_count=evicted_count),
+            )
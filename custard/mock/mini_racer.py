@@ -18,6 +18,8 @@ import sys
 import sysconfig
 import threading
 
+from custard.utils.serializer import COMPONENT_MINI_RACER, get_serializer
+
 try:
     import pkg_resources
 except ImportError:
@@ -170,12 +172,13 @@ class MiniRacer(object):
     """
     MiniRacer evaluates JavaScript code using a V8 isolate.
 
-    :cvar json_impl: JSON module used by helper methods default is :py:mod:`json`
+    :cvar json_impl: JSON module used by helper methods, by default (None) the serializer set
+                     for the ``mini_racer`` component in :py:mod:`custard.utils.serializer`
     :cvar v8_flags: Flags used for V8 initialization
     :vartype v8_flags: class attribute list of str
     """
 
-    json_impl = json
+    json_impl = None
     v8_flags = ["--single-threaded"]
     ext = None
 
@@ -243,7 +246,7 @@ class MiniRacer(object):
         ret = self.eval(wrapped_expr, timeout=timeout, max_memory=max_memory)
         if not is_unicode(ret):
             raise ValueError("Unexpected return value type {}".format(type(ret)))
-        return self.json_impl.loads(ret)
+        return self._json_loads(ret)
 
     def call(self, expr, *args, **kwargs):
         """Helper to call a JavaScript function and return compositve types.
@@ -267,7 +270,11 @@ class MiniRacer(object):
         timeout = kwargs.get("timeout", None)
         max_memory = kwargs.get("max_memory", None)
 
-        json_args = self.json_impl.dumps(args, separators=(",", ":"), cls=encoder)
+        if encoder is not None or self.json_impl is not None:
+            # custom encoders are only supported by the json module
+            json_args = (self.json_impl or json).dumps(args, separators=(",", ":"), cls=encoder)
+        else:
+            json_args = get_serializer(COMPONENT_MINI_RACER).dumps(args)
         js = "{expr}.apply(this, {json_args})".format(expr=expr, json_args=json_args)
         return self.execute(js, timeout=timeout, max_memory=max_memory)
 
@@ -306,7 +313,12 @@ class MiniRacer(object):
                 "heap_size_limit": 0,
             }
 
-        return self.json_impl.loads(MiniRacerValue(self, res).to_python())
+        return self._json_loads(MiniRacerValue(self, res).to_python())
+
+    def _json_loads(self, data):
+        if self.json_impl is not None:
+            return self.json_impl.loads(data)
+        return get_serializer(COMPONENT_MINI_RACER).loads(data)
 
     def heap_snapshot(self):
         """Return a snapshot of the V8 isolate heap."""
@@ -11,6 +11,7 @@
 """
 from requests import request
 from custard.core.system import SystemHand
+from custard.utils.serializer import COMPONENT_SWAGGER, get_serializer
 from .exception import ParseMethodError
 from .swagger import Swagger2
 
@@ -26,7 +27,7 @@ def load_url(url, method="get", **kwargs):
     Returns:
 
     """
-    return request(url=url, method=method, **kwargs).json()
+    return get_serializer(COMPONENT_SWAGGER).loads(request(url=url, method=method, **kwargs).content)
 
 
 def swagger_parse(url=None, file=None, deep=5, **kwargs):
@@ -44,7 +45,7 @@ def swagger_parse(url=None, file=None, deep=5, **kwargs):
     if url:
         source = load_url(url, **kwargs)
     elif file:
-        source = SystemHand.load_file(file, "json")
+        source = SystemHand.load_file(file, "json", serializer=get_serializer(COMPONENT_SWAGGER))
     else:
         raise ParseMethodError("解析方式错误")
     return Swagger2(source, deep=deep)
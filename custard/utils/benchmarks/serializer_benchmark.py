@@ -0,0 +1,103 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  serializer_benchmark.py
+@Time    :  2026/10/18 18:55
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  各 JSON 序列化器在 logstash / datakit / mini_racer / swagger 典型负载下的 dumps / loads 耗时
+"""
+import logging
+import sys
+import time
+
+from custard.logstash.formatter import LogstashFormatter
+from custard.utils.serializer import available_serializers, resolve_serializer
+
+PAYLOADS = {
+    "logstash event": {
+        "@timestamp": "2023-01-30T07:05:35.025Z",
+        "@version": "1",
+        "host": "app-01",
+        "level": "INFO",
+        "message": "request handled",
+        "type": "python-logstash",
+        "tags": [],
+        "extra": {"path": "/api/v1/items", "status_code": 200, "duration": 0.0132, "func_name": "handle"},
+    },
+    "datakit response": {
+        "code": 0,
+        "msg": "成功",
+        "data": {
+            "total": 50,
+            "items": [
+                {"id": index, "name": f"商品-{index}", "price": index * 1.5, "tags": ["a", "b"], "enabled": True}
+                for index in range(50)
+            ],
+        },
+    },
+    "mini_racer args": ["0x8c5be1e5ebec7d5bd14f71427d1e84f3dd0314c0f7b2291e5b200ac8c7c3b925", 1675062335, 3.5],
+    "swagger spec": {
+        "paths": {
+            f"/api/v1/resource{index}": {
+                method: {
+                    "tags": [f"resource{index}"],
+                    "parameters": [{"name": "id", "in": "path", "required": True, "type": "integer"}],
+                    "responses": {"200": {"schema": {"$ref": f"#/definitions/Resource{index}"}}},
+                }
+                for method in ("get", "post", "delete")
+            }
+            for index in range(40)
+        },
+        "definitions": {
+            f"Resource{index}": {
+                "type": "object",
+                "properties": {"id": {"type": "integer"}, "name": {"type": "string"}},
+            }
+            for index in range(40)
+        },
+    },
+}
+
+
+def measure(function, *args, **kwargs):
+    """microseconds per call, the best of three rounds"""
+    best = None
+    for _ in range(3):
+        iterations = 0
+        started = time.perf_counter()
+        while iterations < 20 or time.perf_counter() - started < 0.2:
+            function(*args, **kwargs)
+            iterations += 1
+        elapsed = (time.perf_counter() - started) / iterations * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    names = sys.argv[1:] or available_serializers()
+    serializers = [resolve_serializer(name) for name in names]
+    print(f"{'payload':<18} {'serializer':<10} {'dumps µs':>10} {'loads µs':>10}")
+    for payload_name, payload in PAYLOADS.items():
+        data = resolve_serializer("json").dumps(payload)
+        for serializer in serializers:
+            dumps = measure(serializer.dumps, payload, ensure_ascii=False)
+            loads = measure(serializer.loads, data)
+            print(f"{payload_name:<18} {serializer.name:<10} {dumps:>10.2f} {loads:>10.2f}")
+
+    logger = logging.getLogger("benchmark")
+    record = logger.makeRecord(
+        "benchmark", logging.INFO, __file__, 42, "handled %s", (1,), None, extra=PAYLOADS["logstash event"]["extra"]
+    )
+    print()
+    print(f"{'LogstashFormatter':<29} {'format µs':>10}")
+    for serializer in serializers:
+        print(
+            f"{'':<18} {serializer.name:<10} {measure(LogstashFormatter(serializer=serializer).format, record):>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  serializer.py
+@Time    :  2026/10/18 18:10
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  可插拔 JSON 序列化器注册表, 默认使用标准库 json, 可显式选用 orjson / ujson / simdjson
+"""
+from abc import ABC, abstractmethod
+from datetime import date, datetime, time
+from importlib import import_module
+from importlib.util import find_spec
+from uuid import UUID
+import json
+import re
+
+
+AUTO = "auto"
+# the serializer of components without one of their own, the output of the json module is kept unless
+# a faster library is chosen explicitly, e.g. with set_default_serializer(AUTO)
+DEFAULT_SERIALIZER = "json"
+# order in which AUTO picks the first installed library
+SERIALIZER_PREFERENCE = ("orjson", "ujson", "simdjson", "json")
+COMPACT_SEPARATORS = (",", ":")
+
+# components using the registry, see set_serializer()
+COMPONENT_LOGSTASH = "logstash"
+COMPONENT_DATAKIT = "datakit"
+COMPONENT_MINI_RACER = "mini_racer"
+COMPONENT_SWAGGER = "swagger"
+
+_NON_ASCII_PATTERN = re.compile(r"[^\x00-\x7f]")
+
+
+# ----------------------------------------------------------------------
+def json_default(obj):
+    """Encode the types only some libraries support natively the same way for all of them."""
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+
+# ----------------------------------------------------------------------
+def _chain_default(default):
+    if default is None:
+        return json_default
+
+    def chained_default(obj):
+        if isinstance(obj, (datetime, date, time, UUID)):
+            return json_default(obj)
+        return default(obj)
+
+    return chained_default
+
+
+# ----------------------------------------------------------------------
+def _escape_non_ascii_character(match):
+    code_point = ord(match.group())
+    if code_point < 0x10000:
+        return f"\\u{code_point:04x}"
+    # surrogate pair, like the json module does
+    code_point -= 0x10000
+    return f"\\u{0xD800 | (code_point >> 10):04x}\\u{0xDC00 | (code_point & 0x3FF):04x}"
+
+
+class JsonSerializer(ABC):
+    """Common interface of the JSON libraries.
+
+    `loads()` accepts str and bytes. `dumps()` returns str, `dumps_bytes()` UTF-8 encoded bytes.
+    datetime, date, time and UUID objects are always encoded as ISO 8601 resp. hex string with
+    dashes, `default` is called for all other types which are not JSON serializable.
+    """
+
+    name = None
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def is_available(cls):
+        return True
+
+    # ----------------------------------------------------------------------
+    @abstractmethod
+    def loads(self, data):
+        pass
+
+    # ----------------------------------------------------------------------
+    @abstractmethod
+    def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        pass
+
+    # ----------------------------------------------------------------------
+    def dumps_bytes(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        return self.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default).encode("utf-8")
+
+
+class StdlibJsonSerializer(JsonSerializer):
+    """The json module of the standard library.
+
+    :param separators: Item and key separators, by default the ones of the json module
+    """
+
+    name = "json"
+
+    # ----------------------------------------------------------------------
+    def __init__(self, separators=None):
+        self._separators = separators
+
+    # ----------------------------------------------------------------------
+    def loads(self, data):
+        return json.loads(data)
+
+    # ----------------------------------------------------------------------
+    def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        return json.dumps(
+            obj,
+            ensure_ascii=ensure_ascii,
+            sort_keys=sort_keys,
+            default=_chain_default(default),
+            separators=self._separators,
+        )
+
+
+class _FastJsonSerializer(JsonSerializer):
+    """Base class of the third-party libraries.
+
+    Anything the library rejects but the json module accepts (e.g. integers beyond 64 bit,
+    NaN or Infinity) is handled by the json module with the compact output of the libraries.
+    """
+
+    module_name = None
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        self._module = import_module(self.module_name)
+        self._fallback = StdlibJsonSerializer(separators=COMPACT_SEPARATORS)
+
+    # ----------------------------------------------------------------------
+    @classmethod
+    def is_available(cls):
+        return find_spec(cls.module_name) is not None
+
+
+class OrjsonSerializer(_FastJsonSerializer):
+    """orjson writes NaN and Infinity as null (valid JSON) instead of NaN resp. Infinity."""
+
+    name = "orjson"
+    module_name = "orjson"
+
+    # ----------------------------------------------------------------------
+    def __init__(self):
+        super().__init__()
+        # datetimes are passed to json_default() to get the same format as with the other libraries
+        self._option = self._module.OPT_PASSTHROUGH_DATETIME | self._module.OPT_NON_STR_KEYS
+
+    # ----------------------------------------------------------------------
+    def loads(self, data):
+        try:
+            return self._module.loads(data)
+        except self._module.JSONDecodeError:
+            return self._fallback.loads(data)
+
+    # ----------------------------------------------------------------------
+    def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        return self.dumps_bytes(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default).decode("utf-8")
+
+    # ----------------------------------------------------------------------
+    def dumps_bytes(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        option = self._option | self._module.OPT_SORT_KEYS if sort_keys else self._option
+        try:
+            data = self._module.dumps(obj, default=_chain_default(default), option=option)
+        except self._module.JSONEncodeError:
+            return self._fallback.dumps_bytes(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default)
+        if ensure_ascii and not data.isascii():
+            # orjson always writes UTF-8, non-ASCII characters only occur within strings
+            return _NON_ASCII_PATTERN.sub(_escape_non_ascii_character, data.decode("utf-8")).encode("ascii")
+        return data
+
+
+class UjsonSerializer(_FastJsonSerializer):
+    name = "ujson"
+    module_name = "ujson"
+
+    # ----------------------------------------------------------------------
+    def loads(self, data):
+        try:
+            return self._module.loads(data)
+        except ValueError:
+            return self._fallback.loads(data)
+
+    # ----------------------------------------------------------------------
+    def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        try:
+            return self._module.dumps(
+                obj,
+                ensure_ascii=ensure_ascii,
+                sort_keys=sort_keys,
+                default=_chain_default(default),
+                escape_forward_slashes=False,
+            )
+        except (TypeError, OverflowError):
+            return self._fallback.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default)
+
+
+class SimdjsonSerializer(_FastJsonSerializer):
+    """pysimdjson only parses JSON, encoding is done by the json module."""
+
+    name = "simdjson"
+    module_name = "simdjson"
+
+    # ----------------------------------------------------------------------
+    def loads(self, data):
+        try:
+            return self._module.loads(data)
+        except ValueError:
+            return self._fallback.loads(data)
+
+    # ----------------------------------------------------------------------
+    def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+        return self._fallback.dumps(obj, ensure_ascii=ensure_ascii, sort_keys=sort_keys, default=default)
+
+
+_serializer_classes = {}
+_serializers = {}
+_component_serializers = {}
+_default_serializer = None  # None until set_default_serializer() is called, DEFAULT_SERIALIZER is used then
+
+
+# ----------------------------------------------------------------------
+def register_serializer(serializer_class):
+    """Register a JsonSerializer subclass under its name, replacing a serializer of the same name."""
+    _serializer_classes[serializer_class.name] = serializer_class
+    _serializers.pop(serializer_class.name, None)
+    return serializer_class
+
+
+# ----------------------------------------------------------------------
+def available_serializers():
+    """Names of the registered serializers whose library is installed"""
+    return [name for name, serializer_class in _serializer_classes.items() if serializer_class.is_available()]
+
+
+# ----------------------------------------------------------------------
+def set_default_serializer(name):
+    """Set the serializer of all components without a serializer of their own (default: DEFAULT_SERIALIZER)."""
+    global _default_serializer  # pylint: disable=global-statement
+    resolve_serializer(name)  # fail early for unknown or unavailable serializers
+    _default_serializer = name
+
+
+# ----------------------------------------------------------------------
+def set_serializer(component, name):
+    """Set the serializer of a component, None resets it to the default serializer.
+
+    Components look up their serializer when they are created (e.g. LogstashFormatter)
+    or on every call (e.g. DataKitHelper).
+    """
+    if name is None:
+        _component_serializers.pop(component, None)
+        return
+    resolve_serializer(name)
+    _component_serializers[component] = name
+
+
+# ----------------------------------------------------------------------
+def get_serializer(component=None):
+    """Return the serializer of the component or the default serializer."""
+    return resolve_serializer(_component_serializers.get(component, _default_serializer or DEFAULT_SERIALIZER))
+
+
+# ----------------------------------------------------------------------
+def has_serializer(component):
+    """True if a serializer was chosen for the component (set_serializer()) or all (set_default_serializer()).
+
+    Helpers with arguments beyond the common interface (e.g. DataKitHelper) only use the registry then.
+    """
+    return component in _component_serializers or _default_serializer is not None
+
+
+# ----------------------------------------------------------------------
+def resolve_serializer(serializer):
+    """Return the serializer for a name, AUTO or a JsonSerializer instance.
+
+    :raises ValueError: if the serializer is unknown or its library is not installed
+    """
+    if isinstance(serializer, JsonSerializer):
+        return serializer
+    if serializer == AUTO:
+        serializer = next(name for name in SERIALIZER_PREFERENCE if name in available_serializers())
+
+    instance = _serializers.get(serializer)
+    if instance is not None:
+        return instance
+
+    serializer_class = _serializer_classes.get(serializer)
+    if serializer_class is None:
+        raise ValueError(f"Unknown JSON serializer '{serializer}', use one of: {', '.join(_serializer_classes)}")
+    if not serializer_class.is_available():
+        raise ValueError(f"JSON serializer '{serializer}' is not available, install the '{serializer}' package")
+    instance = serializer_class()
+    _serializers[serializer] = instance
+    return instance
+
+
+for _serializer_class in (StdlibJsonSerializer, OrjsonSerializer, UjsonSerializer, SimdjsonSerializer):
+    register_serializer(_serializer_class)
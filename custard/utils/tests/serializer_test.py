@@ -0,0 +1,206 @@
+# -*- coding:utf-8 -*-
+# !/usr/bin/env python3
+"""
+@File    :  serializer_test.py
+@Time    :  2026/10/18 18:40
+@Author  :  YuYanQing
+@Version :  1.0
+@Contact :  mryu168@163.com
+@License :  (C)Copyright 2022-2026
+@Desc    :  None
+"""
+from datetime import date, datetime, time
+from uuid import UUID
+import json
+import unittest
+
+from custard.utils import serializer
+from custard.utils.serializer import (
+    AUTO,
+    COMPACT_SEPARATORS,
+    JsonSerializer,
+    StdlibJsonSerializer,
+    available_serializers,
+    get_serializer,
+    has_serializer,
+    register_serializer,
+    resolve_serializer,
+    set_default_serializer,
+    set_serializer,
+)
+
+PAYLOADS = [
+    {"message": "plain", "level": "INFO", "count": 3, "ratio": 0.25, "flag": True, "none": None},
+    {"nested": {"list": [1, 2, {"a": []}], "empty": {}}, "path": "/api/v1/items"},
+    {"unicode": "Grüße 日本 \U0001f600", "control": 'tab\tnew\nline "quoted" back\\slash'},
+    ["a", 1, -2, 1.5e-10, 123456789012345],
+]
+
+
+class SerializerTest(unittest.TestCase):
+    # ----------------------------------------------------------------------
+    def setUp(self):
+        self._default_serializer = serializer._default_serializer
+        self._component_serializers = dict(serializer._component_serializers)
+        self._serializer_classes = dict(serializer._serializer_classes)
+
+    # ----------------------------------------------------------------------
+    def tearDown(self):
+        serializer._default_serializer = self._default_serializer
+        serializer._component_serializers.clear()
+        serializer._component_serializers.update(self._component_serializers)
+        serializer._serializer_classes.clear()
+        serializer._serializer_classes.update(self._serializer_classes)
+        serializer._serializers.clear()
+
+    # ----------------------------------------------------------------------
+    def _serializers(self):
+        return [resolve_serializer(name) for name in available_serializers()]
+
+    # ----------------------------------------------------------------------
+    def test_stdlib_matches_json_module(self):
+        stdlib = resolve_serializer("json")
+        for payload in PAYLOADS:
+            self.assertEqual(stdlib.dumps(payload), json.dumps(payload))
+            self.assertEqual(stdlib.dumps(payload, ensure_ascii=False), json.dumps(payload, ensure_ascii=False))
+
+    # ----------------------------------------------------------------------
+    def test_fast_serializers_match_compact_json_module(self):
+        for instance in self._serializers():
+            if isinstance(instance, StdlibJsonSerializer):
+                continue
+            for payload in PAYLOADS:
+                for ensure_ascii in (True, False):
+                    expected = json.dumps(payload, ensure_ascii=ensure_ascii, separators=COMPACT_SEPARATORS)
+                    with self.subTest(serializer=instance.name, payload=payload, ensure_ascii=ensure_ascii):
+                        self.assertEqual(instance.dumps(payload, ensure_ascii=ensure_ascii), expected)
+                        self.assertEqual(
+                            instance.dumps_bytes(payload, ensure_ascii=ensure_ascii), expected.encode("utf-8")
+                        )
+
+    # ----------------------------------------------------------------------
+    def test_loads_round_trip(self):
+        for instance in self._serializers():
+            for payload in PAYLOADS:
+                data = json.dumps(payload)
+                with self.subTest(serializer=instance.name, payload=payload):
+                    self.assertEqual(instance.loads(data), payload)
+                    self.assertEqual(instance.loads(data.encode("utf-8")), payload)
+
+    # ----------------------------------------------------------------------
+    def test_sort_keys(self):
+        for instance in self._serializers():
+            with self.subTest(serializer=instance.name):
+                self.assertEqual(list(json.loads(instance.dumps({"b": 1, "a": 2}, sort_keys=True))), ["a", "b"])
+
+    # ----------------------------------------------------------------------
+    def test_default_types(self):
+        payload = {
+            "datetime": datetime(2023, 1, 30, 7, 5, 35, 25000),
+            "date": date(2023, 1, 30),
+            "time": time(7, 5, 35),
+            "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+        }
+        expected = {
+            "datetime": "2023-01-30T07:05:35.025000",
+            "date": "2023-01-30",
+            "time": "07:05:35",
+            "uuid": "12345678-1234-5678-1234-567812345678",
+        }
+        for instance in self._serializers():
+            with self.subTest(serializer=instance.name):
+                self.assertEqual(json.loads(instance.dumps(payload)), expected)
+
+    # ----------------------------------------------------------------------
+    def test_custom_default(self):
+        payload = {"set": {1}, "when": date(2023, 1, 30)}
+        for instance in self._serializers():
+            with self.subTest(serializer=instance.name):
+                self.assertEqual(
+                    json.loads(instance.dumps(payload, default=sorted)), {"set": [1], "when": "2023-01-30"}
+                )
+                with self.assertRaises(TypeError):
+                    instance.dumps({"set": {1}})
+
+    # ----------------------------------------------------------------------
+    def test_fallback_to_json_module(self):
+        for instance in self._serializers():
+            with self.subTest(serializer=instance.name):
+                self.assertEqual(json.loads(instance.dumps({"big": 2**70})), {"big": 2**70})
+                expected = "[null]" if instance.name == "orjson" else "[NaN]"
+                self.assertEqual(instance.dumps([float("nan")]), expected)
+                self.assertEqual(repr(instance.loads("[NaN]")), "[nan]")
+
+    # ----------------------------------------------------------------------
+    def test_auto_uses_preference_order(self):
+        available = available_serializers()
+        expected = next(name for name in serializer.SERIALIZER_PREFERENCE if name in available)
+        self.assertEqual(resolve_serializer(AUTO).name, expected)
+
+    # ----------------------------------------------------------------------
+    def test_default_is_json_module(self):
+        # installing a faster library does not change the output of components without a serializer
+        self.assertIsInstance(get_serializer("component"), StdlibJsonSerializer)
+        self.assertEqual(get_serializer("component").dumps({"a": float("nan")}), '{"a": NaN}')
+        self.assertFalse(has_serializer("component"))
+
+    # ----------------------------------------------------------------------
+    def test_set_serializer_per_component(self):
+        set_serializer("component", AUTO)
+        self.assertIs(get_serializer("component"), resolve_serializer(AUTO))
+        self.assertTrue(has_serializer("component"))
+        self.assertIs(get_serializer("other"), resolve_serializer("json"))
+        self.assertFalse(has_serializer("other"))
+
+        set_serializer("component", None)
+        self.assertIs(get_serializer("component"), resolve_serializer("json"))
+        self.assertFalse(has_serializer("component"))
+
+    # ----------------------------------------------------------------------
+    def test_set_default_serializer(self):
+        set_default_serializer(AUTO)
+        self.assertIs(get_serializer("component"), resolve_serializer(AUTO))
+        self.assertIs(get_serializer(), resolve_serializer(AUTO))
+        self.assertTrue(has_serializer("component"))
+
+    # ----------------------------------------------------------------------
+    def test_unknown_serializer(self):
+        with self.assertRaises(ValueError):
+            resolve_serializer("does-not-exist")
+        with self.assertRaises(ValueError):
+            set_serializer("component", "does-not-exist")
+        with self.assertRaises(ValueError):
+            set_default_serializer("does-not-exist")
+        self.assertNotIn("component", serializer._component_serializers)
+
+    # ----------------------------------------------------------------------
+    def test_unavailable_serializer(self):
+        @register_serializer
+        class MissingSerializer(serializer._FastJsonSerializer):
+            name = "missing"
+            module_name = "custard_missing_json_module"
+
+        self.assertNotIn("missing", available_serializers())
+        with self.assertRaises(ValueError):
+            resolve_serializer("missing")
+
+    # ----------------------------------------------------------------------
+    def test_register_serializer(self):
+        @register_serializer
+        class UpperSerializer(JsonSerializer):
+            name = "upper"
+
+            def loads(self, data):
+                return json.loads(data)
+
+            def dumps(self, obj, ensure_ascii=True, sort_keys=False, default=None):
+                return json.dumps(obj).upper()
+
+        set_serializer("component", "upper")
+        self.assertEqual(get_serializer("component").dumps({"a": "b"}), '{"A": "B"}')
+        self.assertEqual(get_serializer("component").dumps_bytes({"a": "b"}), b'{"A": "B"}')
+        self.assertIs(resolve_serializer(get_serializer("component")), get_serializer("component"))
+
+
+if __name__ == "__main__":
+    unittest.main()